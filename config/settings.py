@@ -29,10 +29,12 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'surveys.middleware.CompressionMiddleware',  # JSON 응답 압축 (brotli 설치 시 br, 아니면 gzip)
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'surveys.middleware.UserAccessMiddleware',  # 사용자 권한/관할 범위 캐시 (request.access)
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -68,6 +70,39 @@ DATABASES = {
     }
 }
 
+# 4-0. 분석용 읽기 전용 DB 연결 (api/execute-sql 의 backend=direct 경로)
+# DB_READONLY_USER 에는 평면 테이블(surveys_flat_*) SELECT 권한만 준 계정을 지정합니다.
+# 지정하지 않으면 backend=direct 는 실행하지 않습니다. (default 연결로 대신 실행하지 않음)
+if os.getenv('DB_READONLY_USER'):
+    DATABASES['readonly'] = {
+        **DATABASES['default'],
+        'USER': os.getenv('DB_READONLY_USER'),
+        'PASSWORD': os.getenv('DB_READONLY_PASSWORD', ''),
+        'OPTIONS': {'options': '-c default_transaction_read_only=on'},
+        'TEST': {'MIRROR': 'default'},
+    }
+SQL_DIRECT_DATABASE = 'readonly'
+SQL_DIRECT_TIMEOUT = float(os.getenv('SQL_DIRECT_TIMEOUT', '30'))       # 문장 실행 한도(초)
+SQL_DIRECT_MAX_ROWS = int(os.getenv('SQL_DIRECT_MAX_ROWS', '100000'))   # 응답 최대 행 수
+
+# 4-1. 캐시 설정
+# 조사표 번들 등 여러 워커 프로세스가 공유해야 하는 캐시입니다.
+# REDIS_URL 이 있으면 Redis(다중 서버, redis 패키지 필요), 없으면 파일 캐시(단일 서버 내 프로세스 간 공유)를 사용합니다.
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_DIR', '/tmp/survey_platform_cache'),
+        }
+    }
+
 # 5. 국제화 설정
 LANGUAGE_CODE = 'ko-kr'
 TIME_ZONE = 'Asia/Seoul'
@@ -97,4 +132,15 @@ LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/accounts/login/'
 
 INTERNAL_IPS = ['127.0.0.1', 'localhost']
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# 9. Superset 연동 (SQL Lab API)
+SUPERSET_URL = os.getenv('SUPERSET_URL', 'http://119.223.104.14:8088')
+SUPERSET_USERNAME = os.getenv('SUPERSET_USERNAME', '')
+SUPERSET_PASSWORD = os.getenv('SUPERSET_PASSWORD', '')
+SUPERSET_DATABASE_ID = int(os.getenv('SUPERSET_DATABASE_ID', '2'))
+SUPERSET_RUN_ASYNC = os.getenv('SUPERSET_RUN_ASYNC', 'True') == 'True'  # Superset DB 가 비동기 실행을 허용해야 적용됨
+SUPERSET_POOL_SIZE = int(os.getenv('SUPERSET_POOL_SIZE', '10'))
+SUPERSET_CONNECT_TIMEOUT = float(os.getenv('SUPERSET_CONNECT_TIMEOUT', '5'))
+SUPERSET_READ_TIMEOUT = float(os.getenv('SUPERSET_READ_TIMEOUT', '60'))
+SUPERSET_POLL_TIMEOUT = float(os.getenv('SUPERSET_POLL_TIMEOUT', '300'))  # 비동기 쿼리 전체 대기 한도(초)
@@ -25,6 +25,7 @@ urlpatterns = [
     path('<int:survey_id>/questionnaire_design/', views.survey_questionnaire_design, name='survey_questionnaire_design'),
     path('questionnaire/<int:q_id>/versions/', views.get_questionnaire_versions, name='get_questionnaire_versions'),
     path('questionnaire/<int:q_id>/save/', views.save_questionnaire_design, name='save_questionnaire_design'),
+    path('questionnaire/version/<int:v_id>/design/', views.get_questionnaire_version_design, name='get_questionnaire_version_design'),
     path('questionnaire/version/<int:v_id>/confirm/', views.confirm_questionnaire_version, name='confirm_questionnaire_version'),
 
     # 자료수집 (Collect)
@@ -33,6 +34,8 @@ urlpatterns = [
     path('collect/<int:survey_id>/degrees/', views.collection_degree_list, name='collection_degree_list'),
 
     path('collect/roster/<int:roster_id>/degree/<int:degree_id>/', views.roster_data_view, name='roster_data_view'),
+    path('collect/roster/<int:roster_id>/degree/<int:degree_id>/data/', views.roster_data_api, name='roster_data_api'),
+    path('collect/roster/<int:roster_id>/degree/<int:degree_id>/export/', views.export_roster_data, name='export_roster_data'),
 
     path('data/<int:data_id>/get-survey/', views.get_survey_data, name='get_survey_data'),
     path('data/<int:data_id>/save-survey/', views.save_survey_response, name='save_survey_response'),
@@ -53,12 +56,15 @@ urlpatterns = [
 
     path('survey/<int:survey_id>/delete-all/', views.reset_all_survey_data, name='reset_all_survey_data'),
     path('survey/assign-records/', views.assign_records, name='assign_records'),
+    path('survey/<int:survey_id>/auto-assign/', views.auto_assign_records, name='auto_assign_records'),
+    path('survey/<int:survey_id>/progress/', views.survey_progress, name='survey_progress'),
 
     # [추가] 7. 자료분석 화면
     path('survey/<int:survey_id>/collection-analysis/', views.collection_analysis_view, name='collection_analysis'),
 
     # [추가] 데이터 API
     path('survey/<int:survey_id>/pivot-data/', views.survey_pivot_data_api, name='survey_pivot_data_api'),
+    path('survey/<int:survey_id>/flat-table/', views.survey_flat_table_api, name='survey_flat_table_api'),
 
     # [추가] 분석 저장 API
     path('survey/<int:survey_id>/analysis/save/', views.save_analysis_config, name='save_analysis_config'),
@@ -72,7 +78,13 @@ urlpatterns = [
     # [수정 후] - 앞에 'survey/'를 붙여서 경로를 맞춰줍니다!
     path('survey/analysis/<int:analysis_id>/view/', views.analysis_viewer_view, name='analysis_viewer'),
     path('survey/analysis/<int:analysis_id>/json/', views.get_analysis_detail, name='get_analysis_detail'),
+    path('survey/analysis/<int:analysis_id>/aggregate/', views.get_analysis_aggregate, name='get_analysis_aggregate'),
 
     # 신규 API 추가
     path('api/execute-sql/', views.get_query_result, name='api_execute_sql'), 
+    path('api/execute-sql/<int:query_id>/', views.poll_query_result, name='api_poll_sql'),
+
+    # 백그라운드 작업 진행 상황 / 결과 다운로드
+    path('jobs/<int:job_id>/status/', views.job_status_api, name='job_status_api'),
+    path('jobs/<int:job_id>/download/', views.job_download, name='job_download'),
 ]
\ No newline at end of file
@@ -0,0 +1,143 @@
+# surveys/access.py
+"""
+사용자 권한/관할 범위 해석 캐시
+
+뷰마다 반복되던 권한 조회(Manager 그룹 여부, 조사 담당 관리자 여부, SurveyAreaUser 배정)를
+사용자당 한 번 해석해 UserAccess 로 묶어 둡니다.
+- 요청 단위: request.user 객체에 보관 (UserAccessMiddleware 가 request.access 로 노출)
+- 요청 간: 공유 캐시(settings.CACHES)에 사용자별로 보관
+무효화는 SurveyAreaUser 저장/삭제, SurveyMaster.managers / User.groups 변경 시그널에서 처리합니다.
+권역 상세(코드/이름/경로)는 area_tree 캐시에서 가져오므로 권역 설계 변경도 그대로 반영됩니다.
+"""
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .area_tree import get_area_tree
+from .models import SurveyAreaUser, SurveyMaster
+
+ACCESS_TIMEOUT = 60 * 60 * 24
+ADMIN_GROUP = 'Manager'
+
+
+def _access_key(user_id):
+    return f"user_access:{user_id}"
+
+
+class AreaScope:
+    """조사 내 사용자의 관할 권역 (area: area_tree.AreaNode)"""
+    __slots__ = ('area', 'is_manager')
+
+    def __init__(self, area, is_manager):
+        self.area = area
+        self.is_manager = is_manager
+
+
+class UserAccess:
+    """사용자의 역할/담당 조사/권역 배정 (읽기 전용으로 사용)"""
+
+    def __init__(self, data, is_superuser=False):
+        self.user_id = data['user_id']
+        self.is_superuser = is_superuser
+        self.is_admin = is_superuser or data['in_admin_group']
+        self.managed_survey_ids = frozenset(data['managed_survey_ids'])
+        # {조사 ID: (권역 ID, 권역관리자여부)} - 조사별 첫 번째 배정 기준
+        self.area_assignments = {survey_id: tuple(value) for survey_id, value in data['areas']}
+
+    def can_manage_survey(self, survey_id):
+        """조사 담당 관리자 여부 (슈퍼유저는 항상 True)"""
+        return self.is_superuser or survey_id in self.managed_survey_ids
+
+    def is_assigned(self, survey_id):
+        """조사에 권역 배정이 있는지"""
+        return survey_id in self.area_assignments
+
+    def area_scope(self, survey_id):
+        """조사 내 관할 권역 (배정이 없거나 권역이 사라졌으면 None)"""
+        assignment = self.area_assignments.get(survey_id)
+        if assignment is None:
+            return None
+        area = get_area_tree(survey_id).get(assignment[0])
+        return AreaScope(area, assignment[1]) if area else None
+
+
+def build_access_data(user):
+    areas = {}
+    assignments = SurveyAreaUser.objects.filter(user=user).order_by('id').values_list(
+        'survey_id', 'area_id', 'is_manager'
+    )
+    for survey_id, area_id, is_manager in assignments:
+        areas.setdefault(survey_id, [area_id, is_manager])
+    return {
+        'user_id': user.id,
+        'in_admin_group': user.groups.filter(name=ADMIN_GROUP).exists(),
+        'managed_survey_ids': list(user.managed_surveys.values_list('id', flat=True)),
+        'areas': list(areas.items()),
+    }
+
+
+_ANONYMOUS = {'user_id': None, 'in_admin_group': False, 'managed_survey_ids': [], 'areas': []}
+
+
+def get_user_access(user):
+    """사용자의 UserAccess 를 반환합니다. (같은 요청 안에서는 user 객체에 보관된 값 재사용)"""
+    access = getattr(user, '_survey_access', None)
+    if access is not None:
+        return access
+
+    if not user.is_authenticated:
+        access = UserAccess(_ANONYMOUS)
+    else:
+        key = _access_key(user.id)
+        data = cache.get(key)
+        if data is None:
+            data = build_access_data(user)
+            cache.set(key, data, ACCESS_TIMEOUT)
+        access = UserAccess(data, is_superuser=user.is_superuser)
+    user._survey_access = access
+    return access
+
+
+def invalidate_user_access(user_ids):
+    """사용자들의 권한 캐시를 무효화합니다. (트랜잭션 안이면 커밋 이후)"""
+    keys = [_access_key(user_id) for user_id in set(user_ids) if user_id]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+# ==========================================
+# 무효화 시그널
+# ==========================================
+
+@receiver([post_save, post_delete], sender=SurveyAreaUser)
+def _area_user_changed(sender, instance, **kwargs):
+    invalidate_user_access([instance.user_id])
+
+
+def _m2m_user_ids(instance, action, pk_set, instance_is_user, current_user_ids):
+    """m2m 변경에서 영향받는 사용자 ID 목록"""
+    if instance_is_user:
+        return [instance.pk]
+    if action == 'pre_clear':
+        return list(current_user_ids())
+    return list(pk_set or [])
+
+
+@receiver(m2m_changed, sender=SurveyMaster.managers.through)
+def _survey_managers_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # reverse=False: survey.managers 변경 / reverse=True: user.managed_surveys 변경
+    if action in ('post_add', 'post_remove', 'pre_clear'):
+        invalidate_user_access(_m2m_user_ids(
+            instance, action, pk_set, reverse, lambda: instance.managers.values_list('id', flat=True)
+        ))
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def _user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # reverse=False: user.groups 변경 / reverse=True: group.user_set 변경
+    if action in ('post_add', 'post_remove', 'pre_clear'):
+        invalidate_user_access(_m2m_user_ids(
+            instance, action, pk_set, not reverse, lambda: instance.user_set.values_list('id', flat=True)
+        ))
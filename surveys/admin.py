@@ -1,7 +1,8 @@
 from django.contrib import admin
 from django.shortcuts import render
 # SurveyRoster를 추가로 임포트해야 합니다.
-from .models import SurveyMaster, SurveyDesign, SurveyData, SurveyRoster, SurveyDegree, SqlLabManager
+from .models import SurveyMaster, SurveyDesign, SurveyData, SurveyRoster, SurveyDegree, SqlLabManager, BackgroundJob
+from .jobs import enqueue_job
 
 
 class SurveyDegreeInline(admin.TabularInline):
@@ -27,6 +28,16 @@ class SurveyMasterAdmin(admin.ModelAdmin):
 class SurveyDegreeAdmin(admin.ModelAdmin):
     list_display = ('survey', 'degree_number', 'degree_title', 'start_date', 'end_date', 'is_active')
     list_filter = ('survey', 'is_active')
+    actions = ['revalidate_edit_rules']
+
+    @admin.action(description="선택한 차수 응답자료 내검 일괄 재검증")
+    def revalidate_edit_rules(self, request, queryset):
+        # 백그라운드 작업으로 등록 (run_jobs 워커가 처리, 진행 상황은 작업 목록에서 확인)
+        job_ids = [
+            enqueue_job('revalidate', {'degree_id': degree.id}, user=request.user).id
+            for degree in queryset
+        ]
+        self.message_user(request, f"{len(job_ids)}개 차수의 재검증 작업을 등록했습니다. (작업 ID: {', '.join(map(str, job_ids))})")
 
 @admin.register(SurveyDesign)
 class SurveyDesignAdmin(admin.ModelAdmin):
@@ -46,6 +57,12 @@ class SurveyDataAdmin(admin.ModelAdmin):
     list_display = ('respondent_id', 'roster', 'status', 'updated_at')
     list_filter = ('status', 'roster')
 
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'job_type', 'status', 'processed', 'total', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'job_type')
+    readonly_fields = ('started_at', 'finished_at', 'updated_at')
+
 @admin.register(SqlLabManager)
 class SqlLabManagerAdmin(admin.ModelAdmin):
     # 1. 메뉴 이름 설정
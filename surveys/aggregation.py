@@ -0,0 +1,236 @@
+# surveys/aggregation.py
+"""
+저장된 분석(SurveyAnalysis.report_config) 서버 집계 엔진
+
+WebDataRocks 리포트의 slice(rows / columns / measures / 필터)를 해석하여
+GROUP BY 집계를 DB(PostgreSQL/SQLite 공통, ORM)에서 수행하고, 집계된 셀만 반환합니다.
+브라우저는 원자료 대신 집계 결과(cube)만 받아 그대로 표시합니다.
+
+지원 집계: count / sum / average / min / max / distinctcount
+- sum/average/min/max 는 숫자로 변환 가능한 값만 대상 (그 외 값은 제외)
+- average 는 셀별 합계/건수를 함께 내려 소계·총계를 정확히 계산하도록 함
+- distinctcount 의 소계·총계는 셀 값의 합계로 표시됨 (셀 단위 값은 정확)
+"""
+import time
+
+from django.conf import settings
+from django.db.models import Case, CharField, Count, F, FloatField, Max, Min, Q, Sum, When
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import Cast
+
+from .pivot import BASE_FIELDS, SURVEY_VALUE_PREFIX, VIRTUAL_FIELDS, format_base_value, pivot_queryset
+
+# 집계 결과 셀 수 상한 (고유값이 많은 필드를 행/열에 두면 원자료 수준으로 커지는 것을 방지)
+MAX_CELLS = getattr(settings, 'ANALYSIS_MAX_CELLS', 50000)
+
+AGGREGATIONS = ('count', 'sum', 'average', 'min', 'max', 'distinctcount')
+
+NUMERIC_PATTERN = r'^\s*-?[0-9]+(\.[0-9]+)?\s*$'
+
+# 표시값 -> NULL 조건 (format_base_value 의 역변환)
+EMPTY_LABELS = {"차수": "미지정", "권역": "미지정", "조사원": "미배정"}
+
+
+class AggregationError(ValueError):
+    """집계할 수 없는 리포트 설정"""
+
+
+def _member_value(field, member):
+    """WebDataRocks 필터 멤버('필드.[값]')에서 값만 추출"""
+    prefix = f"{field}.["
+    if isinstance(member, str) and member.startswith(prefix) and member.endswith(']'):
+        return member[len(prefix):-1]
+    return member
+
+
+def parse_report(report_config):
+    """
+    report_config 를 집계 명세로 변환합니다.
+    반환: {'rows': [필드], 'columns': [필드], 'measures': [{field, aggregation, caption}],
+           'filters': [(필드, 'include'|'exclude', [값])]}
+    """
+    slice_config = (report_config or {}).get('slice') or {}
+
+    def names(section):
+        return [
+            e['uniqueName'] for e in slice_config.get(section) or []
+            if isinstance(e, dict) and e.get('uniqueName') and e['uniqueName'] not in VIRTUAL_FIELDS
+        ]
+
+    measures = []
+    for entry in slice_config.get('measures') or []:
+        if not isinstance(entry, dict) or not entry.get('uniqueName'):
+            continue
+        if entry.get('formula'):
+            raise AggregationError(f"계산식 측정값은 서버 집계를 지원하지 않습니다: {entry['uniqueName']}")
+        aggregation = (entry.get('aggregation') or 'sum').lower()
+        if aggregation not in AGGREGATIONS:
+            raise AggregationError(f"지원하지 않는 집계 방식입니다: {aggregation}")
+        measures.append({
+            'field': entry['uniqueName'],
+            'aggregation': aggregation,
+            'caption': entry.get('caption') or f"{entry['uniqueName']} ({aggregation})",
+        })
+
+    filters = []
+    for section in ('rows', 'columns', 'reportFilters'):
+        for entry in slice_config.get(section) or []:
+            field = entry.get('uniqueName') if isinstance(entry, dict) else None
+            rule = entry.get('filter') if field else None
+            if not rule:
+                continue
+            if rule.get('members'):
+                mode = 'exclude' if rule.get('negation') else 'include'
+                filters.append((field, mode, [_member_value(field, m) for m in rule['members']]))
+            elif rule.get('exclude'):
+                filters.append((field, 'exclude', [_member_value(field, m) for m in rule['exclude']]))
+
+    return {'rows': names('rows'), 'columns': names('columns'), 'measures': measures, 'filters': filters}
+
+
+def _text_expression(field):
+    """필드의 문자열 표현식 (명부/응답 값은 JSON 키 추출)"""
+    if field in BASE_FIELDS:
+        return Cast(F(BASE_FIELDS[field]), CharField())
+    if field.startswith(SURVEY_VALUE_PREFIX):
+        return KeyTextTransform(field[len(SURVEY_VALUE_PREFIX):], 'survey_values')
+    return KeyTextTransform(field, 'list_values')
+
+
+def _dimension_expression(field):
+    if field in BASE_FIELDS:
+        return F(BASE_FIELDS[field])
+    return _text_expression(field)
+
+
+def _filter_q(field, values, alias):
+    """표시값 목록 -> 필드 조건 (기본 정보 컬럼은 표시값을 원래 값으로 되돌려 비교, 그 외는 alias 로 비교)"""
+    if field == "수정일":
+        raise AggregationError("수정일 필터는 서버 집계를 지원하지 않습니다.")
+    condition = Q()
+    if field in BASE_FIELDS:
+        path = BASE_FIELDS[field]
+        if field in EMPTY_LABELS and EMPTY_LABELS[field] in values:
+            condition |= Q(**{f"{path}__isnull": True})
+        values = [v for v in values if v != EMPTY_LABELS.get(field)]
+        if field == "차수":
+            values = [v[:-1] if isinstance(v, str) and v.endswith('차') else v for v in values]
+        if values:
+            condition |= Q(**{f"{path}__in": values})
+        return condition
+    return Q(**{f"{alias}__in": values})
+
+
+def aggregate_report(survey_id, report_config, max_cells=None):
+    """
+    조사의 응답 자료를 report_config 기준으로 집계합니다.
+    반환: {'rows', 'columns', 'measures': [{key, field, aggregation, caption}],
+           'cells': [{차원값..., 측정값 key...}], 'cell_count', 'elapsed'}
+    """
+    started = time.monotonic()
+    spec = parse_report(report_config)
+    dimensions = spec['rows'] + [f for f in spec['columns'] if f not in spec['rows']]
+    max_cells = max_cells or MAX_CELLS
+
+    queryset = pivot_queryset(survey_id).order_by()
+
+    # 필터 (명부/응답 값은 JSON 키를 alias 로 꺼내 비교)
+    for i, (field, mode, values) in enumerate(spec['filters']):
+        alias = f"_f{i}"
+        if field not in BASE_FIELDS:
+            # KeyTextTransform 의 __in 은 JSON 값 비교가 되므로 문자열로 변환 후 비교
+            queryset = queryset.alias(**{alias: Cast(_text_expression(field), CharField())})
+        condition = _filter_q(field, values, alias)
+        queryset = queryset.exclude(condition) if mode == 'exclude' else queryset.filter(condition)
+
+    dim_aliases = {f"_d{i}": _dimension_expression(field) for i, field in enumerate(dimensions)}
+    queryset = queryset.annotate(**dim_aliases) if dim_aliases else queryset
+
+    aggregates = {}
+    measures = []
+    for i, measure in enumerate(spec['measures']):
+        text_alias = f"_m{i}_txt"
+        queryset = queryset.alias(**{text_alias: _text_expression(measure['field'])})
+        numeric = Case(
+            When(**{f"{text_alias}__regex": NUMERIC_PATTERN}, then=Cast(text_alias, FloatField())),
+            default=None, output_field=FloatField(),
+        )
+        key = f"{measure['aggregation']}({measure['field']})"
+        agg = measure['aggregation']
+        if agg == 'count':
+            aggregates[f"_a{i}"] = Count(text_alias)
+        elif agg == 'distinctcount':
+            aggregates[f"_a{i}"] = Count(text_alias, distinct=True)
+        elif agg == 'sum':
+            aggregates[f"_a{i}"] = Sum(numeric)
+        elif agg == 'min':
+            aggregates[f"_a{i}"] = Min(numeric)
+        elif agg == 'max':
+            aggregates[f"_a{i}"] = Max(numeric)
+        elif agg == 'average':
+            aggregates[f"_a{i}_sum"] = Sum(numeric)
+            aggregates[f"_a{i}_count"] = Count(numeric)
+        measures.append({**measure, 'key': key, 'alias': f"_a{i}"})
+
+    if not aggregates:
+        aggregates['_a0'] = Count('id')
+        measures.append({'field': 'ID', 'aggregation': 'count', 'caption': '응답자 수', 'key': 'count(ID)', 'alias': '_a0'})
+
+    if dim_aliases:
+        rows = queryset.values(*dim_aliases).annotate(**aggregates).order_by(*dim_aliases)
+        rows = list(rows[:max_cells + 1])
+    else:
+        rows = [queryset.aggregate(**aggregates)]
+    if len(rows) > max_cells:
+        raise AggregationError(f"집계 결과가 너무 큽니다. (최대 {max_cells:,}셀) 행/열 필드를 줄여주세요.")
+
+    cells = []
+    for row in rows:
+        cell = {}
+        for alias, field in zip(dim_aliases, dimensions):
+            value = row[alias]
+            cell[field] = format_base_value(field, value) if field in BASE_FIELDS else value
+        for measure in measures:
+            key, alias = measure['key'], measure['alias']
+            if measure['aggregation'] == 'average':
+                total, count = row[f"{alias}_sum"], row[f"{alias}_count"]
+                cell[f"{key}__sum"] = total
+                cell[f"{key}__count"] = count
+                cell[key] = total / count if count else None
+            else:
+                cell[key] = row[alias]
+        cells.append(cell)
+
+    return {
+        'rows': spec['rows'],
+        'columns': spec['columns'],
+        'measures': [{k: v for k, v in m.items() if k != 'alias'} for m in measures],
+        'cells': cells,
+        'cell_count': len(cells),
+        'elapsed': round(time.monotonic() - started, 3),
+    }
+
+
+def viewer_report(report_config, cube):
+    """
+    집계 결과(cube)를 WebDataRocks 에 그대로 얹을 수 있도록 report 를 변환합니다.
+    (dataSource 는 호출측에서 cube['cells'] 로 지정, 측정값은 셀 값을 다시 합산/최소/최대하는 방식으로 교체)
+    """
+    report = {k: v for k, v in (report_config or {}).items() if k != 'dataSource'}
+    slice_config = dict(report.get('slice') or {})
+    rollup = {'count': 'sum', 'distinctcount': 'sum', 'sum': 'sum', 'min': 'min', 'max': 'max'}
+
+    measures = []
+    for measure in cube['measures']:
+        key = measure['key']
+        if measure['aggregation'] == 'average':
+            measures.append({
+                'uniqueName': key, 'caption': measure['caption'],
+                'formula': f'sum("{key}__sum") / sum("{key}__count")',
+            })
+        else:
+            measures.append({'uniqueName': key, 'caption': measure['caption'], 'aggregation': rollup[measure['aggregation']]})
+    slice_config['measures'] = measures
+    slice_config.pop('reportFilters', None)  # 서버에서 이미 적용됨 (셀에는 해당 필드가 없음)
+    report['slice'] = slice_config
+    return report
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class SurveysConfig(AppConfig):
     name = 'surveys'
+
+    def ready(self):
+        # 권한 캐시 무효화 시그널 등록
+        from . import access  # noqa: F401
@@ -0,0 +1,192 @@
+# surveys/area_tree.py
+"""
+조사별 권역 트리 (구체화 경로 + 트리 캐시)
+
+권역 하위 범위 조회를 권역코드 접두어(area_code__startswith) 규칙이나
+children 재귀 조회(노드마다 쿼리 1회) 대신 아래 두 가지로 처리합니다.
+- DB: SurveyArea.path (루트부터 자신까지의 ID 경로, 예: /3/17/254/)
+      → subtree_q() 가 만드는 path 접두어 조건은 인덱스로 처리됩니다.
+- 메모리: 조사별 AreaTree 캐시 → descendant_ids(area_id) 는 미리 계산된 목록을 바로 반환
+
+캐시 구조는 form_bundle 과 같습니다.
+- 공유 캐시(settings.CACHES): 조사별 세대(generation) 토큰과 트리 원본 데이터
+- 프로세스 로컬: (세대 토큰, AreaTree)
+권역 설계가 바뀌면 rebuild_area_paths() 가 경로를 일괄 갱신하고 세대 토큰을 교체합니다.
+"""
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from .models import SurveyArea
+
+TREE_TIMEOUT = 60 * 60 * 24  # 공유 캐시 보관 시간 (세대 토큰이 바뀌면 자연히 무시됨)
+
+_local_trees = {}
+_local_lock = threading.Lock()
+
+
+def _gen_key(survey_id):
+    return f"area_tree:gen:{survey_id}"
+
+def _data_key(survey_id, generation):
+    return f"area_tree:data:{survey_id}:{generation}"
+
+
+def area_path(parent_path, area_id):
+    """부모 경로 + 자신의 ID 로 경로 문자열을 만듭니다. (루트는 parent_path='')"""
+    return f"{parent_path or '/'}{area_id}/"
+
+
+def subtree_q(area, field='area'):
+    """
+    권역과 그 하위 권역 전체에 해당하는 조건 (Q)
+    - field: 권역 FK 경로 (SurveyData 면 'area', SurveyArea 자체면 None)
+    - area: SurveyArea 또는 AreaNode (path 속성 사용)
+    """
+    lookup = f"{field}__path__startswith" if field else 'path__startswith'
+    return Q(**{lookup: area.path})
+
+
+class AreaNode:
+    __slots__ = ('id', 'parent_id', 'area_code', 'area_name', 'level', 'path')
+
+    def __init__(self, id, parent_id, area_code, area_name, level, path):
+        self.id = id
+        self.parent_id = parent_id
+        self.area_code = area_code
+        self.area_name = area_name
+        self.level = level
+        self.path = path
+
+
+class AreaTree:
+    """조사의 권역 트리 (읽기 전용으로 사용)"""
+
+    def __init__(self, data):
+        self.survey_id = data['survey_id']
+        self.nodes = {row[0]: AreaNode(*row) for row in data['areas']}
+        self.by_code = {node.area_code: node for node in self.nodes.values()}
+        self.children = {}
+        for node in self.nodes.values():
+            self.children.setdefault(node.parent_id, []).append(node.id)
+
+        # 전위 순회로 노드별 하위 권역(자신 포함) 목록을 한 번에 계산
+        order = []
+        stack = list(reversed(self.children.get(None, [])))
+        while stack:
+            area_id = stack.pop()
+            order.append(area_id)
+            stack.extend(reversed(self.children.get(area_id, [])))
+        position = {area_id: i for i, area_id in enumerate(order)}
+        # 하위 범위 끝 위치: 자식이 없으면 자기 자신, 있으면 마지막 자식 범위의 끝
+        subtree_end = {}
+        for area_id in reversed(order):
+            kids = self.children.get(area_id)
+            subtree_end[area_id] = subtree_end[kids[-1]] if kids else position[area_id] + 1
+        self._descendants = {
+            area_id: tuple(order[position[area_id]:subtree_end[area_id]]) for area_id in order
+        }
+
+    def get(self, area_id):
+        return self.nodes.get(area_id)
+
+    def descendant_ids(self, area_id):
+        """자신을 포함한 하위 권역 ID 목록 (없는 권역이면 빈 목록)"""
+        return self._descendants.get(area_id, ())
+
+    def ancestor_ids(self, area_id):
+        """루트부터 자신까지의 권역 ID 목록"""
+        node = self.nodes.get(area_id)
+        return [int(part) for part in node.path.strip('/').split('/')] if node and node.path else []
+
+    def is_within(self, area_id, root_id):
+        """area_id 가 root_id 권역(자신 포함)의 하위에 속하는지"""
+        node, root = self.nodes.get(area_id), self.nodes.get(root_id)
+        return bool(node and root and node.path.startswith(root.path))
+
+
+def build_tree_data(survey_id):
+    areas = SurveyArea.objects.filter(survey_id=survey_id).order_by('level', 'area_code').values_list(
+        'id', 'parent_id', 'area_code', 'area_name', 'level', 'path'
+    )
+    return {'survey_id': survey_id, 'areas': [list(row) for row in areas]}
+
+
+def _current_generation(survey_id):
+    key = _gen_key(survey_id)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def tree_generation(survey_id):
+    """권역 트리의 세대 토큰 (트리가 바뀌면 달라짐 - 조건부 요청 검증값용)"""
+    return _current_generation(survey_id)
+
+
+def get_area_tree(survey):
+    """조사(또는 조사 ID)의 권역 트리를 반환합니다."""
+    survey_id = survey if isinstance(survey, int) else survey.id
+    generation = _current_generation(survey_id)
+
+    with _local_lock:
+        cached = _local_trees.get(survey_id)
+    if cached and cached[0] == generation:
+        return cached[1]
+
+    data_key = _data_key(survey_id, generation)
+    data = cache.get(data_key)
+    if data is None:
+        data = build_tree_data(survey_id)
+        cache.set(data_key, data, TREE_TIMEOUT)
+
+    tree = AreaTree(data)
+    with _local_lock:
+        _local_trees[survey_id] = (generation, tree)
+    return tree
+
+
+def invalidate_area_tree(survey_id):
+    """조사의 권역 트리 캐시를 무효화합니다. (트랜잭션 안이면 커밋 이후)"""
+    def _bump():
+        cache.set(_gen_key(survey_id), time.time_ns(), None)
+        with _local_lock:
+            _local_trees.pop(survey_id, None)
+    transaction.on_commit(_bump)
+
+
+def rebuild_area_paths(survey_id):
+    """
+    조사의 모든 권역 경로(path)를 parent 관계 기준으로 다시 계산해 일괄 저장합니다.
+    반환: 변경된 권역 수
+    """
+    areas = list(SurveyArea.objects.filter(survey_id=survey_id).only('id', 'parent_id', 'path'))
+    by_id = {area.id: area for area in areas}
+    paths = {}
+
+    def resolve(area):
+        # 부모 체인을 따라 올라가며 경로 계산 (깊이가 얕으므로 반복으로 처리)
+        chain = []
+        while area.id not in paths:
+            chain.append(area)
+            parent = by_id.get(area.parent_id)
+            if parent is None or parent in chain:
+                break
+            area = parent
+        for node in reversed(chain):
+            paths[node.id] = area_path(paths.get(node.parent_id, ''), node.id)
+
+    for area in areas:
+        resolve(area)
+
+    changed = [area for area in areas if area.path != paths[area.id]]
+    for area in changed:
+        area.path = paths[area.id]
+    SurveyArea.objects.bulk_update(changed, ['path'], batch_size=1000)
+    invalidate_area_tree(survey_id)
+    return len(changed)
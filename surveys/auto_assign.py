@@ -0,0 +1,215 @@
+# surveys/auto_assign.py
+"""
+업무량 자동 배정 (권역별 균등 배분, SQL 일괄 처리)
+
+각 권역의 미배정 원본 명부(degree 없음)를 그 권역에 배정된 조사원(SurveyAreaUser, 권역관리자 제외)에게
+나눠 배정합니다.
+- 균등 기준: 건수(기본) 또는 명부 항목 값(weight_field, 예: 종사자수)의 합계
+- 이미 배정된 업무량을 포함해 조사원별 총량이 같아지도록 배분 (부족한 조사원부터 채움)
+
+계산 방식
+1. 권역별 미배정 총량 / 조사원별 기존 배정량을 집계 (GROUP BY 2회)
+2. 파이썬에서 조사원별 누적 경계(lo, hi] 를 계산 (배정 계획)
+3. 미배정 행에 권역별 누적 업무량(SUM() OVER / ROW_NUMBER)을 매기고 계획과 조인
+   - 미리보기(dry-run): 조인 결과를 조사원별로 집계만 함
+   - 실행: 같은 조인으로 UPDATE ... FROM 한 문장 (권역 단위로 묶어 계획 행 약 PLAN_BATCH 개씩), 이후 해당 권역 진행 현황 재계산
+     배정된 행은 다음 묶음의 누적 업무량 계산에서 빠지므로, 한 권역의 계획은 반드시 같은 묶음에서 실행
+"""
+from django.db import connection, transaction
+from django.db.models import Case, F, FloatField, Sum, Value, When, Window
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import Cast, RowNumber
+
+from .area_tree import subtree_q
+from .models import SurveyAreaUser, SurveyData
+from .progress import recount
+from .snapshots import record_data_change
+from .sql_cache import mark_data_changed
+
+PLAN_BATCH = 1000
+NUMERIC_PATTERN = r'^[0-9]+(\.[0-9]+)?$'
+OPEN_END = 1e18  # 권역 마지막 조사원의 상한 (부동소수 오차로 남는 행이 없도록)
+
+
+def _weight_expression(weight_field):
+    """행별 업무량: weight_field 가 없으면 1, 있으면 숫자 값 (숫자가 아니면 1)"""
+    if not weight_field:
+        return Value(1.0)
+    return Case(
+        When(**{f"list_values__{weight_field}__regex": NUMERIC_PATTERN},
+             then=Cast(KeyTextTransform(weight_field, 'list_values'), FloatField())),
+        default=Value(1.0),
+        output_field=FloatField(),
+    )
+
+
+def _scope_queryset(survey, root_area=None, roster_id=None):
+    queryset = SurveyData.objects.filter(roster__survey=survey, degree__isnull=True, area__isnull=False)
+    if root_area is not None:
+        queryset = queryset.filter(subtree_q(root_area))
+    if roster_id:
+        queryset = queryset.filter(roster_id=roster_id)
+    return queryset
+
+
+def _balance(total, loads):
+    """
+    기존 업무량(loads: {user_id: 양})에 total 을 더해 조사원별 총량이 최대한 같아지도록 나눌 몫을 계산
+    반환: [(user_id, 추가량)] (user_id 순)
+    """
+    users = sorted(loads)
+    levels = sorted(loads[u] for u in users)
+    # 채울 수위(level) 찾기: sum(max(0, level - load)) == total
+    remaining, level = total, levels[0]
+    for i, load in enumerate(levels):
+        following = levels[i + 1] if i + 1 < len(levels) else None
+        width = i + 1
+        if following is None or (following - load) * width >= remaining:
+            level = load + remaining / width
+            break
+        remaining -= (following - load) * width
+    return [(u, max(0.0, level - loads[u])) for u in users]
+
+
+def build_plan(survey, root_area=None, roster_id=None, weight_field=None):
+    """
+    배정 계획을 계산합니다.
+    반환: (plan, summary)
+      plan    : [(area_id, lo, hi, user_id)] - 누적 업무량 (lo, hi] 구간의 행을 user 에게 배정
+      summary : 권역별 {area_id, total, surveyors: [{user_id, existing, planned}]} 및 조사원 없는 권역
+    """
+    scope = _scope_queryset(survey, root_area, roster_id)
+    weight = _weight_expression(weight_field)
+
+    # 권역별 조사원 (권역관리자 제외)
+    surveyors = {}
+    mappings = SurveyAreaUser.objects.filter(survey=survey, is_manager=False).values_list('area_id', 'user_id')
+    if root_area is not None:
+        mappings = mappings.filter(subtree_q(root_area))
+    for area_id, user_id in mappings:
+        surveyors.setdefault(area_id, set()).add(user_id)
+
+    unassigned = dict(
+        scope.filter(assigned_user__isnull=True).values('area_id').annotate(amount=Sum(weight)).values_list('area_id', 'amount')
+    )
+    existing = {}
+    for area_id, user_id, amount in scope.filter(assigned_user__isnull=False).values(
+        'area_id', 'assigned_user_id'
+    ).annotate(amount=Sum(weight)).values_list('area_id', 'assigned_user_id', 'amount'):
+        existing[(area_id, user_id)] = amount or 0.0
+
+    plan, areas, unassignable = [], [], []
+    for area_id, total in sorted(unassigned.items()):
+        users = surveyors.get(area_id)
+        if not users:
+            unassignable.append({'area_id': area_id, 'total': total})
+            continue
+        shares = _balance(total, {u: existing.get((area_id, u), 0.0) for u in users})
+        positive = [(u, share) for u, share in shares if share > 0]
+        bound = 0.0
+        for i, (user_id, share) in enumerate(positive):
+            upper = OPEN_END if i == len(positive) - 1 else bound + share
+            plan.append((area_id, bound, upper, user_id))
+            bound = upper
+        areas.append({
+            'area_id': area_id,
+            'total': total,
+            'surveyors': [
+                {'user_id': u, 'existing': existing.get((area_id, u), 0.0), 'planned': share}
+                for u, share in shares
+            ],
+        })
+    return plan, {'areas': areas, 'unassignable': unassignable}
+
+
+def _ranked_sql(survey, root_area, roster_id, weight_field):
+    """미배정 행 + 권역별 누적 업무량(cw) SELECT 문"""
+    ranked = _scope_queryset(survey, root_area, roster_id).filter(assigned_user__isnull=True).annotate(
+        w=_weight_expression(weight_field),
+    ).annotate(
+        cw=Window(Sum('w'), partition_by=[F('area_id')], order_by=[F('id').asc()])
+        if weight_field else
+        Window(RowNumber(), partition_by=[F('area_id')], order_by=[F('id').asc()]),
+    ).values('id', 'area_id', 'w', 'cw')
+    return ranked.query.sql_with_params()
+
+
+def _plan_batches(plan):
+    """
+    계획을 권역 단위로 나눠 묶습니다. (묶음당 계획 행 약 PLAN_BATCH 개, 권역은 나누지 않음)
+    권역의 일부 조사원만 먼저 배정하면 남은 행의 누적 업무량(cw)이 다시 0부터 시작해 계획 구간과 어긋납니다.
+    """
+    batch = []
+    for i, row in enumerate(plan):
+        batch.append(row)
+        area_end = i + 1 == len(plan) or plan[i + 1][0] != row[0]
+        if area_end and len(batch) >= PLAN_BATCH:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _plan_cte(batch):
+    values = ', '.join(['(%s, %s, %s, %s)'] * len(batch))
+    params = [value for row in batch for value in row]
+    return f"plan(area_id, lo, hi, user_id) AS (VALUES {values})", params
+
+
+def _run_plan(survey, plan, root_area, roster_id, weight_field, apply):
+    """계획을 실행(apply=True) 또는 조사원별 결과만 집계(dry-run)합니다."""
+    ranked_sql, ranked_params = _ranked_sql(survey, root_area, roster_id, weight_field)
+    table = connection.ops.quote_name(SurveyData._meta.db_table)
+    result = {}
+    with connection.cursor() as cursor:
+        for batch in _plan_batches(plan):
+            plan_cte, plan_params = _plan_cte(batch)
+            cte = f"WITH ranked AS ({ranked_sql}), {plan_cte} "
+            join = "ranked JOIN plan ON ranked.area_id = plan.area_id AND ranked.cw > plan.lo AND ranked.cw <= plan.hi"
+            if apply:
+                cursor.execute(
+                    cte + f"UPDATE {table} SET assigned_user_id = plan.user_id FROM {join} "
+                    f"WHERE {table}.id = ranked.id",
+                    [*ranked_params, *plan_params],
+                )
+            else:
+                cursor.execute(
+                    cte + f"SELECT plan.area_id, plan.user_id, COUNT(*), SUM(ranked.w) FROM {join} "
+                    "GROUP BY plan.area_id, plan.user_id",
+                    [*ranked_params, *plan_params],
+                )
+                for area_id, user_id, rows, amount in cursor.fetchall():
+                    result[(area_id, user_id)] = (rows, amount or 0.0)
+    return result
+
+
+def auto_assign(survey, root_area=None, roster_id=None, weight_field=None, dry_run=True):
+    """
+    자동 배정 미리보기/실행
+    root_area: 관할 권역(SurveyArea/AreaNode, 하위 포함) - None 이면 조사 전체
+    반환: {'dry_run', 'weight_field', 'assigned', 'areas': [...], 'unassignable': [...]}
+      areas[].surveyors[]: user_id, existing(기존량), planned(계획량)
+                           + 미리보기에서는 rows(배정될 건수), amount(배정될 양)
+    """
+    unassigned = _scope_queryset(survey, root_area, roster_id).filter(assigned_user__isnull=True)
+    with transaction.atomic():
+        plan, summary = build_plan(survey, root_area, roster_id, weight_field)
+        if dry_run:
+            result = _run_plan(survey, plan, root_area, roster_id, weight_field, apply=False)
+        else:
+            # UPDATE ... FROM 의 rowcount 는 DB 마다 달라(SQLite: -1) 남은 미배정 건수로 계산
+            before = unassigned.count()
+            _run_plan(survey, plan, root_area, roster_id, weight_field, apply=True)
+            assigned = before - unassigned.count()
+            # 배정이 바뀐 권역의 진행 현황 카운터 재계산
+            recount(survey.id, [area['area_id'] for area in summary['areas']])
+            mark_data_changed()
+            record_data_change(survey.id, assigned)
+
+    if dry_run:
+        assigned = 0
+        for area in summary['areas']:
+            for s in area['surveyors']:
+                s['rows'], s['amount'] = result.get((area['area_id'], s['user_id']), (0, 0.0))
+                assigned += s['rows']
+    return {'dry_run': dry_run, 'weight_field': weight_field, 'assigned': assigned, **summary}
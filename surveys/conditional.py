@@ -0,0 +1,148 @@
+# surveys/conditional.py
+"""
+조회 API 조건부 요청 (ETag / Last-Modified -> 304 Not Modified)
+
+응답 본문을 만들지 않고 수정일/버전/세대 토큰만 읽어 검증값을 계산합니다.
+클라이언트가 보낸 If-None-Match / If-Modified-Since 와 같으면 본 처리 없이 304 로 응답하고,
+응답에는 Cache-Control: private, no-cache 를 붙여 브라우저가 매번 검증값으로 재확인하게 합니다.
+
+- 입력 팝업(get_survey_data)   : 원본/응답 행 수정일 + 차수 + 조사표 번들 세대 + 재검증 세대 (쿼리 1회 + 캐시)
+- 분석 목록(get_analysis_list)  : 분석 id/수정일 목록 (+ full 파라미터)
+- 조사표 버전 목록              : 버전별 id/설계 수정 차수(revision)/확정 여부 (design_data 는 읽지 않음)
+- 조사표 버전 설계              : 설계 블롭 해시 + 확정 여부
+- 명부 설정(get_roster_config)  : mapping_config
+- 피벗 데이터                   : 조사 데이터 버전(snapshots.data_version) + 권역 트리 세대 + 요청 파라미터
+검증값을 구할 수 없으면(대상 없음 등) None 을 반환해 본 처리(404 등)로 넘깁니다.
+"""
+from datetime import datetime, timezone as dt_timezone
+from hashlib import sha1
+
+from django.db.models import OuterRef, Subquery
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from .area_tree import tree_generation
+from .form_bundle import bundle_generation
+from .models import QuestionnaireVersion, SurveyAnalysis, SurveyData, SurveyDegree, SurveyFlatTable, SurveyRoster
+from .revalidation import revalidation_generation
+from .snapshots import data_version
+
+
+def conditional_get(etag_func=None, last_modified_func=None):
+    """조건부 GET 처리 + 매번 재검증(Cache-Control: private, no-cache) 데코레이터"""
+    def decorator(view):
+        view = condition(etag_func=etag_func, last_modified_func=last_modified_func)(view)
+        return cache_control(private=True, no_cache=True)(view)
+    return decorator
+
+
+def _digest(*parts):
+    return sha1(repr(parts).encode('utf-8')).hexdigest()
+
+
+def _memo(request, name, compute):
+    """ETag 와 Last-Modified 함수가 같은 조회를 두 번 하지 않도록 요청 단위로 보관"""
+    memo = getattr(request, '_conditional', None)
+    if memo is None:
+        memo = request._conditional = {}
+    if name not in memo:
+        memo[name] = compute()
+    return memo[name]
+
+
+def _generation_time(generation):
+    """세대 토큰(time.time_ns) -> 시각"""
+    return datetime.fromtimestamp(generation / 1e9, tz=dt_timezone.utc)
+
+
+# ==========================================
+# 입력 팝업 (get_survey_data)
+# ==========================================
+
+def _survey_data_state(request, data_id):
+    degree_id = request.GET.get('degree_id')
+    if not degree_id or not degree_id.isdigit():
+        return None
+
+    def compute():
+        responses = SurveyData.objects.filter(
+            roster_id=OuterRef('roster_id'), respondent_id=OuterRef('respondent_id'), degree_id=degree_id
+        )
+        degree = SurveyDegree.objects.filter(pk=degree_id)
+        row = SurveyData.objects.filter(pk=data_id).annotate(
+            response_id=Subquery(responses.values('id')[:1]),
+            response_updated=Subquery(responses.values('updated_at')[:1]),
+            degree_number=Subquery(degree.values('degree_number')[:1]),
+            degree_title=Subquery(degree.values('degree_title')[:1]),
+        ).values_list(
+            'roster_id', 'updated_at', 'roster__survey__survey_year',
+            'response_id', 'response_updated', 'degree_number', 'degree_title',
+        ).first()
+        if row is None or row[0] is None or row[5] is None:
+            return None
+        # 재검증이 경고/오류를 반영하면 검증값이 바뀌도록 명부의 재검증 세대도 포함
+        return row, bundle_generation(row[0]), revalidation_generation(row[0])
+
+    return _memo(request, 'survey_data', compute)
+
+
+def survey_data_etag(request, data_id):
+    state = _survey_data_state(request, data_id)
+    return _digest('survey_data', data_id, *state) if state else None
+
+
+def survey_data_last_modified(request, data_id):
+    state = _survey_data_state(request, data_id)
+    if not state:
+        return None
+    row, generation, revalidated = state
+    times = [row[1], row[4], _generation_time(generation)]
+    if revalidated:
+        times.append(_generation_time(revalidated))
+    return max(filter(None, times))
+
+
+# ==========================================
+# 분석 목록 / 조사표 버전 / 명부 설정
+# ==========================================
+
+def analysis_list_etag(request, survey_id):
+    rows = list(SurveyAnalysis.objects.filter(survey_id=survey_id).order_by('id').values_list('id', 'updated_at'))
+    return _digest('analysis_list', survey_id, request.GET.get('full'), rows)
+
+
+def questionnaire_versions_etag(request, q_id):
+    rows = list(
+        QuestionnaireVersion.objects.filter(questionnaire_id=q_id).order_by('id')
+        .values_list('id', 'revision', 'is_confirmed')
+    )
+    return _digest('questionnaire_versions', q_id, rows)
+
+
+def version_design_etag(request, v_id):
+    # 블롭 해시가 곧 설계 내용의 검증값 (설계 본문은 읽지 않음)
+    row = QuestionnaireVersion.objects.filter(pk=v_id).values_list('design_blob__digest', 'is_confirmed').first()
+    return _digest('version_design', v_id, *row) if row is not None else None
+
+
+def roster_config_etag(request, roster_id):
+    row = SurveyRoster.objects.filter(pk=roster_id).values_list('mapping_config', flat=True).first()
+    return _digest('roster_config', roster_id, row) if row is not None else None
+
+
+# ==========================================
+# 피벗 데이터 (survey_pivot_data_api)
+# ==========================================
+
+def pivot_data_etag(request, survey_id):
+    if request.GET.get('async') == '1':  # 작업 등록 요청은 검증 대상 아님
+        return None
+    params = sorted((key, request.GET.get(key)) for key in ('source', 'format', 'fields', 'analysis'))
+    parts = ['pivot', survey_id, params, data_version(survey_id), tree_generation(survey_id)]
+    if request.GET.get('source') == 'flat':
+        parts.append(SurveyFlatTable.objects.filter(survey_id=survey_id).values_list('built_at', 'is_stale').first())
+    elif request.GET.get('analysis', '').isdigit():
+        parts.append(
+            SurveyAnalysis.objects.filter(pk=request.GET['analysis']).values_list('updated_at', flat=True).first()
+        )
+    return _digest(*parts)
@@ -0,0 +1,76 @@
+# surveys/design_manifest.py
+"""
+컴파일된 조사표 설계 매니페스트 (확정 버전별)
+
+조사표 버전을 확정할 때(confirm_questionnaire_version) 설계(design_data)를 한 번 훑어
+조회용 구조를 만들어 QuestionnaireVersion.manifest 에 저장합니다.
+실행 중에는 design_data 목록을 다시 훑지 않고 매니페스트를 키로 바로 조회합니다.
+
+{
+  "format": 1,
+  "item_count": 문항 수,
+  "origin_map": {originId: 실제 문항 id},                            # 내검 규칙 컴파일 (form_bundle)
+  "flat_columns": [평면 테이블 컬럼 정의 (조사표명/ver_form_id 제외)]   # flat_table.build_flat_columns
+}
+이미 확정된 버전은 마이그레이션(0021_backfill_manifests)으로 채웁니다.
+조회 경로(version_manifests)는 저장하지 않으며, 매니페스트가 없는 버전만 메모리에서 컴파일합니다.
+"""
+from .design_store import load_designs
+
+MANIFEST_FORMAT = 1
+
+
+def compile_manifest(design_data):
+    origin_map = {}
+    flat_columns = []
+
+    for q in design_data or []:
+        if not isinstance(q, dict) or not q.get('id'):
+            continue
+        item_id = q['id']
+        item_type = q.get('type', 'text')
+        label = q.get('label', item_id)
+        if q.get('originId'):
+            origin_map[q['originId']] = item_id
+
+        if item_type == 'table':
+            sub_items = [{'id': s['id'], 'label': s.get('label', s['id'])} for s in q.get('subItems') or []]
+            flat_columns.append({'kind': 'table', 'item_id': item_id, 'label': label,
+                                 'row_labels': q.get('rowLabels') or [], 'sub_items': sub_items})
+        elif item_type == 'mapping-table':
+            for cell in (q.get('cells') or {}).values():
+                cell_label = cell.get('label', cell['id'])
+                flat_columns.append({'kind': 'item', 'item_id': cell['id'], 'label': cell_label, 'type': 'text'})
+        else:
+            flat_columns.append({'kind': 'item', 'item_id': item_id, 'label': label,
+                                 'type': 'number' if item_type == 'number' else 'text'})
+
+    return {
+        'format': MANIFEST_FORMAT,
+        'item_count': len(design_data or []),
+        'origin_map': origin_map,
+        'flat_columns': flat_columns,
+    }
+
+
+def is_current(manifest):
+    return isinstance(manifest, dict) and manifest.get('format') == MANIFEST_FORMAT
+
+
+def version_manifests(versions):
+    """
+    {버전 id: 매니페스트} (읽기 전용)
+    매니페스트가 없는 버전은 설계 블롭을 한 번에 읽어 메모리에서 컴파일합니다. (저장하지 않음)
+    """
+    manifests = {}
+    missing = []
+    for v in versions:
+        if is_current(v.manifest):
+            manifests[v.id] = v.manifest
+        else:
+            missing.append(v)
+    if missing:
+        designs = load_designs([v.design_blob_id for v in missing])
+        for v in missing:
+            manifests[v.id] = compile_manifest(designs.get(v.design_blob_id, []))
+    return manifests
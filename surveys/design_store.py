@@ -0,0 +1,214 @@
+# surveys/design_store.py
+"""
+조사표 설계(design_data) 저장소 - 내용 해시 기반 블롭 (DesignBlob)
+
+QuestionnaireVersion 은 설계 JSON 을 직접 갖지 않고 블롭을 참조합니다. (version.design_data 는 복원 값)
+- 중복 제거: 정규화 JSON(키 정렬)의 SHA-256 이 같으면 같은 블롭을 공유 (복사한 버전 등)
+- 델타 저장: 직전 버전 블롭 대비 바뀐 문항만 저장 {"order": [문항 id...], "items": {문항 id: 문항}}
+  문항 id 가 없거나 중복이면, 델타가 전체의 DELTA_MAX_RATIO 보다 크면, 체인이 DELTA_MAX_DEPTH 를 넘으면 전체 저장
+- 자동 저장: 내용이 같으면 쓰기 없음. 바뀌면 새 블롭으로 교체하고 아무도 참조하지 않는 이전 블롭은 삭제
+  저장/삭제 모두 블롭 행을 잠가, 삭제 중인 블롭을 새 버전이 참조하지 않도록 합니다.
+- 복원: 블롭은 만들어진 뒤 바뀌지 않으므로 블롭 id 기준 프로세스 로컬 LRU 에 정규화 JSON 을 보관
+  여러 버전은 load_designs 로 한 번에 복원 (DB 조회는 체인 깊이만큼)
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+
+from .models import DesignBlob, QuestionnaireVersion
+
+DELTA_MAX_DEPTH = getattr(settings, 'DESIGN_DELTA_MAX_DEPTH', 8)
+DELTA_MAX_RATIO = getattr(settings, 'DESIGN_DELTA_MAX_RATIO', 0.5)
+
+_DESIGN_CACHE = OrderedDict()
+_DESIGN_CACHE_SIZE = 512
+_cache_lock = threading.Lock()
+
+
+def _canonical(value):
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+
+
+def design_digest(items):
+    """(SHA-256, 정규화 JSON)"""
+    text = _canonical(items)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest(), text
+
+
+# ==========================================
+# 델타 (문항 단위)
+# ==========================================
+
+def _item_ids(items):
+    """문항 id 목록 (id 가 없거나 중복이면 None)"""
+    ids = [item.get('id') if isinstance(item, dict) else None for item in items]
+    if not all(isinstance(i, str) for i in ids) or len(set(ids)) != len(ids):
+        return None
+    return ids
+
+
+def make_delta(base_items, items):
+    """base_items -> items 델타 (문항 단위 비교가 불가능하면 None)"""
+    ids = _item_ids(items)
+    base_ids = _item_ids(base_items)
+    if ids is None or base_ids is None:
+        return None
+    base_map = dict(zip(base_ids, base_items))
+    return {
+        'order': ids,
+        'items': {i: item for i, item in zip(ids, items) if base_map.get(i) != item},
+    }
+
+
+def apply_delta(base_items, delta):
+    base_map = {item['id']: item for item in base_items}
+    changed = delta['items']
+    return [changed[i] if i in changed else base_map[i] for i in delta['order']]
+
+
+# ==========================================
+# 복원
+# ==========================================
+
+def _cache_get(blob_id):
+    with _cache_lock:
+        text = _DESIGN_CACHE.get(blob_id)
+        if text is not None:
+            _DESIGN_CACHE.move_to_end(blob_id)
+        return text
+
+
+def _cache_put(blob_id, text):
+    with _cache_lock:
+        _DESIGN_CACHE[blob_id] = text
+        while len(_DESIGN_CACHE) > _DESIGN_CACHE_SIZE:
+            _DESIGN_CACHE.popitem(last=False)
+
+
+def load_designs(blob_ids):
+    """블롭들의 설계를 복원합니다. {blob_id: 설계(list)} (호출마다 새 객체)"""
+    texts = {}
+    for blob_id in set(filter(None, blob_ids)):
+        text = _cache_get(blob_id)
+        if text is not None:
+            texts[blob_id] = text
+
+    # 캐시에 없는 블롭과 그 기준 블롭들을 체인 깊이 단위로 조회
+    rows = {}
+    pending = set(filter(None, blob_ids)) - set(texts)
+    while pending:
+        for blob_id, base_id, content in DesignBlob.objects.filter(pk__in=pending).values_list('id', 'base_id', 'content'):
+            rows[blob_id] = (base_id, content)
+        pending = set()
+        for base_id, _ in rows.values():
+            if base_id and base_id not in rows and base_id not in texts:
+                text = _cache_get(base_id)
+                if text is None:
+                    pending.add(base_id)
+                else:
+                    texts[base_id] = text
+
+    def resolve(blob_id):
+        if blob_id not in texts:
+            base_id, content = rows[blob_id]
+            items = apply_delta(resolve(base_id), content) if base_id else content
+            texts[blob_id] = _canonical(items)
+            _cache_put(blob_id, texts[blob_id])
+        return json.loads(texts[blob_id])
+
+    return {blob_id: resolve(blob_id) for blob_id in set(filter(None, blob_ids)) if blob_id in texts or blob_id in rows}
+
+
+def resolve_design(blob_id):
+    """블롭 1건의 설계 (블롭 없음 -> [])"""
+    if not blob_id:
+        return []
+    return load_designs([blob_id]).get(blob_id, [])
+
+
+# ==========================================
+# 저장
+# ==========================================
+
+def store_design(items, base_blob_id=None):
+    """
+    설계를 블롭으로 저장합니다. 같은 내용의 블롭이 있으면 그대로 반환합니다.
+    base_blob_id: 델타 기준 블롭 (보통 직전 버전의 블롭)
+    반환한 블롭(과 델타 기준 블롭)은 잠겨 있으므로, 호출측 트랜잭션에서 버전에 지정하면
+    동시에 실행 중인 release_blob 이 지우지 못합니다. (지우는 중이었으면 끝난 뒤 새로 만듦)
+    """
+    digest, text = design_digest(items)
+    with transaction.atomic():
+        blob = DesignBlob.objects.select_for_update().filter(digest=digest).only('id', 'digest', 'depth').first()
+        if blob is not None:
+            return blob
+
+        content, base, depth = items, None, 0
+        if base_blob_id:
+            base = DesignBlob.objects.select_for_update().filter(pk=base_blob_id).only('id', 'depth').first()
+            delta = None
+            if base is not None and base.depth < DELTA_MAX_DEPTH:
+                delta = make_delta(resolve_design(base.id), items)
+            if delta is not None and len(_canonical(delta)) <= len(text) * DELTA_MAX_RATIO:
+                content, depth = delta, base.depth + 1
+            else:
+                base = None
+
+        try:
+            with transaction.atomic():
+                blob = DesignBlob.objects.create(
+                    digest=digest, base=base, content=content, depth=depth, size=len(text.encode('utf-8')),
+                )
+        except IntegrityError:  # 같은 설계를 동시에 저장한 경우
+            blob = DesignBlob.objects.select_for_update().get(digest=digest)
+        # 롤백되면 같은 id 가 다른 설계에 다시 쓰일 수 있으므로 커밋 후에 보관
+        transaction.on_commit(lambda: _cache_put(blob.id, text))
+    return blob
+
+
+def assign_design(version, items, base_blob_id=None):
+    """
+    버전에 설계를 지정합니다. (version.save() 는 호출 측에서)
+    내용이 기존과 같으면 False (아무것도 쓰지 않음)
+    """
+    blob = store_design(items, base_blob_id)
+    if blob.id == version.design_blob_id:
+        return False
+    version.design_blob = blob
+    version.item_count = len(items)
+    version.manifest = None  # 확정 시 다시 컴파일
+    return True
+
+
+def release_blob(blob_id):
+    """
+    어떤 버전/델타도 참조하지 않는 블롭을 삭제합니다. (자동 저장으로 교체된 설계, 삭제된 버전의 설계)
+    삭제했으면 기준 블롭도 같은 조건으로 정리합니다.
+    블롭 행을 잠근 뒤 참조 여부를 조건으로 건 DELETE 1문장으로 지웁니다. (ORM delete 는 PROTECT 관계를
+    따로 조회하므로, 그 사이 새로 생긴 참조로 ProtectedError 가 날 수 있음)
+    """
+    blobs = connection.ops.quote_name(DesignBlob._meta.db_table)
+    versions = connection.ops.quote_name(QuestionnaireVersion._meta.db_table)
+    version_column = connection.ops.quote_name(QuestionnaireVersion._meta.get_field('design_blob').column)
+    base_column = connection.ops.quote_name(DesignBlob._meta.get_field('base').column)
+    while blob_id:
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                base_ids = list(DesignBlob.objects.select_for_update().filter(pk=blob_id).values_list('base_id', flat=True))
+                if not base_ids:
+                    return
+                cursor.execute(
+                    f"DELETE FROM {blobs} WHERE id = %s "
+                    f"AND NOT EXISTS (SELECT 1 FROM {versions} WHERE {version_column} = %s) "
+                    f"AND NOT EXISTS (SELECT 1 FROM {blobs} d WHERE d.{base_column} = %s)",
+                    [blob_id, blob_id, blob_id],
+                )
+                if cursor.rowcount != 1:
+                    return
+        except IntegrityError:  # 검사 이후 커밋된 참조 (FK 위반) - 사용 중이므로 그대로 둠
+            return
+        blob_id = base_ids[0]
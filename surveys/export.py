@@ -0,0 +1,205 @@
+# surveys/export.py
+"""
+수집 자료 대량 내보내기 (명부/차수 단위, 스트리밍)
+
+명부 항목 + 조사표 문항을 평면 컬럼으로 펼쳐 아래 형식으로 내보냅니다.
+- csv     : UTF-8(BOM) CSV
+- csv.gz  : gzip 압축 CSV
+- jsonl   : 한 줄에 1건 JSON
+- columnar: pyarrow 가 설치되어 있으면 Parquet, 없으면 컬럼 단위 chunk JSONL(gzip)
+            (첫 줄 헤더 {"format", "columns"}, 이후 줄마다 {"rows": n, "data": {컬럼: [값...]}})
+
+DB 는 iterator(chunk_size) 로 나눠 읽고, 출력은 chunk 단위로 흘려보내므로 메모리 사용량이 일정합니다.
+"""
+import csv
+import importlib.util
+import io
+import json
+import zlib
+
+from .flat_table import build_flat_columns, column_identifier, flatten_value
+from .form_bundle import get_form_bundle
+from .models import SurveyData
+
+EXPORT_CHUNK_SIZE = 5000
+
+# 형식별 (content_type, 파일 확장자) - columnar 는 columnar_format() 으로 결정
+CONTENT_TYPES = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'csv.gz': ('application/gzip', 'csv.gz'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+}
+EXPORT_FORMATS = (*CONTENT_TYPES, 'columnar')
+
+BASE_EXPORT_COLUMNS = [
+    ('respondent_id', '명부레코드ID'),
+    ('area__area_code', '권역코드'),
+    ('area__area_name', '권역'),
+    ('assigned_user__username', '조사원'),
+    ('status', '상태'),
+    ('updated_at', '수정일'),
+]
+
+
+def columnar_format():
+    """columnar 요청 시 실제 형식: (content_type, 확장자, parquet 여부)"""
+    if importlib.util.find_spec('pyarrow') is None:
+        return 'application/gzip', 'columns.jsonl.gz', False
+    return 'application/vnd.apache.parquet', 'parquet', True
+
+
+def export_columns(roster):
+    """
+    내보낼 컬럼 정의 (명부 항목 + 명부의 활성 조사표 문항)
+    표(table) 문항은 행 목록을 JSON 문자열 1개 컬럼으로 내보냅니다.
+    """
+    active_versions = {form['ver_form_id'] for form in get_form_bundle(roster).forms}
+    columns, _ = build_flat_columns(roster.survey_id)
+    result = []
+    for c in columns:
+        if c['kind'] == 'list' or c['ver_form_id'] in active_versions:
+            if c['kind'] == 'table':
+                c = {**c, 'name': column_identifier('q', c['ver_form_id'], c['item_id']), 'type': 'json'}
+            result.append(c)
+    return result
+
+
+def iter_export_rows(roster, degree, columns, chunk_size=EXPORT_CHUNK_SIZE):
+    """(헤더 목록, 행(list) 생성기) 반환"""
+    header = [label for _, label in BASE_EXPORT_COLUMNS] + [c['name'] for c in columns]
+    fields = [path for path, _ in BASE_EXPORT_COLUMNS] + ['list_values', 'survey_values']
+
+    def rows():
+        queryset = SurveyData.objects.filter(roster=roster, degree=degree).order_by('id').values_list(*fields)
+        for record in queryset.iterator(chunk_size=chunk_size):
+            *base, list_values, survey_values = record
+            base[-1] = base[-1].strftime('%Y-%m-%d %H:%M:%S') if base[-1] else None
+            list_values = list_values if isinstance(list_values, dict) else {}
+            survey_values = survey_values if isinstance(survey_values, dict) else {}
+            values = list(base)
+            for c in columns:
+                if c['kind'] == 'list':
+                    raw = list_values.get(c['key'])
+                else:
+                    raw = (survey_values.get(c['ver_form_id']) or {}).get(c['item_id'])
+                values.append(flatten_value(raw, c['type']))
+            yield values
+
+    return header, rows()
+
+
+def _batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _csv_chunks(header, rows, batch_size):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')  # Excel 한글 깨짐 방지
+    writer.writerow(header)
+    for batch in _batched(rows, batch_size):
+        writer.writerows(batch)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip 헤더
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _jsonl_chunks(header, rows, batch_size):
+    for batch in _batched(rows, batch_size):
+        yield ''.join(
+            json.dumps(dict(zip(header, row)), ensure_ascii=False, default=str) + '\n' for row in batch
+        ).encode('utf-8')
+
+
+def _column_chunks(header, rows, batch_size):
+    yield (json.dumps({'format': 'survey-columns', 'version': 1, 'columns': header}, ensure_ascii=False) + '\n').encode('utf-8')
+    for batch in _batched(rows, batch_size):
+        data = {name: [row[i] for row in batch] for i, name in enumerate(header)}
+        yield (json.dumps({'rows': len(batch), 'data': data}, ensure_ascii=False, default=str) + '\n').encode('utf-8')
+
+
+class _ChunkSink(io.RawIOBase):
+    """pyarrow 출력 버퍼: 기록된 바이트를 모았다가 drain() 으로 꺼냄"""
+
+    def __init__(self):
+        self._chunks = []
+        self._size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._size += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._size
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _parquet_chunks(header, columns, rows, batch_size):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = [pa.string()] * len(BASE_EXPORT_COLUMNS) + [
+        pa.float64() if c['type'] == 'number' else pa.string() for c in columns
+    ]
+    schema = pa.schema([pa.field(name, t) for name, t in zip(header, types)])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+    try:
+        for batch in _batched(rows, batch_size):
+            arrays = [pa.array([row[i] for row in batch], type=t) for i, t in enumerate(types)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def export_stream(roster, degree, fmt, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    내보내기 바이트 조각 생성기를 반환합니다.
+    반환: (chunks, content_type, 파일 확장자)
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"지원하지 않는 형식입니다: {fmt}")
+    columns = export_columns(roster)
+    header, rows = iter_export_rows(roster, degree, columns, chunk_size)
+
+    if fmt == 'csv':
+        return _csv_chunks(header, rows, chunk_size), *CONTENT_TYPES['csv']
+    if fmt == 'csv.gz':
+        return _gzip(_csv_chunks(header, rows, chunk_size)), *CONTENT_TYPES['csv.gz']
+    if fmt == 'jsonl':
+        return _jsonl_chunks(header, rows, chunk_size), *CONTENT_TYPES['jsonl']
+
+    content_type, extension, use_parquet = columnar_format()
+    if use_parquet:
+        return _parquet_chunks(header, columns, rows, chunk_size), content_type, extension
+    return _gzip(_column_chunks(header, rows, chunk_size)), content_type, extension
@@ -0,0 +1,47 @@
+# surveys/fastjson.py
+"""
+JSON 직렬화 (대용량 응답용)
+
+orjson 이 설치되어 있으면 사용하고, 없으면 표준 json 으로 처리합니다. (출력 형식은 같게 맞춤)
+- 한글은 그대로(ensure_ascii=False), 알 수 없는 타입은 str() 로 변환
+- datetime/UUID 등도 str() 로 변환해 표준 json(default=str) 과 같은 문자열이 나오도록 함
+- orjson 이 처리하지 못하는 값(64비트를 넘는 정수 등)은 표준 json 으로 다시 직렬화
+"""
+import importlib.util
+import json
+
+from django.http import HttpResponse
+
+if importlib.util.find_spec('orjson') is not None:
+    import orjson
+
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+else:
+    orjson = None
+
+BACKEND = 'orjson' if orjson else 'json'
+
+
+def dumps_bytes(obj):
+    """obj -> UTF-8 JSON 바이트"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=str, option=_ORJSON_OPTIONS)
+        except TypeError:  # orjson.JSONEncodeError
+            pass
+    return json.dumps(obj, ensure_ascii=False, default=str, separators=(',', ':')).encode('utf-8')
+
+
+def dumps(obj):
+    """obj -> JSON 문자열"""
+    return dumps_bytes(obj).decode('utf-8')
+
+
+class FastJsonResponse(HttpResponse):
+    """JsonResponse 와 같은 사용법 (safe=False 면 dict 이외 값 허용)"""
+
+    def __init__(self, data, safe=True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError("In order to allow non-dict objects to be serialized set the safe parameter to False.")
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=dumps_bytes(data), **kwargs)
@@ -0,0 +1,447 @@
+# surveys/flat_table.py
+"""
+조사별 분석용 평면(wide) 테이블
+
+survey_values 는 {ver_form_id: {문항ID: 값}} 형태의 중첩 JSON 이라 SQL 로 분석하기 어렵습니다.
+확정된 조사표 버전(설계 매니페스트)을 기준으로 조사별 평면 테이블을 만들어 문항별 값을 일반 컬럼으로 둡니다.
+
+- 본 테이블  surveys_flat_<조사ID>      : 응답 1건 = 1행 (기본 정보 + 명부 항목 + 문항별 컬럼)
+- 표 테이블  surveys_flat_<조사ID>_rows : 표(table) 문항을 셀 단위로 펼친 하위 테이블
+  (data_id, ver_form_id, item_id, row_index, row_label, column_id, value_text, value_num)
+
+대상은 차수별 응답 자료(degree 가 있는 행)이며, 원본 SurveyData 삭제 시 FK CASCADE 로 함께 삭제됩니다.
+- 전체 재생성: rebuild_flat_table() (새 테이블에 적재 후 교체)
+- 증분 반영: sync_flat_rows() (저장/배정이 바뀐 응답 행만 다시 기록, save_survey_response / assign_records 에서 호출)
+"""
+import json
+import re
+import time
+import uuid
+from datetime import timedelta
+from hashlib import sha1
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from .design_manifest import version_manifests
+from .jobs import enqueue_job
+from .sql_cache import mark_data_changed
+from .models import (
+    BackgroundJob, QuestionnaireVersion, SurveyArea, SurveyData, SurveyDegree, SurveyDesign, SurveyFlatTable, SurveyRoster,
+)
+
+INSERT_BATCH_SIZE = 1000
+# 재생성 중 저장된 행 재반영 기준: 적재 시작 시각보다 이만큼(초) 앞선 수정분까지 다시 기록
+# (조회 시작 직전에 수정되고 조회 후에 커밋된 저장 트랜잭션 포함)
+REPLAY_MARGIN = getattr(settings, 'FLAT_TABLE_REPLAY_MARGIN', 60)
+MAX_IDENTIFIER = 60  # PostgreSQL 식별자 최대 63자
+
+# 기본 정보 컬럼 (이름, 필드 타입)
+BASE_COLUMNS = [
+    ('data_id', models.BigIntegerField()),
+    ('roster_id', models.BigIntegerField()),
+    ('degree_id', models.BigIntegerField()),
+    ('area_id', models.BigIntegerField()),
+    ('assigned_user_id', models.IntegerField()),
+    ('respondent_id', models.CharField(max_length=50)),
+    ('status', models.CharField(max_length=20)),
+    ('updated_at', models.DateTimeField()),
+]
+INDEXED_COLUMNS = ('roster_id', 'degree_id', 'area_id', 'status')
+
+ROW_COLUMNS = [
+    ('data_id', models.BigIntegerField()),
+    ('ver_form_id', models.CharField(max_length=50)),
+    ('item_id', models.CharField(max_length=100)),
+    ('row_index', models.IntegerField()),
+    ('row_label', models.TextField()),
+    ('column_id', models.CharField(max_length=100)),
+    ('value_text', models.TextField()),
+    ('value_num', models.FloatField()),
+]
+
+COLUMN_TYPES = {
+    'text': models.TextField(),
+    'number': models.FloatField(),
+}
+
+
+def flat_table_names(survey_id):
+    return f"surveys_flat_{survey_id}", f"surveys_flat_{survey_id}_rows"
+
+
+def column_identifier(*parts):
+    """문항 ID 등을 SQL 컬럼명으로 변환 (영숫자/밑줄, 길면 해시로 축약)"""
+    name = re.sub(r'[^0-9a-z_]+', '_', '_'.join(parts).lower()).strip('_')
+    if len(name) > MAX_IDENTIFIER:
+        digest = sha1(name.encode()).hexdigest()[:8]
+        name = f"{name[:MAX_IDENTIFIER - 9]}_{digest}"
+    return name
+
+
+def _quote(name):
+    return connection.ops.quote_name(name)
+
+
+def _db_type(field):
+    return field.db_type(connection)
+
+
+# ==========================================
+# [스키마] 확정 버전 설계 -> 컬럼 정의
+# ==========================================
+
+def build_flat_columns(survey_id):
+    """
+    조사의 확정 버전 설계와 명부 항목 설계로 컬럼 정의를 만듭니다.
+    반환: (columns, version_ids)
+    """
+    columns = []
+    used = {name for name, _ in BASE_COLUMNS}
+
+    def add(column):
+        name = column['name']
+        while name in used:
+            name = column_identifier(name, 'x')
+        used.add(name)
+        columns.append({**column, 'name': name})
+
+    design = SurveyDesign.objects.filter(survey_id=survey_id).first()
+    for item in (design.list_schema if design else []):
+        add({'name': column_identifier('l', item['id']), 'kind': 'list', 'key': item['id'],
+             'label': item.get('label', item['id']), 'type': 'text'})
+
+    versions = QuestionnaireVersion.objects.filter(
+        questionnaire__roster__survey_id=survey_id, is_confirmed=True
+    ).select_related('questionnaire').order_by('questionnaire_id', 'version_number')
+
+    version_ids = []
+    versions = list(versions)
+    manifests = version_manifests(versions)  # 확정 시 컴파일된 컬럼 정의 (설계 본문은 읽지 않음)
+    for v in versions:
+        version_ids.append(v.id)
+        form_name = v.questionnaire.form_name
+        for column in manifests[v.id]['flat_columns']:
+            column = {**column, 'ver_form_id': v.ver_form_id, 'label': f"{form_name}.{column['label']}"}
+            if column['kind'] == 'table':
+                columns.append(column)
+            else:
+                add({'name': column_identifier('q', v.ver_form_id, column['item_id']), **column})
+    return columns, version_ids
+
+
+def _value_columns(columns):
+    return [c for c in columns if c['kind'] in ('list', 'item')]
+
+
+def _create_tables(table_name, rows_table_name, columns, token):
+    """본 테이블/표 테이블 생성 (인덱스명은 재생성 시 충돌하지 않도록 token 포함)"""
+    data_table = _quote(SurveyData._meta.db_table)
+    definitions = [
+        f"{_quote('data_id')} {_db_type(models.BigIntegerField())} PRIMARY KEY "
+        f"REFERENCES {data_table} (id) ON DELETE CASCADE"
+    ]
+    definitions += [f"{_quote(name)} {_db_type(field)}" for name, field in BASE_COLUMNS[1:]]
+    definitions += [f"{_quote(c['name'])} {_db_type(COLUMN_TYPES[c['type']])}" for c in _value_columns(columns)]
+
+    row_definitions = [
+        f"{_quote('data_id')} {_db_type(models.BigIntegerField())} NOT NULL "
+        f"REFERENCES {data_table} (id) ON DELETE CASCADE"
+    ]
+    row_definitions += [f"{_quote(name)} {_db_type(field)}" for name, field in ROW_COLUMNS[1:]]
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"CREATE TABLE {_quote(table_name)} ({', '.join(definitions)})")
+        cursor.execute(f"CREATE TABLE {_quote(rows_table_name)} ({', '.join(row_definitions)})")
+        for column in INDEXED_COLUMNS:
+            cursor.execute(
+                f"CREATE INDEX {_quote(column_identifier(table_name, token, column))} "
+                f"ON {_quote(table_name)} ({_quote(column)})"
+            )
+        cursor.execute(
+            f"CREATE INDEX {_quote(column_identifier(rows_table_name, token, 'data'))} "
+            f"ON {_quote(rows_table_name)} ({_quote('data_id')})"
+        )
+        cursor.execute(
+            f"CREATE INDEX {_quote(column_identifier(rows_table_name, token, 'item'))} "
+            f"ON {_quote(rows_table_name)} ({_quote('ver_form_id')}, {_quote('item_id')})"
+        )
+
+
+def drop_flat_table(survey_id):
+    """평면 테이블과 메타정보 삭제"""
+    flat = SurveyFlatTable.objects.filter(survey_id=survey_id).first()
+    if flat is None:
+        return
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {_quote(flat.rows_table_name)}")
+        cursor.execute(f"DROP TABLE IF EXISTS {_quote(flat.table_name)}")
+        flat.delete()
+
+
+# ==========================================
+# [적재] SurveyData -> 평면 행
+# ==========================================
+
+def _text(value):
+    if value is None or value == '':
+        return None
+    if isinstance(value, list):
+        return ', '.join(str(v) for v in value)
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+def _number(value):
+    if value is None or value == '' or isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def flatten_value(value, value_type):
+    """응답 값 1개를 컬럼 값으로 변환 (number: 실수, json: JSON 문자열, 그 외: 문자열)"""
+    if value_type == 'number':
+        return _number(value)
+    if value_type == 'json':
+        return None if value in (None, '', []) else json.dumps(value, ensure_ascii=False)
+    return _text(value)
+
+
+def flatten_record(row, columns):
+    """
+    SurveyData values() 1건 -> (본 테이블 행 tuple, 표 테이블 행 목록)
+    row: id, roster_id, degree_id, area_id, assigned_user_id, respondent_id, status, updated_at,
+         list_values, survey_values
+    """
+    list_values = row['list_values'] if isinstance(row['list_values'], dict) else {}
+    survey_values = row['survey_values'] if isinstance(row['survey_values'], dict) else {}
+
+    values = [row['id']] + [row[name] for name, _ in BASE_COLUMNS[1:-1]]
+    values.append(connection.ops.adapt_datetimefield_value(row['updated_at']))
+    for c in _value_columns(columns):
+        if c['kind'] == 'list':
+            raw = list_values.get(c['key'])
+        else:
+            raw = (survey_values.get(c['ver_form_id']) or {}).get(c['item_id'])
+        values.append(flatten_value(raw, c['type']))
+
+    child_rows = []
+    for c in columns:
+        if c['kind'] != 'table':
+            continue
+        table_value = (survey_values.get(c['ver_form_id']) or {}).get(c['item_id'])
+        if not isinstance(table_value, list):
+            continue
+        row_labels = c['row_labels']
+        for row_index, table_row in enumerate(table_value):
+            if not isinstance(table_row, dict):
+                continue
+            row_label = row_labels[row_index] if row_index < len(row_labels) else None
+            for column_id, value in table_row.items():
+                text = _text(value)
+                if text is None:
+                    continue
+                child_rows.append((row['id'], c['ver_form_id'], c['item_id'], row_index,
+                                   row_label, column_id, text, _number(value)))
+    return tuple(values), child_rows
+
+
+RECORD_FIELDS = ('id', 'roster_id', 'degree_id', 'area_id', 'assigned_user_id', 'respondent_id',
+                 'status', 'updated_at', 'list_values', 'survey_values')
+
+
+def _insert_sql(table_name, names):
+    placeholders = ', '.join(['%s'] * len(names))
+    return f"INSERT INTO {_quote(table_name)} ({', '.join(_quote(n) for n in names)}) VALUES ({placeholders})"
+
+
+def _write_records(cursor, table_name, rows_table_name, columns, records):
+    main_rows, child_rows = [], []
+    for record in records:
+        main_row, children = flatten_record(record, columns)
+        main_rows.append(main_row)
+        child_rows.extend(children)
+
+    names = [name for name, _ in BASE_COLUMNS] + [c['name'] for c in _value_columns(columns)]
+    if main_rows:
+        cursor.executemany(_insert_sql(table_name, names), main_rows)
+    if child_rows:
+        cursor.executemany(_insert_sql(rows_table_name, [name for name, _ in ROW_COLUMNS]), child_rows)
+    return len(main_rows)
+
+
+def _delete_records(cursor, table_name, rows_table_name, data_ids):
+    placeholders = ', '.join(['%s'] * len(data_ids))
+    cursor.execute(f"DELETE FROM {_quote(rows_table_name)} WHERE data_id IN ({placeholders})", data_ids)
+    cursor.execute(f"DELETE FROM {_quote(table_name)} WHERE data_id IN ({placeholders})", data_ids)
+
+
+def _response_records(survey_id):
+    return SurveyData.objects.filter(roster__survey_id=survey_id, degree__isnull=False).order_by('id')
+
+
+def rebuild_flat_table(survey_id, progress=None):
+    """
+    평면 테이블을 확정 버전 설계 기준으로 새로 만들고 전체 응답을 적재합니다.
+    새 이름의 테이블에 적재한 뒤 한 트랜잭션에서 기존 테이블과 교체합니다.
+    적재 중 저장된 응답은 교체 직전에 updated_at 기준으로 다시 기록합니다. (REPLAY_MARGIN)
+    progress: progress(rows, total) 콜백
+    반환: {'rows', 'columns', 'elapsed', 'rows_per_sec'}
+    """
+    started = time.monotonic()
+    table_name, rows_table_name = flat_table_names(survey_id)
+    columns, version_ids = build_flat_columns(survey_id)
+    token = uuid.uuid4().hex[:6]
+    new_table, new_rows_table = f"{table_name}_{token}", f"{rows_table_name}_{token}"
+
+    queryset = _response_records(survey_id)
+    total = queryset.count()
+    rows = 0
+    replay_since = timezone.now() - timedelta(seconds=REPLAY_MARGIN)
+
+    with transaction.atomic():
+        _create_tables(new_table, new_rows_table, columns, token)
+        with connection.cursor() as cursor:
+            batch = []
+            for record in queryset.values(*RECORD_FIELDS).iterator(chunk_size=INSERT_BATCH_SIZE):
+                batch.append(record)
+                if len(batch) >= INSERT_BATCH_SIZE:
+                    rows += _write_records(cursor, new_table, new_rows_table, columns, batch)
+                    batch = []
+                    if progress:
+                        progress(rows, total)
+            if batch:
+                rows += _write_records(cursor, new_table, new_rows_table, columns, batch)
+
+            # 교체 전: 적재 중 저장된 행을 다시 기록. 메타 행을 잠가 sync_flat_rows(저장 경로)는
+            # 교체가 끝날 때까지 기다렸다가 새 테이블에 기록합니다.
+            SurveyFlatTable.objects.select_for_update().filter(survey_id=survey_id).first()
+            replay_ids = list(queryset.filter(updated_at__gte=replay_since).values_list('id', flat=True))
+            for start in range(0, len(replay_ids), INSERT_BATCH_SIZE):
+                data_ids = replay_ids[start:start + INSERT_BATCH_SIZE]
+                _delete_records(cursor, new_table, new_rows_table, data_ids)
+                records = SurveyData.objects.filter(id__in=data_ids).values(*RECORD_FIELDS)
+                _write_records(cursor, new_table, new_rows_table, columns, records)
+            if replay_ids:  # 적재 후 새로 생긴 응답 포함
+                cursor.execute(f"SELECT COUNT(*) FROM {_quote(new_table)}")
+                rows = cursor.fetchone()[0]
+
+            cursor.execute(f"DROP TABLE IF EXISTS {_quote(rows_table_name)}")
+            cursor.execute(f"DROP TABLE IF EXISTS {_quote(table_name)}")
+            cursor.execute(f"ALTER TABLE {_quote(new_table)} RENAME TO {_quote(table_name)}")
+            cursor.execute(f"ALTER TABLE {_quote(new_rows_table)} RENAME TO {_quote(rows_table_name)}")
+
+        SurveyFlatTable.objects.update_or_create(survey_id=survey_id, defaults={
+            'table_name': table_name,
+            'rows_table_name': rows_table_name,
+            'columns': columns,
+            'version_ids': version_ids,
+            'row_count': rows,
+            'is_stale': False,
+            'built_at': timezone.now(),
+        })
+        mark_data_changed()  # 분석 테이블 교체 - SQL 결과 캐시 무효화
+
+    if progress:
+        progress(rows, total)
+    elapsed = time.monotonic() - started
+    return {
+        'rows': rows,
+        'columns': len(_value_columns(columns)),
+        'elapsed': elapsed,
+        'rows_per_sec': rows / elapsed if elapsed else 0.0,
+    }
+
+
+def sync_flat_rows(survey_id, data_ids):
+    """
+    지정한 응답 행만 평면 테이블에 다시 기록합니다. (평면 테이블이 없으면 아무것도 하지 않음)
+    호출측 트랜잭션 안에서 실행되며, 설계 변경으로 재생성이 예정된 경우에도 현재 컬럼 기준으로 반영합니다.
+    """
+    if not data_ids:
+        return 0
+    data_ids = list(data_ids)
+    with transaction.atomic(), connection.cursor() as cursor:
+        # 재생성(rebuild_flat_table)이 테이블을 교체하는 중이면 끝날 때까지 대기
+        flat = SurveyFlatTable.objects.select_for_update().filter(survey_id=survey_id).first()
+        if flat is None:
+            return 0
+        records = SurveyData.objects.filter(
+            id__in=data_ids, roster__survey_id=survey_id, degree__isnull=False
+        ).values(*RECORD_FIELDS)
+        _delete_records(cursor, flat.table_name, flat.rows_table_name, data_ids)
+        return _write_records(cursor, flat.table_name, flat.rows_table_name, flat.columns, records)
+
+
+def mark_flat_table_stale(survey_id):
+    """설계 변경 시 재생성 필요 표시 후 재생성 작업 등록 (같은 조사의 대기 작업이 있으면 생략)"""
+    SurveyFlatTable.objects.filter(survey_id=survey_id).update(is_stale=True)
+    pending = BackgroundJob.objects.filter(
+        job_type='rebuild_flat_table', status='QUEUED', params__survey_id=survey_id
+    ).exists()
+    if not pending:
+        enqueue_job('rebuild_flat_table', {'survey_id': survey_id})
+
+
+# ==========================================
+# [조회] 평면 테이블 스트리밍
+# ==========================================
+
+def iter_flat_rows(flat, fields=None, chunk_size=2000):
+    """
+    평면 테이블을 피벗용 dict 로 1건씩 생성합니다.
+    키: 기본 정보는 피벗과 같은 이름(ID, 차수, 권역 ...), 명부 항목은 항목 ID, 문항은 컬럼명
+    fields 를 지정하면 해당 키만 조회합니다.
+    """
+    from .pivot import BASE_FIELDS, format_base_value
+
+    base_sql = {
+        "ID": "f.respondent_id",
+        "차수": "d.degree_number",
+        "차수명": "d.degree_title",
+        "권역": "a.area_name",
+        "조사원": "u.username",
+        "상태": "f.status",
+        "명부명": "r.roster_name",
+        "수정일": "f.updated_at",
+    }
+    value_columns = {
+        (c['key'] if c['kind'] == 'list' else c['name']): c['name']
+        for c in _value_columns(flat.columns)
+    }
+    keys = list(base_sql) + list(value_columns) if fields is None else [
+        f for f in fields if f in base_sql or f in value_columns
+    ]
+
+    select = [base_sql[k] if k in base_sql else f"f.{_quote(value_columns[k])}" for k in keys]
+    sql = (
+        f"SELECT {', '.join(select) or 'f.data_id'} FROM {_quote(flat.table_name)} f "
+        f"LEFT JOIN {_quote(SurveyDegree._meta.db_table)} d ON d.id = f.degree_id "
+        f"LEFT JOIN {_quote(SurveyArea._meta.db_table)} a ON a.id = f.area_id "
+        f"LEFT JOIN {_quote(User._meta.db_table)} u ON u.id = f.assigned_user_id "
+        f"LEFT JOIN {_quote(SurveyRoster._meta.db_table)} r ON r.id = f.roster_id "
+        f"ORDER BY f.data_id"
+    )
+
+    # PostgreSQL 은 서버 사이드 커서(WITH HOLD)로 조회하므로 트랜잭션 없이 스트리밍 가능
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(sql)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for row in rows:
+                item = {}
+                for key, value in zip(keys, row):
+                    if key == "수정일" and isinstance(value, str):
+                        value = value[:16]  # SQLite 는 문자열로 반환 (UTC 'YYYY-MM-DD HH:MM')
+                    elif key in BASE_FIELDS:
+                        value = format_base_value(key, value)
+                    item[key] = value
+                yield item
@@ -0,0 +1,148 @@
+# surveys/form_bundle.py
+"""
+명부별 '활성 조사표 번들' 캐시
+
+번들 = 명부에 연결된 조사표들의 최신 확정 버전(설계 데이터/originId 맵 포함) + 조사의 내검 규칙.
+입력 화면 열기(get_survey_data)와 저장(save_survey_response)마다 조사표별로
+확정 버전을 조회하던 N+1 쿼리를 1회 쿼리 + 캐시 조회로 대체합니다.
+
+캐시 구조
+- 공유 캐시(settings.CACHES): 명부별 세대(generation) 토큰과 번들 원본 데이터
+- 프로세스 로컬: (세대 토큰, FormBundle) — 세대 토큰이 같으면 그대로 재사용
+무효화는 세대 토큰 교체로 처리합니다. (invalidate_roster_bundle / invalidate_survey_bundles)
+"""
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .design_manifest import version_manifests
+from .design_store import load_designs
+from .models import QuestionnaireVersion, SurveyDesign, SurveyRoster
+from .rule_engine import get_rule_set
+
+BUNDLE_TIMEOUT = 60 * 60 * 24  # 공유 캐시 보관 시간 (세대 토큰이 바뀌면 자연히 무시됨)
+BUNDLE_FORMAT = 2  # 번들 데이터 구조가 바뀌면 올림 (이전 형식의 공유 캐시 무시)
+
+_local_bundles = {}
+_local_lock = threading.Lock()
+
+
+def _gen_key(roster_id):
+    return f"form_bundle:gen:{roster_id}"
+
+def _data_key(roster_id, generation):
+    return f"form_bundle:data:{BUNDLE_FORMAT}:{roster_id}:{generation}"
+
+
+class FormBundle:
+    """명부의 활성 조사표 번들 (읽기 전용으로 사용)"""
+
+    def __init__(self, data):
+        self.roster_id = data['roster_id']
+        self.forms = data['forms']
+        self.edit_rules = data['edit_rules']
+        # 조사표별 매니페스트의 originId 맵을 합친 것 (내검 규칙 컴파일 - design_manifest.py)
+        self.origin_map = {}
+        for form in self.forms:
+            self.origin_map.update(form['origin_map'])
+        self.version_key = tuple(f['version_id'] for f in self.forms)
+        self._rule_set = None
+
+    @property
+    def rule_set(self):
+        """컴파일된 내검 규칙 세트 (rule_engine 캐시 사용)"""
+        if self._rule_set is None:
+            self._rule_set = get_rule_set(self.edit_rules, self.origin_map, self.version_key)
+        return self._rule_set
+
+
+def build_bundle_data(roster_id):
+    """DB에서 번들 원본 데이터를 구성합니다. (확정 버전 1회 + 설계 블롭 + 내검 규칙 1회 조회)"""
+    versions = QuestionnaireVersion.objects.filter(
+        questionnaire__roster_id=roster_id, is_confirmed=True
+    ).select_related('questionnaire').order_by('questionnaire_id', '-version_number')
+
+    latest = []
+    seen = set()
+    for v in versions:
+        if v.questionnaire_id in seen:
+            continue  # 조사표별 최신 확정 버전만 사용
+        seen.add(v.questionnaire_id)
+        latest.append(v)
+
+    designs = load_designs([v.design_blob_id for v in latest])
+    manifests = version_manifests(latest)
+    forms = []
+    for v in latest:
+        q = v.questionnaire
+        forms.append({
+            'q_id': q.id,
+            'form_id': q.form_id,
+            'form_name': q.form_name,
+            'version_id': v.id,
+            'ver_form_id': v.ver_form_id,
+            'design_data': designs.get(v.design_blob_id, []),
+            'origin_map': manifests[v.id]['origin_map'],
+        })
+
+    edit_rules = SurveyDesign.objects.filter(
+        survey__rosters__id=roster_id
+    ).values_list('edit_rules', flat=True).first()
+
+    return {'roster_id': roster_id, 'forms': forms, 'edit_rules': edit_rules or []}
+
+
+def _current_generation(roster_id):
+    key = _gen_key(roster_id)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def bundle_generation(roster_id):
+    """명부 번들의 세대 토큰 (번들이 바뀌면 달라짐 - 조건부 요청 검증값용)"""
+    return _current_generation(roster_id)
+
+
+def get_form_bundle(roster):
+    """명부(또는 명부 ID)의 활성 조사표 번들을 반환합니다."""
+    roster_id = roster if isinstance(roster, int) else roster.id
+    generation = _current_generation(roster_id)
+
+    with _local_lock:
+        cached = _local_bundles.get(roster_id)
+    if cached and cached[0] == generation:
+        return cached[1]
+
+    data_key = _data_key(roster_id, generation)
+    data = cache.get(data_key)
+    if data is None:
+        data = build_bundle_data(roster_id)
+        cache.set(data_key, data, BUNDLE_TIMEOUT)
+
+    bundle = FormBundle(data)
+    with _local_lock:
+        _local_bundles[roster_id] = (generation, bundle)
+    return bundle
+
+
+def invalidate_roster_bundle(roster_id):
+    """
+    명부의 번들을 무효화합니다. (모든 프로세스의 로컬 캐시가 다음 조회 시 갱신)
+    트랜잭션 안에서 호출되면 커밋 이후에 무효화하여, 커밋 전 데이터로 번들이 다시 만들어지는 것을 막습니다.
+    """
+    def _bump():
+        cache.set(_gen_key(roster_id), time.time_ns(), None)
+        with _local_lock:
+            _local_bundles.pop(roster_id, None)
+    transaction.on_commit(_bump)
+
+
+def invalidate_survey_bundles(survey_id):
+    """조사에 속한 모든 명부의 번들을 무효화합니다. (내검 규칙 변경 시)"""
+    for roster_id in SurveyRoster.objects.filter(survey_id=survey_id).values_list('id', flat=True):
+        invalidate_roster_bundle(roster_id)
@@ -0,0 +1,84 @@
+# surveys/id_allocator.py
+"""
+ID 채번 (명부레코드ID / 명부ID / 조사표ID)
+
+'마지막 행 + 1' 방식은 동시에 생성/임포트하면 같은 번호가 나오고, 매번 전체 테이블을 정렬합니다.
+여기서는 채번 전용 시퀀스에서 번호 블록을 한 번에 예약합니다.
+- PostgreSQL: 네이티브 시퀀스 surveys_id_<name> (트랜잭션과 무관하게 즉시 증가 → 잠금 대기 없음,
+              여러 프로세스/서버에서 동시에 호출해도 중복 없음)
+              SELECT nextval(...) FROM generate_series(1, n) 1회 왕복으로 n개 예약
+- 그 외 DB : IdSequence 카운터 행을 잠그고 증가 (개발용)
+롤백되면 예약한 번호는 건너뛰게 됩니다. (번호 중복 대신 결번 허용)
+기존 ID 형식(0 채움 자릿수, 접두어)은 그대로 유지합니다.
+"""
+from django.db import IntegrityError, connection, transaction
+from django.db.models import BigIntegerField, Max
+from django.db.models.functions import Cast, Substr
+
+from .models import IdSequence, SurveyData, SurveyQuestionnaire, SurveyRoster
+
+# 채번명: (접두어, 숫자 자릿수, 기존 ID 모델, 필드)
+ID_FORMATS = {
+    'respondent': ('', 8, SurveyData, 'respondent_id'),          # 00000001
+    'roster': ('N', 5, SurveyRoster, 'roster_code'),             # N00001
+    'form': ('S', 5, SurveyQuestionnaire, 'form_id'),            # S00001
+}
+
+
+def sequence_name(name):
+    return f"surveys_id_{name}"
+
+
+def format_id(name, number):
+    prefix, width = ID_FORMATS[name][:2]
+    return f"{prefix}{number:0{width}d}"
+
+
+def existing_max(name):
+    """이미 사용 중인 ID 의 최대 번호 (형식에 맞는 ID 만 대상)"""
+    prefix, _, model, field = ID_FORMATS[name]
+    number = Cast(Substr(field, len(prefix) + 1), BigIntegerField()) if prefix else Cast(field, BigIntegerField())
+    result = model.objects.filter(**{f"{field}__regex": rf"^{prefix}[0-9]+$"}).aggregate(last=Max(number))
+    return result['last'] or 0
+
+
+def _allocate_postgresql(name, count):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT nextval(%s) FROM generate_series(1, %s)", [sequence_name(name), count])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _allocate_counter(name, count):
+    with transaction.atomic():
+        counter = IdSequence.objects.select_for_update().filter(name=name).first()
+        if counter is None:
+            try:
+                with transaction.atomic():
+                    counter = IdSequence.objects.create(name=name, last_value=existing_max(name))
+            except IntegrityError:
+                counter = IdSequence.objects.select_for_update().get(name=name)
+        start = counter.last_value + 1
+        counter.last_value += count
+        counter.save(update_fields=['last_value'])
+    return list(range(start, start + count))
+
+
+def allocate_numbers(name, count=1):
+    """번호 count 개를 예약해 목록으로 반환합니다."""
+    if name not in ID_FORMATS:
+        raise ValueError(f"등록되지 않은 채번명입니다: {name}")
+    if count <= 0:
+        return []
+    if connection.vendor == 'postgresql':
+        return _allocate_postgresql(name, count)
+    return _allocate_counter(name, count)
+
+
+def allocate_ids(name, count):
+    """형식이 적용된 ID count 개를 예약합니다. (대량 임포트용)"""
+    return [format_id(name, number) for number in allocate_numbers(name, count)]
+
+
+def next_id(name):
+    """형식이 적용된 ID 1개를 예약합니다."""
+    return allocate_ids(name, 1)[0]
@@ -0,0 +1,384 @@
+# surveys/jobs.py
+"""
+백그라운드 작업 실행기 (DB 기반 큐, 외부 브로커 없음)
+
+- 뷰는 enqueue_job() 으로 BackgroundJob 을 등록하고 바로 응답합니다.
+- `python manage.py run_jobs` 워커가 대기 작업을 가져가 실행합니다.
+- 진행 상황은 job_status() 로 조회합니다. (상태, 진행률, 처리건수, 예상 남은시간)
+"""
+import os
+import socket
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .sql_cache import mark_data_changed
+from .models import BackgroundJob, QuestionnaireVersion, SurveyData, SurveyMaster, SurveyDesign, SurveyDegree, SurveyRoster
+
+JOB_HANDLERS = {}
+
+# 업로드 파일/추출 결과 파일 보관 위치 (웹 서버와 워커가 함께 접근 가능해야 함)
+JOB_FILE_DIR = Path(getattr(settings, 'JOB_FILE_DIR', settings.BASE_DIR / 'job_files'))
+
+PROGRESS_INTERVAL = 1.0  # 진행률 반영 최소 간격(초)
+PROGRESS_TIMEOUT = 60 * 60 * 24
+PURGE_BATCH_SIZE = 10000
+
+
+def register_job(job_type):
+    """작업 핸들러 등록 데코레이터. handler(job, progress) -> result(dict)"""
+    def decorator(func):
+        JOB_HANDLERS[job_type] = func
+        return func
+    return decorator
+
+
+def job_file_path(name):
+    JOB_FILE_DIR.mkdir(parents=True, exist_ok=True)
+    return JOB_FILE_DIR / name
+
+
+def enqueue_job(job_type, params=None, user=None, total=None):
+    """작업을 대기열에 등록합니다."""
+    if job_type not in JOB_HANDLERS:
+        raise ValueError(f"등록되지 않은 작업 유형입니다: {job_type}")
+    return BackgroundJob.objects.create(
+        job_type=job_type,
+        params=params or {},
+        total=total,
+        created_by=user if user and user.is_authenticated else None,
+    )
+
+
+def _progress_key(job_id):
+    return f"job_progress:{job_id}"
+
+
+class JobProgress:
+    """
+    핸들러에 전달되는 진행률 보고 객체.
+    progress(processed, total=None, message=None) 형태로 호출하며, 반영은 PROGRESS_INTERVAL 마다 1회로 제한됩니다.
+    진행률은 공유 캐시에 기록하므로 핸들러가 긴 트랜잭션 안에 있어도 폴링 API 에서 바로 보입니다.
+    (트랜잭션 밖이면 DB 에도 반영)
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self._last_flush = 0.0
+
+    def __call__(self, processed, total=None, message=None, force=False):
+        self.job.processed = processed
+        if total is not None:
+            self.job.total = total
+        if message is not None:
+            self.job.message = message
+        now = time.monotonic()
+        if force or now - self._last_flush >= PROGRESS_INTERVAL:
+            self._last_flush = now
+            cache.set(_progress_key(self.job.pk), {
+                'processed': self.job.processed, 'total': self.job.total,
+                'message': self.job.message, 'heartbeat': time.time(),
+            }, PROGRESS_TIMEOUT)
+            if not connection.in_atomic_block:
+                BackgroundJob.objects.filter(pk=self.job.pk).update(
+                    processed=self.job.processed, total=self.job.total,
+                    message=self.job.message, updated_at=timezone.now(),
+                )
+
+
+def claim_next_job(worker_name):
+    """
+    가장 오래된 대기 작업 1건을 선점합니다.
+    상태 조건부 UPDATE 로 선점하므로 여러 워커가 동시에 실행되어도 중복 실행되지 않습니다.
+    """
+    for job in BackgroundJob.objects.filter(status='QUEUED').order_by('id')[:10]:
+        claimed = BackgroundJob.objects.filter(pk=job.pk, status='QUEUED').update(
+            status='RUNNING', worker=worker_name, started_at=timezone.now(), updated_at=timezone.now(),
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+
+def run_job(job):
+    """선점된 작업을 실행하고 결과/오류를 기록합니다."""
+    handler = JOB_HANDLERS.get(job.job_type)
+    progress = JobProgress(job)
+    try:
+        if handler is None:
+            raise ValueError(f"등록되지 않은 작업 유형입니다: {job.job_type}")
+        result = handler(job, progress) or {}
+        progress(job.processed, force=True)
+        BackgroundJob.objects.filter(pk=job.pk).update(
+            status='DONE', result=result, finished_at=timezone.now(), updated_at=timezone.now(),
+            message=result.get('message', job.message),
+        )
+    except Exception as e:
+        BackgroundJob.objects.filter(pk=job.pk).update(
+            status='FAILED', message=str(e), finished_at=timezone.now(), updated_at=timezone.now(),
+        )
+
+
+def fail_stale_jobs(minutes):
+    """워커 종료 등으로 진행 보고가 끊긴 실행중 작업을 실패 처리합니다."""
+    threshold = timezone.now() - timedelta(minutes=minutes)
+    stale_ids = []
+    for job_id in BackgroundJob.objects.filter(status='RUNNING', updated_at__lt=threshold).values_list('id', flat=True):
+        live = cache.get(_progress_key(job_id))
+        if live and live['heartbeat'] >= threshold.timestamp():
+            continue  # 트랜잭션 안에서 진행 중 (캐시로만 보고 중)
+        stale_ids.append(job_id)
+    return BackgroundJob.objects.filter(id__in=stale_ids, status='RUNNING').update(
+        status='FAILED', message='워커 응답 없음 (중단됨)', finished_at=timezone.now(),
+    )
+
+
+def default_worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def job_status(job):
+    """폴링 API 응답용 진행 상황"""
+    if job.status == 'RUNNING':
+        live = cache.get(_progress_key(job.id))
+        if live:
+            job.processed, job.total, job.message = live['processed'], live['total'], live['message']
+    percent = None
+    eta_seconds = None
+    if job.status == 'DONE':
+        percent = 100.0
+    elif job.total:
+        percent = round(min(job.processed / job.total, 1.0) * 100, 1)
+        if job.status == 'RUNNING' and job.started_at and job.processed:
+            elapsed = (timezone.now() - job.started_at).total_seconds()
+            rate = job.processed / elapsed if elapsed > 0 else 0
+            if rate:
+                eta_seconds = round(max(job.total - job.processed, 0) / rate, 1)
+    return {
+        'id': job.id,
+        'job_type': job.job_type,
+        'state': job.status,
+        'percent': percent,
+        'processed': job.processed,
+        'total': job.total,
+        'eta_seconds': eta_seconds,
+        'message': job.message,
+        'result': job.result,
+        'created_at': job.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+        'started_at': job.started_at.strftime('%Y-%m-%d %H:%M:%S') if job.started_at else None,
+        'finished_at': job.finished_at.strftime('%Y-%m-%d %H:%M:%S') if job.finished_at else None,
+    }
+
+
+# ==========================================
+# [작업 핸들러]
+# ==========================================
+
+def purge_survey_data(queryset, progress, processed=0):
+    """SurveyData 를 id 배치 단위로 삭제 (대량 CASCADE 수집으로 메모리가 급증하는 것을 방지)"""
+    total = processed + queryset.count()
+    progress(processed, total)
+    while True:
+        batch = list(queryset.values_list('id', flat=True)[:PURGE_BATCH_SIZE])
+        if not batch:
+            break
+        with transaction.atomic():
+            SurveyData.objects.filter(id__in=batch).delete()
+            mark_data_changed()
+        processed += len(batch)
+        progress(processed, total)
+    return processed
+
+
+def _count_csv_rows(path):
+    """진행률 표시용 데이터 행 수 (헤더 제외, 줄 수 기준 추정)"""
+    lines = 0
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            lines += block.count(b'\n')
+    return max(lines - 1, 0)
+
+
+@register_job('import_roster')
+def import_roster_job(job, progress):
+    from .roster_import import import_roster_stream
+
+    params = job.params
+    path = Path(params['file_path'])
+    try:
+        survey = SurveyMaster.objects.get(pk=params['survey_id'])
+        design = SurveyDesign.objects.get(survey=survey)
+        roster = SurveyRoster.objects.get(pk=params['roster_id'])
+        progress(0, _count_csv_rows(path), '명부 적재 중', force=True)
+
+        with open(path, encoding='utf-8-sig', newline='') as f:
+            stats = import_roster_stream(
+                survey, roster, design, f,
+                chunk_size=params.get('chunk_size'),
+                progress=lambda rows, stats: progress(rows),
+            )
+        progress(stats['rows'], stats['rows'])
+
+        # 새 레코드의 토큰은 임포트가 함께 적재. 검색 항목 구성이 바뀐 경우에만 색인 재생성
+        from .roster_search import schedule_search_rebuild, search_index_outdated
+        if search_index_outdated(roster):
+            schedule_search_rebuild(roster)
+        return {
+            **stats,
+            'message': f"임포트가 완료되었습니다. ({stats['rows']:,}건, {stats['rows_per_sec']:,.0f}건/초)",
+        }
+    finally:
+        path.unlink(missing_ok=True)
+
+
+@register_job('reset_survey')
+def reset_survey_job(job, progress):
+    survey_id = int(job.params['survey_id'])
+    surveys = SurveyMaster.objects.all() if survey_id == 0 else SurveyMaster.objects.filter(pk=survey_id)
+    survey_ids = list(surveys.values_list('id', flat=True))
+
+    from .design_store import release_blob
+    from .flat_table import drop_flat_table
+    for sid in survey_ids:
+        drop_flat_table(sid)  # 평면 테이블을 먼저 지워 CASCADE 삭제 부담을 줄임
+
+    deleted = purge_survey_data(SurveyData.objects.filter(roster__survey_id__in=survey_ids), progress)
+    # 수집 데이터를 먼저 비웠으므로 나머지 CASCADE 삭제는 가볍습니다.
+    with transaction.atomic():
+        count = SurveyMaster.objects.filter(id__in=survey_ids).count()
+        blob_ids = set(QuestionnaireVersion.objects.filter(
+            questionnaire__roster__survey_id__in=survey_ids
+        ).values_list('design_blob_id', flat=True))
+        SurveyMaster.objects.filter(id__in=survey_ids).delete()
+        for blob_id in blob_ids:  # 다른 조사의 버전이 쓰지 않는 설계 블롭 정리
+            release_blob(blob_id)
+
+    if survey_id == 0:
+        message = f"전체 초기화 성공: {count}건의 모든 조사 프로젝트가 삭제되었습니다."
+    else:
+        message = f"삭제 성공: 조사(ID: {survey_id})와 관련 데이터가 삭제되었습니다."
+    return {'surveys': count, 'rows': deleted, 'message': message}
+
+
+@register_job('clear_roster')
+def clear_roster_job(job, progress):
+    from .progress import recount
+    from .snapshots import record_data_change
+
+    roster_id = int(job.params['roster_id'])
+    deleted = purge_survey_data(SurveyData.objects.filter(roster_id=roster_id), progress)
+    # 삭제된 레코드를 진행 현황 카운터에서 제외 (조사 전체 재계산)
+    survey_id = SurveyRoster.objects.filter(pk=roster_id).values_list('survey_id', flat=True).first()
+    if survey_id:
+        recount(survey_id)
+        record_data_change(survey_id, deleted)
+    return {'rows': deleted, 'message': f"{deleted}건의 데이터가 삭제되었습니다. 이제 다시 업로드하세요."}
+
+
+@register_job('pivot_export')
+def pivot_export_job(job, progress):
+    from .pivot import pivot_queryset, iter_pivot_rows, iter_pivot_json
+
+    survey_id = int(job.params['survey_id'])
+    fields = job.params.get('fields')
+    total = pivot_queryset(survey_id).count()
+    progress(0, total, '피벗 데이터 추출 중', force=True)
+
+    count = 0
+
+    def counted(rows):
+        nonlocal count
+        for row in rows:
+            count += 1
+            if count % 2000 == 0:
+                progress(count)
+            yield row
+
+    file_name = f"pivot_{survey_id}_{job.id}.json"
+    with open(job_file_path(file_name), 'w', encoding='utf-8') as f:
+        for piece in iter_pivot_json(counted(iter_pivot_rows(survey_id, fields))):
+            f.write(piece)
+    progress(count)
+    return {'rows': count, 'file_name': file_name, 'message': f"{count:,}건 추출 완료"}
+
+
+@register_job('revalidate')
+def revalidate_job(job, progress):
+    from .revalidation import revalidate_degree
+
+    degree = SurveyDegree.objects.select_related('survey').get(pk=job.params['degree_id'])
+    rosters = SurveyRoster.objects.filter(survey=degree.survey).select_related('survey')
+    if job.params.get('roster_id'):
+        rosters = rosters.filter(pk=job.params['roster_id'])
+
+    total = SurveyData.objects.filter(roster__in=rosters, degree=degree).count()
+    progress(0, total, '재검증 중', force=True)
+    summary = {'processed': 0, 'changed': 0, 'skipped': 0, 'error_rows': 0, 'warning_rows': 0}
+    for roster in rosters:
+        done_before = summary['processed']
+        stats = revalidate_degree(
+            roster, degree,
+            progress=lambda processed, roster_total, s: progress(done_before + processed),
+        )
+        for key in summary:
+            summary[key] += stats[key]
+        progress(summary['processed'])
+    summary['message'] = (
+        f"재검증 완료: {summary['processed']:,}건 / 변경 {summary['changed']:,}건 / "
+        f"저장 중 건너뜀 {summary['skipped']:,}건 / "
+        f"에러 {summary['error_rows']:,}건 / 경고 {summary['warning_rows']:,}건"
+    )
+    return summary
+
+
+@register_job('rebuild_flat_table')
+def rebuild_flat_table_job(job, progress):
+    from .flat_table import rebuild_flat_table
+
+    survey_id = int(job.params['survey_id'])
+    if not SurveyMaster.objects.filter(pk=survey_id).exists():
+        return {'message': f"조사(ID: {survey_id})가 없어 생략되었습니다."}
+    progress(0, None, '분석 테이블 생성 중', force=True)
+    stats = rebuild_flat_table(survey_id, progress=lambda rows, total: progress(rows, total))
+    stats['message'] = (
+        f"분석 테이블 생성 완료: {stats['rows']:,}건 / {stats['columns']:,}개 컬럼 ({stats['rows_per_sec']:,.0f}건/초)"
+    )
+    return stats
+
+
+@register_job('rebuild_roster_search')
+def rebuild_roster_search_job(job, progress):
+    from .roster_search import rebuild_roster_search
+
+    roster = SurveyRoster.objects.filter(pk=job.params['roster_id']).first()
+    if roster is None:
+        return {'message': f"명부(ID: {job.params['roster_id']})가 없어 생략되었습니다."}
+    progress(0, None, '검색 색인 생성 중', force=True)
+    stats = rebuild_roster_search(roster, progress=lambda rows, total: progress(rows, total))
+    stats['message'] = (
+        f"검색 색인 생성 완료 ({stats['backend']}): 항목 {len(stats['fields'])}개 / {stats['elapsed']:.1f}초"
+    )
+    return stats
+
+
+@register_job('refresh_analysis_snapshots')
+def refresh_analysis_snapshots_job(job, progress):
+    from .snapshots import refresh_snapshots
+
+    survey_id = job.params.get('survey_id')
+    progress(0, None, '분석 스냅샷 갱신 중', force=True)
+    stats = refresh_snapshots(
+        [int(survey_id)] if survey_id else None,
+        force=bool(job.params.get('force')),
+        progress=lambda done, total: progress(done, total),
+    )
+    stats['message'] = (
+        f"분석 스냅샷 갱신 완료: 갱신 {stats['refreshed']:,}건 / 생략 {stats['skipped']:,}건 / 실패 {stats['failed']:,}건"
+    )
+    return stats
@@ -0,0 +1,100 @@
+# surveys/management/commands/benchmark_response_saves.py
+import random
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Count
+
+from surveys.models import SurveyData, SurveyDegree, SurveyRoster
+from surveys.responses import upsert_response
+
+BENCH_PREFIX = 'BENCH-'
+
+
+class Command(BaseCommand):
+    help = (
+        "동시 저장 환경에서 응답 저장 처리량(saves/sec)을 측정합니다. "
+        "upsert(ON CONFLICT) 방식과 기존 get_or_create + save() 방식을 비교하며, "
+        f"측정용 행({BENCH_PREFIX}*)은 종료 시 삭제됩니다."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--roster', type=int, required=True, help="명부 ID")
+        parser.add_argument('--degree', type=int, required=True, help="조사차수 ID")
+        parser.add_argument('--writers', type=int, default=8, help="동시 저장 스레드 수")
+        parser.add_argument('--saves', type=int, default=500, help="스레드당 저장 횟수")
+        parser.add_argument('--keys', type=int, default=200, help="저장 대상 레코드 수 (작을수록 충돌이 잦음)")
+
+    def handle(self, *args, **options):
+        try:
+            roster = SurveyRoster.objects.get(pk=options['roster'])
+            degree = SurveyDegree.objects.get(pk=options['degree'], survey_id=roster.survey_id)
+        except (SurveyRoster.DoesNotExist, SurveyDegree.DoesNotExist):
+            raise CommandError("명부 또는 차수 ID 가 올바르지 않습니다.")
+
+        masters = [
+            SurveyData(roster=roster, respondent_id=f"{BENCH_PREFIX}{i:06d}", list_values={}, status='READY')
+            for i in range(options['keys'])
+        ]
+        self.stdout.write(
+            f"[{roster.roster_code}] {degree} - 스레드 {options['writers']}개 x {options['saves']}회, "
+            f"대상 {options['keys']}건"
+        )
+        try:
+            for name, save in (('upsert', self._save_upsert), ('get_or_create', self._save_legacy)):
+                self._cleanup(roster)
+                elapsed, failures = self._run(save, masters, degree, options)
+                total = options['writers'] * options['saves']
+                duplicates = SurveyData.objects.filter(
+                    roster=roster, degree=degree, respondent_id__startswith=BENCH_PREFIX
+                ).values('respondent_id').annotate(n=Count('id')).filter(n__gt=1).count()
+                self.stdout.write(self.style.SUCCESS(
+                    f"  {name:<14}: {total / elapsed:,.0f} saves/sec ({elapsed:.1f}초), "
+                    f"실패 {failures}건, 중복 레코드 {duplicates}건"
+                ))
+        finally:
+            self._cleanup(roster)
+
+    def _save_upsert(self, master, degree, values):
+        with transaction.atomic():
+            upsert_response(master, degree, values)
+
+    def _save_legacy(self, master, degree, values):
+        with transaction.atomic():
+            record, _ = SurveyData.objects.get_or_create(
+                roster_id=master.roster_id, degree=degree, respondent_id=master.respondent_id,
+                defaults={'list_values': master.list_values, 'status': 'ING'},
+            )
+            record.survey_values = values
+            record.status = 'ING'
+            record.save()
+
+    def _run(self, save, masters, degree, options):
+        failures = []
+        start = threading.Barrier(options['writers'] + 1)
+
+        def writer(seed):
+            rng = random.Random(seed)
+            start.wait()
+            try:
+                for n in range(options['saves']):
+                    try:
+                        save(rng.choice(masters), degree, {'bench': {'q1': str(n)}})
+                    except DatabaseError:  # 유니크 충돌/잠금 실패 등
+                        failures.append(seed)
+            finally:
+                connection.close()  # 스레드별 DB 연결 정리
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(options['writers'])]
+        for t in threads:
+            t.start()
+        start.wait()
+        started = time.monotonic()
+        for t in threads:
+            t.join()
+        return max(time.monotonic() - started, 1e-6), len(failures)
+
+    def _cleanup(self, roster):
+        SurveyData.objects.filter(roster=roster, respondent_id__startswith=BENCH_PREFIX).delete()
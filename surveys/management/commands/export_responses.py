@@ -0,0 +1,57 @@
+# surveys/management/commands/export_responses.py
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from surveys.export import EXPORT_FORMATS, export_stream
+from surveys.models import SurveyData, SurveyDegree, SurveyRoster
+
+
+class Command(BaseCommand):
+    help = "명부/차수 수집 자료를 스트리밍으로 내보냅니다. (--benchmark: 형식별 처리량 측정)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--roster', type=int, required=True, help="명부 ID")
+        parser.add_argument('--degree', type=int, required=True, help="조사차수 ID")
+        parser.add_argument('--format', default='csv', choices=EXPORT_FORMATS, help="출력 형식")
+        parser.add_argument('--output', help="출력 파일 경로 (생략 시 표준출력)")
+        parser.add_argument('--chunk-size', type=int, default=5000, help="한 번에 읽을 행 수")
+        parser.add_argument('--benchmark', action='store_true', help="모든 형식을 파일 저장 없이 생성하여 MB/초 측정")
+
+    def handle(self, *args, **options):
+        try:
+            roster = SurveyRoster.objects.get(pk=options['roster'])
+            degree = SurveyDegree.objects.get(pk=options['degree'])
+        except (SurveyRoster.DoesNotExist, SurveyDegree.DoesNotExist):
+            raise CommandError("명부 또는 차수 ID 가 존재하지 않습니다.")
+
+        if options['benchmark']:
+            rows = SurveyData.objects.filter(roster=roster, degree=degree).count()
+            self.stderr.write(f"[{roster.roster_code}] {degree} {rows:,}건 내보내기 측정")
+            for fmt in EXPORT_FORMATS:
+                size, elapsed, extension = self._run(roster, degree, fmt, options['chunk_size'], None)
+                self.stderr.write(self.style.SUCCESS(
+                    f"  {fmt:<9} ({extension}): {size / 1024 / 1024:,.1f}MB / {elapsed:.1f}초 = "
+                    f"{size / 1024 / 1024 / elapsed:,.1f}MB/초, {rows / elapsed:,.0f}건/초"
+                ))
+            return
+
+        if options['output']:
+            with open(options['output'], 'wb') as f:
+                size, elapsed, _ = self._run(roster, degree, options['format'], options['chunk_size'], f)
+        else:
+            size, elapsed, _ = self._run(roster, degree, options['format'], options['chunk_size'], sys.stdout.buffer)
+        self.stderr.write(self.style.SUCCESS(
+            f"완료: {size / 1024 / 1024:,.1f}MB / {elapsed:.1f}초 ({size / 1024 / 1024 / elapsed:,.1f}MB/초)"
+        ))
+
+    def _run(self, roster, degree, fmt, chunk_size, out):
+        started = time.monotonic()
+        chunks, _, extension = export_stream(roster, degree, fmt, chunk_size)
+        size = 0
+        for chunk in chunks:
+            size += len(chunk)
+            if out is not None:
+                out.write(chunk)
+        return size, max(time.monotonic() - started, 1e-6), extension
@@ -0,0 +1,40 @@
+# surveys/management/commands/import_roster.py
+from django.core.management.base import BaseCommand, CommandError
+
+from surveys.models import SurveyDesign, SurveyMaster
+from surveys.roster_import import import_roster_stream
+
+
+class Command(BaseCommand):
+    help = "명부 CSV 파일을 대량 적재합니다. (웹 업로드와 동일한 규칙)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('survey_id', type=int, help="조사 ID")
+        parser.add_argument('csv_path', help="CSV 파일 경로 (UTF-8)")
+        parser.add_argument('--chunk-size', type=int, default=None, help="한 번에 적재할 행 수")
+        parser.add_argument('--no-copy', action='store_true', help="PostgreSQL COPY 대신 bulk_create 사용")
+
+    def handle(self, *args, **options):
+        try:
+            survey = SurveyMaster.objects.get(pk=options['survey_id'])
+            design = SurveyDesign.objects.get(survey=survey)
+        except (SurveyMaster.DoesNotExist, SurveyDesign.DoesNotExist):
+            raise CommandError("조사 또는 설계 정보가 없습니다.")
+        roster = survey.rosters.first()
+        if not roster:
+            raise CommandError("명부를 먼저 등록하세요.")
+
+        def progress(rows, stats):
+            self.stdout.write(f"  {rows:,}건 적재 - {stats['rows_per_sec']:,.0f} rows/sec")
+
+        with open(options['csv_path'], encoding='utf-8-sig', newline='') as f:
+            stats = import_roster_stream(
+                survey, roster, design, f,
+                chunk_size=options['chunk_size'],
+                use_copy=False if options['no_copy'] else None,
+                progress=progress,
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"완료: {stats['rows']:,}건 / {stats['elapsed']:.1f}초 "
+            f"({stats['rows_per_sec']:,.0f} rows/sec, {stats['method']})"
+        ))
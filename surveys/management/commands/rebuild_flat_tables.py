@@ -0,0 +1,30 @@
+# surveys/management/commands/rebuild_flat_tables.py
+from django.core.management.base import BaseCommand, CommandError
+
+from surveys.flat_table import rebuild_flat_table
+from surveys.models import SurveyMaster
+
+
+class Command(BaseCommand):
+    help = "조사별 분석용 평면 테이블(surveys_flat_<조사ID>)을 확정 버전 설계 기준으로 다시 생성합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--survey', type=int, action='append', help="조사 ID (여러 번 지정 가능, 생략 시 전체)")
+        parser.add_argument('--stale-only', action='store_true', help="재생성 필요 표시된 조사만 처리")
+
+    def handle(self, *args, **options):
+        surveys = SurveyMaster.objects.order_by('id')
+        if options['survey']:
+            surveys = surveys.filter(pk__in=options['survey'])
+            if surveys.count() != len(set(options['survey'])):
+                raise CommandError("존재하지 않는 조사 ID 가 포함되어 있습니다.")
+        if options['stale_only']:
+            surveys = surveys.filter(flat_table__is_stale=True)
+
+        for survey in surveys:
+            self.stdout.write(f"[{survey.survey_code}] {survey.survey_name} 분석 테이블 생성")
+            stats = rebuild_flat_table(survey.id)
+            self.stdout.write(self.style.SUCCESS(
+                f"  완료: {stats['rows']:,}건 / {stats['columns']:,}개 컬럼 / "
+                f"{stats['elapsed']:.1f}초 ({stats['rows_per_sec']:,.0f} rows/sec)"
+            ))
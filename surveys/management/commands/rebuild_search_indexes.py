@@ -0,0 +1,31 @@
+# surveys/management/commands/rebuild_search_indexes.py
+from django.core.management.base import BaseCommand, CommandError
+
+from surveys.models import SurveyRoster
+from surveys.roster_search import rebuild_roster_search, roster_search_fields, search_index_outdated
+
+
+class Command(BaseCommand):
+    help = "명부 검색 항목의 검색 색인(pg_trgm GIN 인덱스 또는 검색 토큰)을 다시 생성합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--roster', type=int, action='append', help="명부 ID (여러 번 지정 가능, 생략 시 전체)")
+        parser.add_argument('--outdated-only', action='store_true', help="검색 항목 구성이 바뀐 명부만 처리")
+
+    def handle(self, *args, **options):
+        rosters = SurveyRoster.objects.order_by('id')
+        if options['roster']:
+            rosters = rosters.filter(pk__in=options['roster'])
+            if rosters.count() != len(set(options['roster'])):
+                raise CommandError("존재하지 않는 명부 ID 가 포함되어 있습니다.")
+
+        for roster in rosters:
+            if not roster_search_fields(roster) and not roster.search_index:
+                continue
+            if options['outdated_only'] and not search_index_outdated(roster):
+                continue
+            self.stdout.write(f"[{roster.roster_code}] {roster.roster_name} 검색 색인 생성")
+            stats = rebuild_roster_search(roster)
+            self.stdout.write(self.style.SUCCESS(
+                f"  완료 ({stats['backend']}): 항목 {', '.join(stats['fields']) or '-'} / {stats['elapsed']:.1f}초"
+            ))
@@ -0,0 +1,41 @@
+# surveys/management/commands/reconcile_progress.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from surveys.models import ProgressCounter, SurveyMaster
+from surveys.progress import recount
+
+
+class Command(BaseCommand):
+    help = "진행 현황 카운터를 수집 데이터에서 다시 계산하고, 기존 카운터와 달랐던 항목 수를 보고합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--survey', type=int, action='append', help="조사 ID (여러 번 지정 가능, 생략 시 전체)")
+
+    def handle(self, *args, **options):
+        surveys = SurveyMaster.objects.order_by('id')
+        if options['survey']:
+            surveys = surveys.filter(pk__in=options['survey'])
+            if surveys.count() != len(set(options['survey'])):
+                raise CommandError("존재하지 않는 조사 ID 가 포함되어 있습니다.")
+
+        for survey in surveys:
+            started = time.monotonic()
+            before = self._snapshot(survey.id)
+            rows = recount(survey.id)
+            after = self._snapshot(survey.id)
+            mismatched = sum(1 for key in before.keys() | after.keys() if before.get(key, 0) != after.get(key, 0))
+            style = self.style.WARNING if mismatched else self.style.SUCCESS
+            self.stdout.write(style(
+                f"[{survey.survey_code}] {survey.survey_name}: 카운터 {rows:,}건 재계산, "
+                f"불일치 {mismatched:,}건 보정 ({time.monotonic() - started:.1f}초)"
+            ))
+
+    def _snapshot(self, survey_id):
+        return {
+            (degree_id, area_id, user_id, status): count
+            for degree_id, area_id, user_id, status, count in ProgressCounter.objects.filter(
+                survey_id=survey_id
+            ).values_list('degree_id', 'area_id', 'assigned_user_id', 'status', 'count')
+        }
@@ -0,0 +1,23 @@
+# surveys/management/commands/refresh_analysis_snapshots.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from surveys.snapshots import refresh_snapshots
+
+
+class Command(BaseCommand):
+    help = "저장된 분석의 집계 스냅샷 중 갱신이 필요한 것을 다시 만듭니다. (cron 으로 주기 실행)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--survey', type=int, action='append', help="조사 ID (여러 번 지정 가능, 생략 시 전체)")
+        parser.add_argument('--force', action='store_true', help="갱신 조건과 관계없이 모두 다시 생성")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        stats = refresh_snapshots(options['survey'], force=options['force'])
+        style = self.style.WARNING if stats['failed'] else self.style.SUCCESS
+        self.stdout.write(style(
+            f"분석 스냅샷: 갱신 {stats['refreshed']:,}건 / 생략 {stats['skipped']:,}건 / 실패 {stats['failed']:,}건 "
+            f"({time.monotonic() - started:.1f}초)"
+        ))
@@ -0,0 +1,51 @@
+# surveys/management/commands/revalidate_rules.py
+from django.core.management.base import BaseCommand, CommandError
+
+from surveys.models import SurveyDegree, SurveyRoster
+from surveys.revalidation import revalidate_degree
+
+
+class Command(BaseCommand):
+    help = "차수의 저장된 응답 자료를 현재 내검 규칙으로 일괄 재검증합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--degree', type=int, required=True, help="조사차수 ID")
+        parser.add_argument('--roster', type=int, help="명부 ID (생략 시 조사의 전체 명부)")
+        parser.add_argument('--chunk-size', type=int, default=2000, help="한 번에 처리할 행 수")
+        parser.add_argument('--workers', type=int, default=None, help="프로세스 수 (기본: CPU 수, 1: 단일 프로세스)")
+        parser.add_argument('--dry-run', action='store_true', help="결과를 저장하지 않고 통계만 출력")
+
+    def handle(self, *args, **options):
+        try:
+            degree = SurveyDegree.objects.select_related('survey').get(pk=options['degree'])
+        except SurveyDegree.DoesNotExist:
+            raise CommandError(f"차수 ID {options['degree']} 가 존재하지 않습니다.")
+
+        rosters = SurveyRoster.objects.filter(survey=degree.survey).select_related('survey')
+        if options['roster']:
+            rosters = rosters.filter(pk=options['roster'])
+            if not rosters.exists():
+                raise CommandError(f"명부 ID {options['roster']} 가 해당 조사에 존재하지 않습니다.")
+
+        for roster in rosters:
+            self.stdout.write(f"[{roster.roster_code}] {roster.roster_name} / {degree} 재검증 시작")
+
+            def progress(processed, total, stats):
+                self.stdout.write(
+                    f"  {processed:,}/{total:,} ({processed * 100 // total}%) "
+                    f"- {stats['rows_per_sec']:,.0f} rows/sec"
+                )
+
+            stats = revalidate_degree(
+                roster, degree,
+                chunk_size=options['chunk_size'],
+                workers=options['workers'],
+                dry_run=options['dry_run'],
+                progress=progress,
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f"  완료: {stats['processed']:,}건 / 변경 {stats['changed']:,}건 / 건너뜀 {stats['skipped']:,}건 / "
+                f"에러 {stats['error_rows']:,}건 / 경고 {stats['warning_rows']:,}건 / "
+                f"{stats['elapsed']:.1f}초 ({stats['rows_per_sec']:,.0f} rows/sec)"
+                + (" [dry-run]" if options['dry_run'] else "")
+            ))
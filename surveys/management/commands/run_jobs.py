@@ -0,0 +1,60 @@
+# surveys/management/commands/run_jobs.py
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections, connection
+
+from surveys.jobs import claim_next_job, default_worker_name, fail_stale_jobs, run_job
+
+
+def _run_in_thread(job):
+    try:
+        run_job(job)
+    finally:
+        # 스레드별 DB 커넥션 정리
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = "백그라운드 작업 워커 (DB 대기열의 작업을 가져와 실행합니다)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=2, help="동시에 실행할 작업 수 (스레드)")
+        parser.add_argument('--poll-interval', type=float, default=2.0, help="대기열 확인 간격(초)")
+        parser.add_argument('--stale-minutes', type=int, default=30, help="진행 보고가 끊긴 작업을 실패 처리할 기준(분)")
+        parser.add_argument('--once', action='store_true', help="대기 작업을 모두 처리하면 종료")
+
+    def handle(self, *args, **options):
+        worker_name = default_worker_name()
+        concurrency = max(options['concurrency'], 1)
+        self.stdout.write(f"워커 시작: {worker_name} (동시 실행 {concurrency})")
+
+        stale = fail_stale_jobs(options['stale_minutes'])
+        if stale:
+            self.stdout.write(self.style.WARNING(f"중단된 작업 {stale}건을 실패 처리했습니다."))
+
+        running = set()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            try:
+                while True:
+                    running = {f for f in running if not f.done()}
+                    job = None
+                    if len(running) < concurrency:
+                        close_old_connections()
+                        try:
+                            job = claim_next_job(worker_name)
+                        except DatabaseError as e:
+                            # DB 일시 오류는 다음 주기에 재시도
+                            self.stderr.write(f"대기열 조회 실패: {e}")
+                            connection.close()
+                    if job:
+                        self.stdout.write(f"작업 시작: {job}")
+                        running.add(executor.submit(_run_in_thread, job))
+                        continue
+                    if options['once'] and not running:
+                        break
+                    time.sleep(options['poll_interval'])
+            except KeyboardInterrupt:
+                self.stdout.write("종료 요청: 실행 중인 작업이 끝나기를 기다립니다.")
+        self.stdout.write(self.style.SUCCESS("워커 종료"))
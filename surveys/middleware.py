@@ -0,0 +1,119 @@
+# surveys/middleware.py
+import importlib.util
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.functional import SimpleLazyObject
+from django.utils.text import compress_sequence, compress_string
+
+from .access import get_user_access
+
+if importlib.util.find_spec('brotli') is not None:
+    import brotli
+else:
+    brotli = None
+
+
+class UserAccessMiddleware:
+    """
+    request.access 로 사용자 권한/관할 범위(UserAccess)를 제공합니다.
+    처음 접근할 때 한 번 해석하며, 이후 같은 요청에서는 추가 조회가 없습니다.
+    (AuthenticationMiddleware 뒤에 위치해야 합니다)
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.access = SimpleLazyObject(lambda: get_user_access(request.user))
+        return self.get_response(request)
+
+
+def _accepted_encodings(header):
+    """Accept-Encoding 에서 허용(q > 0)된 인코딩 이름 집합"""
+    accepted = set()
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name and q > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def _brotli_sequence(sequence, quality):
+    compressor = brotli.Compressor(quality=quality)
+    for item in sequence:
+        data = compressor.process(item) + compressor.flush()  # 스트리밍 중에도 조각마다 전달
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware:
+    """
+    JSON/NDJSON 응답 압축 (Accept-Encoding 에 따라 brotli > gzip)
+
+    - 일반 응답은 RESPONSE_COMPRESS_MIN_SIZE 바이트 이상일 때만, 압축 결과가 더 작을 때만 적용
+    - 스트리밍 응답(피벗 데이터 등)은 크기를 미리 알 수 없으므로 항상 조각 단위로 압축
+    - brotli 패키지가 없으면 gzip 만 사용
+    - 비밀값이 섞인 HTML 페이지(BREACH)를 피하기 위해 JSON 계열 응답만 대상으로 함
+      gzip 은 Django 의 무작위 파일명 패딩을 그대로 사용
+    """
+    content_types = ('application/json', 'application/x-ndjson')
+    max_random_bytes = 100
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = getattr(settings, 'RESPONSE_COMPRESS_MIN_SIZE', 1024)
+        self.brotli_quality = getattr(settings, 'RESPONSE_BROTLI_QUALITY', 5)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        content_type = response.get('Content-Type', '').split(';')[0].strip()
+        if content_type not in self.content_types or response.has_header('Content-Encoding'):
+            return response
+        if response.streaming and response.is_async:  # WSGI 배포 기준 - 비동기 스트림은 그대로 전달
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        accepted = _accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if brotli is not None and 'br' in accepted:
+            encoding = 'br'
+        elif 'gzip' in accepted:
+            encoding = 'gzip'
+        else:
+            return response
+
+        if response.streaming:
+            if encoding == 'br':
+                response.streaming_content = _brotli_sequence(response.streaming_content, self.brotli_quality)
+            else:
+                response.streaming_content = compress_sequence(
+                    response.streaming_content, max_random_bytes=self.max_random_bytes
+                )
+            del response.headers['Content-Length']
+        else:
+            if encoding == 'br':
+                compressed = brotli.compress(response.content, quality=self.brotli_quality)
+            else:
+                compressed = compress_string(response.content, max_random_bytes=self.max_random_bytes)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # 본문 바이트가 달라지므로 강한 ETag 는 약한 ETag 로 (조건부 요청 비교는 그대로 동작)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
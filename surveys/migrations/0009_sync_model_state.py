@@ -0,0 +1,125 @@
+# Generated by Django 6.0 on 2026-10-18 15:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0008_alter_surveydesign_options'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SqlLabManager',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+            ],
+            options={
+                'verbose_name': 'SQL 관리 (Superset)',
+                'verbose_name_plural': 'SQL 관리 (Superset)',
+                'managed': False,
+            },
+        ),
+        migrations.AlterModelOptions(
+            name='questionnaireversion',
+            options={},
+        ),
+        migrations.RemoveField(
+            model_name='surveymaster',
+            name='survey_degree',
+        ),
+        migrations.AddField(
+            model_name='questionnaireversion',
+            name='item_count',
+            field=models.IntegerField(default=0, verbose_name='문항수'),
+        ),
+        migrations.AddField(
+            model_name='questionnaireversion',
+            name='ver_form_id',
+            field=models.CharField(max_length=50, null=True, unique=True, verbose_name='버전별조사표ID'),
+        ),
+        migrations.AddField(
+            model_name='surveydata',
+            name='assigned_user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='assigned_workload', to=settings.AUTH_USER_MODEL, verbose_name='담당조사원'),
+        ),
+        migrations.AddField(
+            model_name='surveymaster',
+            name='description',
+            field=models.TextField(blank=True, null=True, verbose_name='조사설명'),
+        ),
+        migrations.AddField(
+            model_name='surveymaster',
+            name='managers',
+            field=models.ManyToManyField(blank=True, related_name='managed_surveys', to=settings.AUTH_USER_MODEL, verbose_name='담당 관리자'),
+        ),
+        migrations.CreateModel(
+            name='SurveyAnalysis',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200, verbose_name='분석 제목')),
+                ('description', models.TextField(blank=True, verbose_name='설명')),
+                ('report_config', models.JSONField(verbose_name='리포트 설정(JSON)')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='생성일')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='수정일')),
+                ('survey', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='surveys.surveymaster', verbose_name='조사')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SurveyArea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('area_code', models.CharField(max_length=20, verbose_name='권역코드')),
+                ('area_name', models.CharField(max_length=100, verbose_name='권역명')),
+                ('level', models.IntegerField(default=1, verbose_name='권역레벨')),
+                ('parent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='children', to='surveys.surveyarea')),
+                ('survey', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='areas', to='surveys.surveymaster')),
+            ],
+            options={
+                'verbose_name': '조사별 권역 설정',
+                'unique_together': {('survey', 'area_code')},
+            },
+        ),
+        migrations.AddField(
+            model_name='surveydata',
+            name='area',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='surveys.surveyarea', verbose_name='소속권역'),
+        ),
+        migrations.CreateModel(
+            name='SurveyAreaUser',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_manager', models.BooleanField(default=False, verbose_name='권역관리자여부')),
+                ('area', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='surveys.surveyarea')),
+                ('survey', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='surveys.surveymaster')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='assigned_areas', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SurveyDegree',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('degree_number', models.IntegerField(verbose_name='조사차수')),
+                ('degree_title', models.CharField(help_text='예: 2024년 상반기 정기조사', max_length=200, verbose_name='차수명')),
+                ('start_date', models.DateField(verbose_name='조사시작일')),
+                ('end_date', models.DateField(verbose_name='조사종료일')),
+                ('is_active', models.BooleanField(default=True, verbose_name='활성여부')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('survey', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='degrees', to='surveys.surveymaster', verbose_name='조사마스터')),
+            ],
+            options={
+                'verbose_name': '조사 차수',
+                'verbose_name_plural': '조사 차수 목록',
+                'unique_together': {('survey', 'degree_number')},
+            },
+        ),
+        migrations.AddField(
+            model_name='surveydata',
+            name='degree',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='surveys.surveydegree', verbose_name='조사차수'),
+        ),
+    ]
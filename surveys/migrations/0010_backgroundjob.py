@@ -0,0 +1,39 @@
+# Generated by Django 6.0 on 2026-10-18 15:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0009_sync_model_state'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackgroundJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_type', models.CharField(max_length=50, verbose_name='작업유형')),
+                ('params', models.JSONField(default=dict, verbose_name='작업인자')),
+                ('status', models.CharField(choices=[('QUEUED', '대기'), ('RUNNING', '실행중'), ('DONE', '완료'), ('FAILED', '실패')], db_index=True, default='QUEUED', max_length=20, verbose_name='상태')),
+                ('total', models.BigIntegerField(blank=True, null=True, verbose_name='전체건수')),
+                ('processed', models.BigIntegerField(default=0, verbose_name='처리건수')),
+                ('message', models.TextField(blank=True, verbose_name='메시지')),
+                ('result', models.JSONField(blank=True, default=dict, verbose_name='결과')),
+                ('worker', models.CharField(blank=True, max_length=100, verbose_name='처리워커')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='요청자')),
+            ],
+            options={
+                'verbose_name': '백그라운드 작업',
+                'verbose_name_plural': '백그라운드 작업 목록',
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 6.0 on 2026-10-18 16:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0010_backgroundjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SurveyFlatTable',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table_name', models.CharField(max_length=63, verbose_name='테이블명')),
+                ('rows_table_name', models.CharField(max_length=63, verbose_name='표 문항 테이블명')),
+                ('columns', models.JSONField(default=list, verbose_name='컬럼정의')),
+                ('version_ids', models.JSONField(default=list, verbose_name='반영된 확정버전')),
+                ('row_count', models.BigIntegerField(default=0, verbose_name='행수')),
+                ('is_stale', models.BooleanField(default=False, verbose_name='재생성필요')),
+                ('built_at', models.DateTimeField(blank=True, null=True, verbose_name='생성일시')),
+                ('survey', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='flat_table', to='surveys.surveymaster', verbose_name='조사')),
+            ],
+            options={
+                'verbose_name': '분석용 평면 테이블',
+                'verbose_name_plural': '분석용 평면 테이블 목록',
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+def fill_area_paths(apps, schema_editor):
+    """기존 권역의 구체화 경로를 parent 관계로 계산해 채웁니다."""
+    SurveyArea = apps.get_model('surveys', 'SurveyArea')
+    areas = list(SurveyArea.objects.only('id', 'parent_id'))
+    by_id = {area.id: area for area in areas}
+    paths = {}
+
+    def resolve(area):
+        if area.id in paths:
+            return paths[area.id]
+        parent = by_id.get(area.parent_id)
+        paths[area.id] = (resolve(parent) if parent else '/') + f"{area.id}/"
+        return paths[area.id]
+
+    for area in areas:
+        area.path = resolve(area)
+    SurveyArea.objects.bulk_update(areas, ['path'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0011_surveyflattable'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='surveyarea',
+            name='path',
+            field=models.CharField(db_index=True, default='', max_length=255, verbose_name='권역경로'),
+        ),
+        migrations.RunPython(fill_area_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 6.0 on 2026-10-18 17:10
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+
+def dedupe_responses(apps, schema_editor):
+    """
+    (명부, 차수, 명부레코드ID) 중복 응답 행 정리
+    그룹별로 가장 최근 수정된 행(동률이면 ID 가 큰 행)만 남기고 나머지를 일괄 삭제합니다.
+    """
+    SurveyData = apps.get_model('surveys', 'SurveyData')
+    ranked = SurveyData.objects.filter(degree__isnull=False).annotate(
+        rank=Window(
+            RowNumber(),
+            partition_by=[F('roster_id'), F('degree_id'), F('respondent_id')],
+            order_by=[F('updated_at').desc(), F('id').desc()],
+        )
+    ).filter(rank__gt=1)
+    duplicate_ids = list(ranked.values_list('id', flat=True))
+    for start in range(0, len(duplicate_ids), 5000):
+        SurveyData.objects.filter(id__in=duplicate_ids[start:start + 5000]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0012_surveyarea_path'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_responses, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='surveydata',
+            constraint=models.UniqueConstraint(fields=('roster', 'degree', 'respondent_id'), name='uniq_surveydata_roster_degree_respondent'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-18 17:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0013_surveydata_uniq_surveydata_roster_degree_respondent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='surveyroster',
+            name='search_index',
+            field=models.JSONField(blank=True, default=dict, verbose_name='검색색인상태'),
+        ),
+        migrations.CreateModel(
+            name='RosterSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field_id', models.CharField(max_length=50, verbose_name='검색항목ID')),
+                ('token', models.CharField(max_length=8, verbose_name='토큰')),
+                ('data', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='surveys.surveydata')),
+                ('roster', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='surveys.surveyroster')),
+            ],
+            options={
+                'verbose_name': '명부 검색 토큰',
+                'indexes': [models.Index(fields=['roster', 'field_id', 'token'], name='surveys_rst_lookup_idx')],
+            },
+        ),
+    ]
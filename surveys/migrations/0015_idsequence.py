@@ -0,0 +1,54 @@
+# Generated by Django 6.0 on 2026-10-18 18:20
+
+from django.db import migrations, models
+from django.db.models import BigIntegerField, Max
+from django.db.models.functions import Cast, Substr
+
+# 채번명: (접두어, 모델, 필드) - surveys.id_allocator.ID_FORMATS 와 같은 규칙
+SEQUENCES = {
+    'respondent': ('', 'SurveyData', 'respondent_id'),
+    'roster': ('N', 'SurveyRoster', 'roster_code'),
+    'form': ('S', 'SurveyQuestionnaire', 'form_id'),
+}
+
+
+def create_sequences(apps, schema_editor):
+    """기존 ID 의 최대 번호 다음부터 시작하도록 채번 시퀀스(또는 카운터)를 만듭니다."""
+    IdSequence = apps.get_model('surveys', 'IdSequence')
+    connection = schema_editor.connection
+    for name, (prefix, model_name, field) in SEQUENCES.items():
+        model = apps.get_model('surveys', model_name)
+        number = Cast(Substr(field, len(prefix) + 1), BigIntegerField()) if prefix else Cast(field, BigIntegerField())
+        last = model.objects.filter(**{f"{field}__regex": rf"^{prefix}[0-9]+$"}).aggregate(last=Max(number))['last'] or 0
+        if connection.vendor == 'postgresql':
+            schema_editor.execute(f"CREATE SEQUENCE IF NOT EXISTS surveys_id_{name} START WITH {int(last) + 1}")
+        else:
+            IdSequence.objects.update_or_create(name=name, defaults={'last_value': last})
+
+
+def drop_sequences(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for name in SEQUENCES:
+            schema_editor.execute(f"DROP SEQUENCE IF EXISTS surveys_id_{name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0014_surveyroster_search_index_rostersearchtoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=30, unique=True, verbose_name='채번명')),
+                ('last_value', models.BigIntegerField(default=0, verbose_name='마지막 번호')),
+            ],
+            options={
+                'verbose_name': 'ID 채번 카운터',
+            },
+        ),
+        migrations.RunPython(create_sequences, drop_sequences),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 6.0 on 2026-10-18 19:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_counters(apps, schema_editor):
+    """기존 수집 데이터로 진행 현황 카운터를 채웁니다. (surveys.progress.recount 와 같은 집계, INSERT ... SELECT)"""
+    quote = schema_editor.quote_name
+    counter = quote(apps.get_model('surveys', 'ProgressCounter')._meta.db_table)
+    data = quote(apps.get_model('surveys', 'SurveyData')._meta.db_table)
+    roster = quote(apps.get_model('surveys', 'SurveyRoster')._meta.db_table)
+    columns = "survey_id, degree_id, area_id, assigned_user_id, status, count"
+    # 원본 명부 레코드 수 (degree 없음, 'TOTAL')
+    schema_editor.execute(
+        f"INSERT INTO {counter} ({columns}) "
+        f"SELECT ro.survey_id, NULL, m.area_id, m.assigned_user_id, 'TOTAL', COUNT(*) "
+        f"FROM {data} m JOIN {roster} ro ON ro.id = m.roster_id "
+        f"WHERE m.degree_id IS NULL AND m.area_id IS NOT NULL "
+        f"GROUP BY ro.survey_id, m.area_id, m.assigned_user_id"
+    )
+    # 차수별 응답 상태 (원본 명부의 권역/담당조사원 기준)
+    schema_editor.execute(
+        f"INSERT INTO {counter} ({columns}) "
+        f"SELECT ro.survey_id, r.degree_id, m.area_id, m.assigned_user_id, r.status, COUNT(*) "
+        f"FROM {data} r JOIN {roster} ro ON ro.id = r.roster_id "
+        f"JOIN {data} m ON m.roster_id = r.roster_id AND m.respondent_id = r.respondent_id AND m.degree_id IS NULL "
+        f"WHERE r.degree_id IS NOT NULL AND m.area_id IS NOT NULL "
+        f"GROUP BY ro.survey_id, r.degree_id, m.area_id, m.assigned_user_id, r.status"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0015_idsequence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProgressCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(max_length=20, verbose_name='상태')),
+                ('count', models.BigIntegerField(default=0, verbose_name='건수')),
+                ('area', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='surveys.surveyarea', verbose_name='권역')),
+                ('assigned_user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='담당조사원')),
+                ('degree', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='surveys.surveydegree', verbose_name='조사차수')),
+                ('survey', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress_counters', to='surveys.surveymaster')),
+            ],
+            options={
+                'verbose_name': '진행 현황 카운터',
+                'constraints': [models.UniqueConstraint(fields=('survey', 'degree', 'area', 'assigned_user', 'status'), name='uniq_progress_counter', nulls_distinct=False)],
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0 on 2026-10-18 19:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0016_progresscounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalysisSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payload', models.TextField(verbose_name='집계 결과(JSON)')),
+                ('cell_count', models.IntegerField(default=0, verbose_name='셀 수')),
+                ('config_hash', models.CharField(max_length=64, verbose_name='리포트 설정 해시')),
+                ('data_version', models.BigIntegerField(default=0, verbose_name='데이터 버전')),
+                ('error', models.TextField(blank=True, verbose_name='집계 불가 사유')),
+                ('built_at', models.DateTimeField(verbose_name='생성일')),
+                ('elapsed', models.FloatField(default=0, verbose_name='생성 소요(초)')),
+                ('analysis', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='snapshot', to='surveys.surveyanalysis')),
+            ],
+            options={
+                'verbose_name': '분석 스냅샷',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 20:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0017_analysissnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='questionnaireversion',
+            name='revision',
+            field=models.PositiveIntegerField(default=1, verbose_name='설계수정차수'),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 6.0 on 2026-10-18 21:10
+
+import hashlib
+import json
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def move_designs_to_blobs(apps, schema_editor):
+    """기존 버전의 설계 데이터를 블롭으로 옮깁니다. (같은 설계는 한 블롭 공유, 델타는 이후 저장부터)"""
+    DesignBlob = apps.get_model('surveys', 'DesignBlob')
+    QuestionnaireVersion = apps.get_model('surveys', 'QuestionnaireVersion')
+    blob_ids = {}
+    for version in QuestionnaireVersion.objects.only('id', 'design_data').order_by('id').iterator(chunk_size=200):
+        items = version.design_data or []
+        text = json.dumps(items, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+        digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        if digest not in blob_ids:
+            blob_ids[digest] = DesignBlob.objects.create(
+                digest=digest, content=items, size=len(text.encode('utf-8'))
+            ).id
+        QuestionnaireVersion.objects.filter(pk=version.id).update(design_blob_id=blob_ids[digest], item_count=len(items))
+
+
+def restore_designs_from_blobs(apps, schema_editor):
+    DesignBlob = apps.get_model('surveys', 'DesignBlob')
+    QuestionnaireVersion = apps.get_model('surveys', 'QuestionnaireVersion')
+    blobs = {blob_id: (base_id, content) for blob_id, base_id, content in DesignBlob.objects.values_list('id', 'base_id', 'content')}
+    resolved = {}
+
+    def resolve(blob_id):
+        if blob_id not in resolved:
+            base_id, content = blobs[blob_id]
+            if base_id:  # 델타 {"order": [...], "items": {...}}
+                base_map = {item['id']: item for item in resolve(base_id)}
+                content = [content['items'].get(i, base_map.get(i)) for i in content['order']]
+            resolved[blob_id] = content
+        return resolved[blob_id]
+
+    for version_id, blob_id in QuestionnaireVersion.objects.exclude(design_blob=None).values_list('id', 'design_blob_id'):
+        QuestionnaireVersion.objects.filter(pk=version_id).update(design_data=resolve(blob_id))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0018_questionnaireversion_revision'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DesignBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64, unique=True, verbose_name='설계 해시(SHA-256)')),
+                ('content', models.JSONField(verbose_name='설계/델타')),
+                ('depth', models.PositiveSmallIntegerField(default=0, verbose_name='델타 체인 깊이')),
+                ('size', models.IntegerField(default=0, verbose_name='설계 크기(바이트)')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('base', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='deltas', to='surveys.designblob', verbose_name='기준 블롭')),
+            ],
+            options={
+                'verbose_name': '조사표 설계 블롭',
+            },
+        ),
+        migrations.AddField(
+            model_name='questionnaireversion',
+            name='design_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='versions', to='surveys.designblob', verbose_name='설계데이터'),
+        ),
+        migrations.RunPython(move_designs_to_blobs, restore_designs_from_blobs),
+        migrations.RemoveField(
+            model_name='questionnaireversion',
+            name='design_data',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 21:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0019_designblob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='questionnaireversion',
+            name='manifest',
+            field=models.JSONField(blank=True, null=True, verbose_name='설계매니페스트'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 6.0 on 2026-10-18 22:30
+
+from django.db import migrations
+
+from surveys.design_manifest import compile_manifest
+
+
+def backfill_manifests(apps, schema_editor):
+    """이미 확정된 버전의 설계 매니페스트를 채웁니다. (이후에는 확정 시 컴파일)"""
+    DesignBlob = apps.get_model('surveys', 'DesignBlob')
+    QuestionnaireVersion = apps.get_model('surveys', 'QuestionnaireVersion')
+    versions = list(QuestionnaireVersion.objects.filter(is_confirmed=True, manifest__isnull=True).exclude(design_blob=None))
+    if not versions:
+        return
+    blobs = {blob_id: (base_id, content) for blob_id, base_id, content in DesignBlob.objects.values_list('id', 'base_id', 'content')}
+    resolved = {}
+
+    def resolve(blob_id):
+        if blob_id not in resolved:
+            base_id, content = blobs[blob_id]
+            if base_id:  # 델타 {"order": [...], "items": {...}}
+                base_map = {item['id']: item for item in resolve(base_id)}
+                content = [content['items'].get(i, base_map.get(i)) for i in content['order']]
+            resolved[blob_id] = content
+        return resolved[blob_id]
+
+    for version in versions:
+        version.manifest = compile_manifest(resolve(version.design_blob_id))
+    QuestionnaireVersion.objects.bulk_update(versions, ['manifest'], batch_size=200)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0020_questionnaireversion_manifest'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_manifests, migrations.RunPython.noop),
+    ]
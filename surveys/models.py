@@ -58,6 +58,9 @@ class SurveyArea(models.Model):
     area_code = models.CharField(max_length=20, verbose_name="권역코드") # 예: 11(본청), 1101(서울지방청)
     area_name = models.CharField(max_length=100, verbose_name="권역명")
     level = models.IntegerField(default=1, verbose_name="권역레벨") # 1: 본청, 2: 지방청, 3: 사무소
+    # [추가] 구체화 경로 (루트부터 자신까지의 ID, 예: /3/17/254/) - 하위 권역 조회는 path 접두어로 처리
+    # 권역 설계 저장 시 area_tree.rebuild_area_paths() 로 일괄 갱신됩니다.
+    path = models.CharField(max_length=255, default='', db_index=True, verbose_name="권역경로")
 
     class Meta:
         unique_together = ('survey', 'area_code')
@@ -74,6 +77,8 @@ class SurveyRoster(models.Model):
     roster_name = models.CharField(max_length=100, verbose_name="명부명")
     parent_roster = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, verbose_name="상위명부")
     mapping_config = models.JSONField(default=list, verbose_name="항목맵핑설정")
+    # [추가] 검색 색인 상태 {'backend': 'trigram'|'tokens', 'fields': [...], 'built_at': ...} (roster_search 가 관리)
+    search_index = models.JSONField(default=dict, blank=True, verbose_name="검색색인상태")
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -96,16 +101,37 @@ class SurveyQuestionnaire(models.Model):
     def __str__(self):
         return f"[{self.form_id}] {self.form_name}"
 
+# [추가] 조사표 설계 블롭 (내용 해시로 중복 제거, 이전 버전 대비 델타 저장 - design_store.py)
+class DesignBlob(models.Model):
+    digest = models.CharField(max_length=64, unique=True, verbose_name="설계 해시(SHA-256)")
+    # base 가 없으면 content 는 설계 전체(list), 있으면 base 대비 델타({"order": [...], "items": {...}})
+    base = models.ForeignKey('self', on_delete=models.PROTECT, null=True, blank=True, related_name='deltas', verbose_name="기준 블롭")
+    content = models.JSONField(verbose_name="설계/델타")
+    depth = models.PositiveSmallIntegerField(default=0, verbose_name="델타 체인 깊이")
+    size = models.IntegerField(default=0, verbose_name="설계 크기(바이트)")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "조사표 설계 블롭"
+
+    def __str__(self):
+        return f"{self.digest[:12]} (depth {self.depth})"
+
 # 7. 조사표 버전 관리 모델 (알멩이 저장소)
 class QuestionnaireVersion(models.Model):
     questionnaire = models.ForeignKey(SurveyQuestionnaire, on_delete=models.CASCADE, related_name='versions')
     version_number = models.IntegerField(verbose_name="버전번호")
     # [추가] 버전별 고유 ID (예: S00001-V1)
     ver_form_id = models.CharField(max_length=50, unique=True, null=True, verbose_name="버전별조사표ID")
-    design_data = models.JSONField(default=list, verbose_name="설계데이터")
+    # [수정] 설계 데이터는 블롭으로 분리 (같은 설계의 버전은 블롭 공유, 목록 조회 시 읽지 않음)
+    design_blob = models.ForeignKey(DesignBlob, on_delete=models.PROTECT, null=True, blank=True, related_name='versions', verbose_name="설계데이터")
+    # [추가] 설계 수정 차수 (미확정 버전을 덮어쓸 때마다 증가 - 조건부 요청 검증값용)
+    revision = models.PositiveIntegerField(default=1, verbose_name="설계수정차수")
 
     # [추가 권장] 문항 개수를 저장하는 필드
     item_count = models.IntegerField(default=0, verbose_name="문항수")
+    # [추가] 확정 시 컴파일한 설계 매니페스트 (originId 맵/평면 테이블 컬럼 정의 - design_manifest.py)
+    manifest = models.JSONField(null=True, blank=True, verbose_name="설계매니페스트")
 
     is_confirmed = models.BooleanField(default=False, verbose_name="확정여부")
     created_at = models.DateTimeField(auto_now_add=True)
@@ -118,6 +144,12 @@ class QuestionnaireVersion(models.Model):
             self.ver_form_id = f"{base_id}-V{self.version_number}"
         super().save(*args, **kwargs)
 
+    @property
+    def design_data(self):
+        """설계 데이터 (블롭에서 복원, 저장은 design_store.save_version_design 사용)"""
+        from .design_store import resolve_design
+        return resolve_design(self.design_blob_id)
+
 # 8. 수집 데이터
 class SurveyData(models.Model):
     roster = models.ForeignKey(SurveyRoster, on_delete=models.CASCADE, related_name='data_records', null=True, blank=True)
@@ -136,6 +168,26 @@ class SurveyData(models.Model):
     status = models.CharField(max_length=20, default='READY')
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            # [추가] 명부 레코드당 차수별 응답 1건 (응답 upsert 의 ON CONFLICT 대상, 조회 인덱스 겸용)
+            # 원본 명부 행은 degree 가 NULL 이므로 이 제약에 걸리지 않습니다.
+            models.UniqueConstraint(
+                fields=['roster', 'degree', 'respondent_id'], name='uniq_surveydata_roster_degree_respondent'
+            ),
+        ]
+
+# [추가] 명부 검색 토큰 (pg_trgm 이 없는 DB 용 부분일치 검색 색인: 검색 항목 값의 2글자 조각)
+class RosterSearchToken(models.Model):
+    roster = models.ForeignKey(SurveyRoster, on_delete=models.CASCADE, related_name='search_tokens')
+    data = models.ForeignKey(SurveyData, on_delete=models.CASCADE, related_name='search_tokens')
+    field_id = models.CharField(max_length=50, verbose_name="검색항목ID")
+    token = models.CharField(max_length=8, verbose_name="토큰")
+
+    class Meta:
+        indexes = [models.Index(fields=['roster', 'field_id', 'token'], name='surveys_rst_lookup_idx')]
+        verbose_name = "명부 검색 토큰"
+
 class SurveyAnalysis(models.Model):
     survey = models.ForeignKey(SurveyMaster, on_delete=models.CASCADE, verbose_name="조사")
     title = models.CharField(max_length=200, verbose_name="분석 제목")
@@ -150,6 +202,108 @@ class SurveyAnalysis(models.Model):
     def __str__(self):
         return f"[{self.survey.survey_name}] {self.title}"
 
+# 9. 백그라운드 작업 (임포트/삭제/추출/재검증 등 장시간 작업)
+class BackgroundJob(models.Model):
+    STATUS_CHOICES = [
+        ('QUEUED', '대기'),
+        ('RUNNING', '실행중'),
+        ('DONE', '완료'),
+        ('FAILED', '실패'),
+    ]
+
+    job_type = models.CharField(max_length=50, verbose_name="작업유형")
+    params = models.JSONField(default=dict, verbose_name="작업인자")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='QUEUED', db_index=True, verbose_name="상태")
+
+    # 진행률 (total 을 모르는 작업은 None)
+    total = models.BigIntegerField(null=True, blank=True, verbose_name="전체건수")
+    processed = models.BigIntegerField(default=0, verbose_name="처리건수")
+    message = models.TextField(blank=True, verbose_name="메시지")
+    result = models.JSONField(default=dict, blank=True, verbose_name="결과")
+
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="요청자")
+    worker = models.CharField(max_length=100, blank=True, verbose_name="처리워커")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "백그라운드 작업"
+        verbose_name_plural = "백그라운드 작업 목록"
+
+    def __str__(self):
+        return f"[{self.job_type}] #{self.id} ({self.status})"
+
+# 10. 조사별 분석용 평면 테이블 메타정보 (실제 테이블은 flat_table.py 에서 DDL 로 생성)
+class SurveyFlatTable(models.Model):
+    survey = models.OneToOneField(SurveyMaster, on_delete=models.CASCADE, related_name='flat_table', verbose_name="조사")
+    table_name = models.CharField(max_length=63, verbose_name="테이블명")
+    rows_table_name = models.CharField(max_length=63, verbose_name="표 문항 테이블명")
+
+    # 컬럼 정의: [{'name', 'kind'(base/list/item/table), 'label', 'type', 'ver_form_id', 'item_id', ...}]
+    columns = models.JSONField(default=list, verbose_name="컬럼정의")
+    version_ids = models.JSONField(default=list, verbose_name="반영된 확정버전")
+
+    row_count = models.BigIntegerField(default=0, verbose_name="행수")
+    is_stale = models.BooleanField(default=False, verbose_name="재생성필요")
+    built_at = models.DateTimeField(null=True, blank=True, verbose_name="생성일시")
+
+    class Meta:
+        verbose_name = "분석용 평면 테이블"
+        verbose_name_plural = "분석용 평면 테이블 목록"
+
+    def __str__(self):
+        return f"[{self.survey.survey_name}] {self.table_name}"
+
+# [추가] ID 채번 카운터 (명부레코드ID/명부ID/조사표ID)
+# PostgreSQL 은 네이티브 시퀀스(surveys_id_<name>)를 사용하고, 그 외 DB 에서만 이 테이블을 사용합니다.
+class IdSequence(models.Model):
+    name = models.CharField(max_length=30, unique=True, verbose_name="채번명")
+    last_value = models.BigIntegerField(default=0, verbose_name="마지막 번호")
+
+    class Meta:
+        verbose_name = "ID 채번 카운터"
+
+    def __str__(self):
+        return f"{self.name}: {self.last_value}"
+
+# [추가] 진행 현황 카운터 (권역 x 담당조사원 x 차수 x 상태별 건수, 저장/임포트/배정 시 증분 갱신)
+# - degree 없음 + status 'TOTAL' : 원본 명부 레코드 수
+# - degree 있음                  : 해당 차수 응답 상태별 건수 (READY = TOTAL - 응답 건수)
+class ProgressCounter(models.Model):
+    survey = models.ForeignKey(SurveyMaster, on_delete=models.CASCADE, related_name='progress_counters')
+    degree = models.ForeignKey(SurveyDegree, on_delete=models.CASCADE, null=True, blank=True, verbose_name="조사차수")
+    area = models.ForeignKey('SurveyArea', on_delete=models.CASCADE, verbose_name="권역")
+    assigned_user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, verbose_name="담당조사원")
+    status = models.CharField(max_length=20, verbose_name="상태")
+    count = models.BigIntegerField(default=0, verbose_name="건수")
+
+    class Meta:
+        verbose_name = "진행 현황 카운터"
+        constraints = [
+            # 증분 갱신(INSERT ... ON CONFLICT) 대상. 차수/조사원이 NULL 인 행도 1건으로 유지 (PostgreSQL 15+)
+            models.UniqueConstraint(
+                fields=['survey', 'degree', 'area', 'assigned_user', 'status'],
+                name='uniq_progress_counter', nulls_distinct=False,
+            ),
+        ]
+
+# [추가] 저장된 분석의 집계 결과 스냅샷 (리포트 열람 시 그대로 전달, snapshots.py 에서 갱신)
+class AnalysisSnapshot(models.Model):
+    analysis = models.OneToOneField(SurveyAnalysis, on_delete=models.CASCADE, related_name='snapshot')
+    # {"report": 뷰어용 report, "cells": 집계 셀} 을 JSON 문자열로 보관 (응답에 그대로 붙임)
+    payload = models.TextField(verbose_name="집계 결과(JSON)")
+    cell_count = models.IntegerField(default=0, verbose_name="셀 수")
+    config_hash = models.CharField(max_length=64, verbose_name="리포트 설정 해시")
+    data_version = models.BigIntegerField(default=0, verbose_name="데이터 버전")
+    error = models.TextField(blank=True, verbose_name="집계 불가 사유")
+    built_at = models.DateTimeField(verbose_name="생성일")
+    elapsed = models.FloatField(default=0, verbose_name="생성 소요(초)")
+
+    class Meta:
+        verbose_name = "분석 스냅샷"
+
 # 8. superset SQL Lab 연결용 가상 모델
 class SqlLabManager(models.Model):
     """
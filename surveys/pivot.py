@@ -0,0 +1,131 @@
+# surveys/pivot.py
+"""
+자료분석(피벗)용 평면(flat) 데이터 구성
+survey_pivot_data_api(스트리밍 응답)와 백그라운드 추출 작업이 함께 사용합니다.
+
+- 모델 인스턴스를 만들지 않고 values() 로 필요한 컬럼만 조회
+- fields 를 지정하면 해당 키만 JSON 키 추출(KeyTransform)로 DB 에서 꺼냄
+- iterator(chunk_size) 로 스트리밍 (PostgreSQL 은 서버 사이드 커서)
+"""
+from django.db.models.fields.json import KeyTransform
+
+from .fastjson import dumps
+from .models import SurveyData
+
+ITER_CHUNK_SIZE = 2000
+
+# 기본 정보 컬럼: 피벗 필드명 -> values() 조회 경로
+BASE_FIELDS = {
+    "ID": 'respondent_id',
+    "차수": 'degree__degree_number',
+    "차수명": 'degree__degree_title',
+    "권역": 'area__area_name',
+    "조사원": 'assigned_user__username',
+    "상태": 'status',
+    "명부명": 'roster__roster_name',
+    "수정일": 'updated_at',
+}
+
+# 응답 데이터 필드 접두어 (명부 항목과의 키 충돌 방지)
+SURVEY_VALUE_PREFIX = 'Q_'
+
+# WebDataRocks 의 가상 필드 (실제 데이터 컬럼 아님)
+VIRTUAL_FIELDS = {'Measures', '[Measures]'}
+
+
+def pivot_queryset(survey_id):
+    """해당 조사의 피벗 대상 데이터 (id 순)"""
+    return SurveyData.objects.filter(roster__survey_id=survey_id).order_by('id')
+
+
+def report_fields(report_config):
+    """
+    저장된 WebDataRocks 리포트(report_config)의 slice 에서 사용 중인 필드명을 추출합니다.
+    (rows / columns / measures / reportFilters, 중복 제거·순서 유지)
+    """
+    slice_config = (report_config or {}).get('slice') or {}
+    fields = []
+    for section in ('rows', 'columns', 'measures', 'reportFilters'):
+        for entry in slice_config.get(section) or []:
+            name = entry.get('uniqueName') if isinstance(entry, dict) else None
+            if name and name not in VIRTUAL_FIELDS and name not in fields:
+                fields.append(name)
+    return fields
+
+
+def format_base_value(name, value):
+    """기본 정보 컬럼 값을 피벗 표시값으로 변환 (차수: "N차", 권역/조사원 미지정 표시 등)"""
+    if name == "차수":
+        return f"{value}차" if value is not None else "미지정"
+    if name == "수정일":
+        return value.strftime("%Y-%m-%d %H:%M") if value else ""
+    if name == "권역":
+        return value if value is not None else "미지정"
+    if name == "조사원":
+        return value if value is not None else "미배정"
+    return value if value is not None else ""
+
+
+def iter_pivot_rows(survey_id, fields=None, chunk_size=ITER_CHUNK_SIZE):
+    """
+    피벗용 평면 dict 를 1건씩 생성합니다.
+    fields 가 None 이면 전체 컬럼(기본 정보 + 명부 데이터 + 'Q_' 응답 데이터),
+    지정하면 해당 필드만 (명부/응답 값은 DB 에서 JSON 키 단위로 추출)
+    """
+    queryset = pivot_queryset(survey_id)
+
+    if fields is None:
+        lookups = list(BASE_FIELDS.values()) + ['list_values', 'survey_values']
+        for row in queryset.values(*lookups).iterator(chunk_size=chunk_size):
+            flat_data = {name: format_base_value(name, row[path]) for name, path in BASE_FIELDS.items()}
+            # JSON 데이터 병합 (명부 데이터 + 응답 데이터)
+            if row['list_values']:
+                flat_data.update(row['list_values'])
+            if row['survey_values']:
+                for k, v in row['survey_values'].items():
+                    flat_data[f"{SURVEY_VALUE_PREFIX}{k}"] = v
+            yield flat_data
+        return
+
+    base = [(name, BASE_FIELDS[name]) for name in fields if name in BASE_FIELDS]
+    annotations = {}
+    json_fields = []
+    for name in fields:
+        if name in BASE_FIELDS:
+            continue
+        alias = f"_f{len(json_fields)}"
+        if name.startswith(SURVEY_VALUE_PREFIX):
+            annotations[alias] = KeyTransform(name[len(SURVEY_VALUE_PREFIX):], 'survey_values')
+        else:
+            annotations[alias] = KeyTransform(name, 'list_values')
+        json_fields.append((name, alias))
+
+    rows = queryset.annotate(**annotations).values(*[path for _, path in base], *annotations)
+    for row in rows.iterator(chunk_size=chunk_size):
+        flat_data = {name: format_base_value(name, row[path]) for name, path in base}
+        for name, alias in json_fields:
+            flat_data[name] = row[alias]
+        yield flat_data
+
+
+
+def iter_pivot_json(rows, ndjson=False, batch_size=500):
+    """
+    피벗 행을 JSON 배열(기본) 또는 NDJSON(한 줄에 1건) 문자열 조각으로 직렬화합니다.
+    batch_size 건씩 묶어서 내보내므로 전체 결과를 메모리에 올리지 않습니다.
+    """
+    separator = '\n' if ndjson else ','
+    buffer = []
+    first = True
+    if not ndjson:
+        yield '['
+    for row in rows:
+        buffer.append(dumps(row))
+        if len(buffer) >= batch_size:
+            yield ('' if first or ndjson else separator) + separator.join(buffer) + ('\n' if ndjson else '')
+            buffer = []
+            first = False
+    if buffer:
+        yield ('' if first or ndjson else separator) + separator.join(buffer) + ('\n' if ndjson else '')
+    if not ndjson:
+        yield ']'
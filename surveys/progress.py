@@ -0,0 +1,250 @@
+# surveys/progress.py
+"""
+진행 현황 카운터 (권역 x 담당조사원 x 차수 x 상태별 건수)
+
+진행 현황을 볼 때마다 수집 데이터 전체를 집계하지 않도록, 건수를 ProgressCounter 에 미리 쌓아 둡니다.
+- 원본 명부 레코드 수 : degree 없음 + status 'TOTAL' (임포트 시 증가)
+- 차수별 응답 상태    : degree + status (응답 저장 시 이전 상태 -1, 새 상태 +1)
+- READY(미입력)       : TOTAL - 해당 차수 응답 건수 (차수가 새로 생겨도 초기화 불필요)
+응답은 원본 명부 레코드의 권역/담당조사원 기준으로 집계합니다. (입력 화면 목록과 같은 기준)
+배정 변경은 영향받은 권역의 카운터만 다시 계산합니다. (recount)
+어긋난 경우 reconcile_progress 명령으로 전체를 다시 계산할 수 있습니다.
+
+증분 갱신
+- PostgreSQL: INSERT ... ON CONFLICT DO UPDATE SET count = count + EXCLUDED.count (1문장)
+- 그 외 DB : 카운터 행을 잠그고 갱신 (개발용)
+"""
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Q
+
+from .area_tree import subtree_q
+from .models import ProgressCounter, SurveyData
+
+TOTAL = 'TOTAL'
+READY = 'READY'
+
+
+# ==========================================
+# 증분 갱신
+# ==========================================
+
+def _apply_postgresql(rows):
+    table = connection.ops.quote_name(ProgressCounter._meta.db_table)
+    values = ', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(rows))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (survey_id, degree_id, area_id, assigned_user_id, status, count) "
+            f"VALUES {values} "
+            f"ON CONFLICT (survey_id, degree_id, area_id, assigned_user_id, status) "
+            f"DO UPDATE SET count = {table}.count + EXCLUDED.count",
+            [value for row in rows for value in row],
+        )
+
+
+def _apply_rows(rows):
+    with transaction.atomic():
+        for survey_id, degree_id, area_id, user_id, status, delta in rows:
+            counter = ProgressCounter.objects.select_for_update().filter(
+                survey_id=survey_id, degree_id=degree_id, area_id=area_id,
+                assigned_user_id=user_id, status=status,
+            ).first()
+            if counter is None:
+                ProgressCounter.objects.create(
+                    survey_id=survey_id, degree_id=degree_id, area_id=area_id,
+                    assigned_user_id=user_id, status=status, count=delta,
+                )
+            else:
+                ProgressCounter.objects.filter(pk=counter.pk).update(count=F('count') + delta)
+
+
+def apply_deltas(deltas):
+    """
+    카운터 증감을 반영합니다.
+    deltas: {(survey_id, degree_id, area_id, user_id, status): 증감}
+    권역이 없는 레코드는 집계 대상이 아니므로 제외합니다.
+    """
+    # 동시 갱신 시 교착을 피하도록 항상 같은 순서로 반영
+    rows = sorted(
+        (key + (delta,) for key, delta in deltas.items() if delta and key[2] is not None),
+        key=lambda row: tuple(-1 if v is None else v for v in row[:4]) + (row[4],),
+    )
+    if not rows:
+        return
+    if connection.vendor == 'postgresql':
+        _apply_postgresql(rows)
+    else:
+        _apply_rows(rows)
+
+
+def record_masters_added(survey_id, rows):
+    """원본 명부 레코드 추가 반영 (임포트). rows: [(area_id, user_id)]"""
+    deltas = defaultdict(int)
+    for area_id, user_id in rows:
+        deltas[(survey_id, None, area_id, user_id, TOTAL)] += 1
+    apply_deltas(deltas)
+
+
+def lock_response_status(master_record, degree):
+    """
+    응답 저장 전 현재 응답 상태를 조회합니다. (응답이 없으면 None)
+    같은 레코드의 동시 저장이 이전 상태를 중복으로 읽지 않도록 원본 명부 행을 잠급니다.
+    잠근 뒤의 권역/담당조사원으로 master_record 를 갱신합니다. (잠그기 전에 배정이 바뀐 경우
+    record_status_change 가 이전 권역/조사원 카운터에 반영하지 않도록)
+    """
+    locked = SurveyData.objects.select_for_update().filter(pk=master_record.pk).values_list(
+        'area_id', 'assigned_user_id'
+    ).first()
+    if locked is not None:
+        master_record.area_id, master_record.assigned_user_id = locked
+    return SurveyData.objects.filter(
+        roster_id=master_record.roster_id, degree=degree, respondent_id=master_record.respondent_id
+    ).values_list('status', flat=True).first()
+
+
+def record_status_change(survey_id, master_record, degree, previous, status):
+    """응답 상태 변경 반영 (previous 가 None 이면 신규 응답: READY -> status)"""
+    if previous == status:
+        return
+    key = (survey_id, degree.id, master_record.area_id, master_record.assigned_user_id)
+    deltas = {key + (status,): 1}
+    if previous is not None:
+        deltas[key + (previous,)] = -1
+    apply_deltas(deltas)
+
+
+# ==========================================
+# 재계산
+# ==========================================
+
+def _response_counts(survey_id, area_ids=None):
+    """차수별 응답 상태 건수 (원본 명부의 권역/담당조사원 기준)"""
+    data = connection.ops.quote_name(SurveyData._meta.db_table)
+    roster = connection.ops.quote_name(SurveyData._meta.get_field('roster').related_model._meta.db_table)
+    sql = (
+        f"SELECT r.degree_id, m.area_id, m.assigned_user_id, r.status, COUNT(*) "
+        f"FROM {data} r "
+        f"JOIN {roster} ro ON ro.id = r.roster_id "
+        f"JOIN {data} m ON m.roster_id = r.roster_id AND m.respondent_id = r.respondent_id AND m.degree_id IS NULL "
+        f"WHERE ro.survey_id = %s AND r.degree_id IS NOT NULL AND m.area_id IS NOT NULL"
+    )
+    params = [survey_id]
+    if area_ids is not None:
+        sql += f" AND m.area_id IN ({', '.join(['%s'] * len(area_ids))})"
+        params.extend(area_ids)
+    sql += " GROUP BY r.degree_id, m.area_id, m.assigned_user_id, r.status"
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def recount(survey_id, area_ids=None):
+    """
+    카운터를 수집 데이터에서 다시 계산합니다.
+    area_ids: 대상 권역 ID 목록 (None 이면 조사 전체)
+    반환: 카운터 행 수
+    """
+    if area_ids is not None:
+        area_ids = sorted({a for a in area_ids if a is not None})
+        if not area_ids:
+            return 0
+
+    masters = SurveyData.objects.filter(roster__survey_id=survey_id, degree__isnull=True, area__isnull=False)
+    counters = ProgressCounter.objects.filter(survey_id=survey_id)
+    if area_ids is not None:
+        masters = masters.filter(area_id__in=area_ids)
+        counters = counters.filter(area_id__in=area_ids)
+
+    with transaction.atomic():
+        # 원본 명부 행을 먼저 잠가 집계~교체 사이의 응답 저장(lock_response_status)/배정 변경이
+        # 교체된 카운터에서 빠지지 않도록 합니다. (집계 쿼리는 GROUP BY 라 FOR UPDATE 불가)
+        list(masters.select_for_update(of=('self',)).order_by('id').values_list('id', flat=True))
+        rows = [
+            ProgressCounter(survey_id=survey_id, area_id=area_id, assigned_user_id=user_id, status=TOTAL, count=n)
+            for area_id, user_id, n in masters.values('area_id', 'assigned_user_id').annotate(
+                n=Count('id')
+            ).values_list('area_id', 'assigned_user_id', 'n')
+        ]
+        rows.extend(
+            ProgressCounter(
+                survey_id=survey_id, degree_id=degree_id, area_id=area_id,
+                assigned_user_id=user_id, status=status, count=n,
+            )
+            for degree_id, area_id, user_id, status, n in _response_counts(survey_id, area_ids)
+        )
+        counters.delete()
+        ProgressCounter.objects.bulk_create(rows, batch_size=5000)
+    return len(rows)
+
+
+def recount_records(record_ids):
+    """
+    레코드(원본 명부) 배정 변경 후, 해당 레코드가 속한 권역의 카운터를 다시 계산합니다.
+    반환: 영향받은 조사 ID 목록
+    """
+    affected = defaultdict(set)
+    for survey_id, area_id in SurveyData.objects.filter(id__in=record_ids, area__isnull=False).values_list(
+        'roster__survey_id', 'area_id'
+    ).distinct():
+        affected[survey_id].add(area_id)
+    for survey_id, area_ids in affected.items():
+        recount(survey_id, area_ids)
+    return list(affected)
+
+
+# ==========================================
+# 조회 (권역 트리 롤업)
+# ==========================================
+
+def progress_rollup(survey_id, degree_id, tree, root=None):
+    """
+    차수의 진행 현황을 권역 트리와 조사원별로 집계합니다. (카운터 조회 1회, 롤업은 메모리에서)
+    tree: 조사의 권역 트리(get_area_tree) / root: 관할 권역 노드 (None 이면 전체)
+    반환: {'statuses': [...], 'areas': [{id, parent_id, area_code, area_name, level, counts}],
+           'surveyors': [{user_id, counts}]}
+      areas[].counts 는 하위 권역을 포함한 합계, READY 는 TOTAL - 응답 건수
+    """
+    counters = ProgressCounter.objects.filter(
+        Q(degree_id=degree_id) | Q(degree__isnull=True), survey_id=survey_id
+    )
+    if root is not None:
+        counters = counters.filter(subtree_q(root))
+    rows = list(counters.values_list('area_id', 'assigned_user_id', 'status', 'count'))
+
+    statuses = [READY] + sorted({status for _, _, status, _ in rows} - {TOTAL, READY})
+    by_area = defaultdict(lambda: dict.fromkeys([TOTAL, *statuses], 0))
+    by_user = defaultdict(lambda: dict.fromkeys([TOTAL, *statuses], 0))
+    for area_id, user_id, status, count in rows:
+        by_area[area_id][status] += count
+        by_user[user_id][status] += count
+
+    # 하위 권역 합계를 상위로 누적 (깊은 권역부터)
+    area_ids = tree.descendant_ids(root.id) if root is not None else tuple(tree.nodes)
+    nodes = sorted((tree.get(area_id) for area_id in area_ids), key=lambda node: -node.level)
+    in_scope = set(area_ids)
+    for node in nodes:
+        if node.parent_id in in_scope:
+            parent = by_area[node.parent_id]
+            for status, count in by_area[node.id].items():
+                parent[status] += count
+
+    def finish(counts):
+        counts = dict(counts)
+        counts[READY] = counts[TOTAL] - sum(n for s, n in counts.items() if s not in (TOTAL, READY))
+        return counts
+
+    return {
+        'statuses': statuses,
+        'areas': [
+            {
+                'id': node.id, 'parent_id': node.parent_id, 'area_code': node.area_code,
+                'area_name': node.area_name, 'level': node.level, 'counts': finish(by_area[node.id]),
+            }
+            for node in sorted(nodes, key=lambda node: (node.level, node.area_code))
+        ],
+        'surveyors': [
+            {'user_id': user_id, 'counts': finish(counts)}
+            for user_id, counts in by_user.items() if user_id is not None
+        ],
+    }
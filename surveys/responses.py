@@ -0,0 +1,39 @@
+# surveys/responses.py
+"""
+차수별 응답 저장 (단일 upsert)
+
+응답 행은 (roster, degree, respondent_id) 유니크 제약으로 명부 레코드당 1건만 존재합니다.
+저장은 get_or_create + save() 두 단계 대신 INSERT ... ON CONFLICT DO UPDATE 한 문장으로 처리해
+동시에 저장해도 중복 행이 생기지 않습니다.
+- 신규 행: 원본 명부의 권역/담당조사원/명부데이터를 복사
+- 기존 행: 답변(survey_values)/상태/수정일만 갱신 (권역/조사원 재배정 내용은 유지)
+"""
+from .models import SurveyData
+from .sql_cache import mark_data_changed
+
+RESPONSE_UNIQUE_FIELDS = ['roster', 'degree', 'respondent_id']
+RESPONSE_UPDATE_FIELDS = ['survey_values', 'status', 'updated_at']
+
+
+def upsert_response(master_record, degree, survey_values, status='ING'):
+    """
+    원본 명부 레코드(master_record)의 차수별 응답을 저장하고 응답 행 ID 를 반환합니다.
+    """
+    record = SurveyData(
+        roster_id=master_record.roster_id,
+        degree=degree,
+        respondent_id=master_record.respondent_id,
+        area_id=master_record.area_id,
+        assigned_user_id=master_record.assigned_user_id,
+        list_values=master_record.list_values,
+        survey_values=survey_values,
+        status=status,
+    )
+    SurveyData.objects.bulk_create(
+        [record],
+        update_conflicts=True,
+        unique_fields=RESPONSE_UNIQUE_FIELDS,
+        update_fields=RESPONSE_UPDATE_FIELDS,
+    )
+    mark_data_changed()
+    return record.pk
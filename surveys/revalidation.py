@@ -0,0 +1,179 @@
+# surveys/revalidation.py
+"""
+이미 저장된 응답 자료를 현재 내검 규칙으로 일괄 재검증합니다.
+(내검 규칙을 수집 도중 변경한 경우 사용)
+
+- 응답 행을 chunk 단위로 스트리밍 조회
+- 프로세스 풀에서 규칙 평가 (워커별로 규칙 세트 1회 컴파일)
+- 결과가 달라진 행만 survey_values['_warnings'] / ['_errors'] 를 반영
+  조회 이후 조사원이 다시 저장한 행(updated_at 이 달라진 행)은 덮어쓰지 않고 건너뜀
+  (저장 시점에 이미 현재 규칙으로 검증되었으므로)
+- 결과를 반영할 때마다 명부별 재검증 세대 토큰을 갱신 (입력 화면 조건부 요청 검증값에 포함)
+"""
+import multiprocessing
+import operator
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, JSONField, Q, Value, When
+from django.utils import timezone
+
+from .models import SurveyData
+from .form_bundle import get_form_bundle
+from .snapshots import record_data_change
+from .sql_cache import mark_data_changed
+from .rule_engine import init_worker, evaluate_rows
+
+
+def apply_rule_results(survey_values, errors, warnings):
+    """
+    재검증 결과를 survey_values 에 반영한 새 dict 를 반환합니다.
+    변경 사항이 없으면 None 을 반환합니다.
+    """
+    values = dict(survey_values) if isinstance(survey_values, dict) else {}
+    if values.get('_warnings', []) == warnings and values.get('_errors', []) == errors:
+        return None
+    for key, items in (('_warnings', warnings), ('_errors', errors)):
+        if items:
+            values[key] = items
+        else:
+            values.pop(key, None)
+    return values
+
+
+def _generation_key(roster_id):
+    return f"revalidation:gen:{roster_id}"
+
+
+def revalidation_generation(roster_id):
+    """명부의 재검증 세대 토큰 (재검증 결과가 반영될 때마다 달라짐, 재검증 이력이 없으면 0)"""
+    return cache.get(_generation_key(roster_id), 0)
+
+
+def _bump_generation(roster_id):
+    transaction.on_commit(lambda: cache.set(_generation_key(roster_id), time.time_ns(), None))
+
+
+def _write_results(updates):
+    """
+    updates: [(pk, 조회 시 updated_at, 새 survey_values), ...]
+    조회 이후 수정되지 않은 행만 한 문장으로 갱신하고 갱신 건수를 반환합니다.
+    updated_at 도 갱신해 입력 화면 조건부 요청(ETag/Last-Modified)이 바뀐 경고를 다시 받게 합니다.
+    """
+    guard = reduce(operator.or_, (Q(pk=pk, updated_at=read_at) for pk, read_at, _ in updates))
+    values = Case(
+        *(When(pk=pk, then=Value(new_values, output_field=JSONField())) for pk, _, new_values in updates),
+        output_field=JSONField(),
+    )
+    return SurveyData.objects.filter(guard).update(survey_values=values, updated_at=timezone.now())
+
+
+def _iter_chunks(queryset, chunk_size):
+    chunk = []
+    for row in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def revalidate_degree(roster, degree, chunk_size=2000, workers=None, dry_run=False, progress=None):
+    """
+    특정 명부/차수의 응답 자료 전체를 재검증합니다.
+
+    workers: 프로세스 수 (None 이면 CPU 수, 1 이면 현재 프로세스에서 실행)
+    progress: progress(processed, total, stats) 콜백
+    반환: {'total', 'processed', 'changed', 'skipped', 'error_rows', 'warning_rows', 'elapsed', 'rows_per_sec'}
+    (skipped: 재검증 중 조사원이 다시 저장해 반영하지 않은 행)
+    """
+    bundle = get_form_bundle(roster)
+    edit_rules, origin_map, version_key = bundle.edit_rules, bundle.origin_map, bundle.version_key
+
+    queryset = SurveyData.objects.filter(roster=roster, degree=degree).order_by('id')
+    total = queryset.count()
+    stats = {
+        'total': total, 'processed': 0, 'changed': 0, 'skipped': 0,
+        'error_rows': 0, 'warning_rows': 0, 'elapsed': 0.0, 'rows_per_sec': 0.0,
+    }
+    if total == 0 or not edit_rules:
+        return stats
+
+    rows = queryset.values_list('id', 'survey_values', 'updated_at')
+    chunks = _iter_chunks(rows, chunk_size)
+    current_values = {}
+
+    def _remember(chunk):
+        # 원본 survey_values/updated_at 은 결과 반영 시 필요하므로 chunk 단위로만 보관
+        rows = []
+        for pk, values, updated_at in chunk:
+            current_values[pk] = (values, updated_at)
+            rows.append((pk, values))
+        return rows
+
+    workers = workers or os.cpu_count() or 1
+    started = time.monotonic()
+
+    if workers == 1:
+        result_iter = (evaluate_rows(_remember(chunk), bundle.rule_set) for chunk in chunks)
+        executor = None
+    else:
+        # fork 시 부모의 DB 커넥션/스레드 상태를 물려받지 않도록 spawn 사용
+        # (워커는 Django 없이 rule_engine 만 사용)
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=init_worker,
+            initargs=(edit_rules, origin_map, version_key),
+        )
+        # map 은 입력을 미리 소비하므로, 메모리를 위해 워커 수의 2배만큼만 선행 제출
+        result_iter = _bounded_map(executor, (_remember(chunk) for chunk in chunks), workers * 2)
+
+    try:
+        for results in result_iter:
+            updates = []
+            for pk, errors, warnings in results:
+                if errors:
+                    stats['error_rows'] += 1
+                if warnings:
+                    stats['warning_rows'] += 1
+                values, updated_at = current_values.pop(pk)
+                new_values = apply_rule_results(values, errors, warnings)
+                if new_values is not None:
+                    updates.append((pk, updated_at, new_values))
+
+            written = len(updates)
+            if updates and not dry_run:
+                written = _write_results(updates)
+                if written:
+                    mark_data_changed()
+                    record_data_change(roster.survey_id, written)
+                    _bump_generation(roster.id)
+            stats['changed'] += written
+            stats['skipped'] += len(updates) - written
+            stats['processed'] += len(results)
+            stats['elapsed'] = time.monotonic() - started
+            stats['rows_per_sec'] = stats['processed'] / stats['elapsed'] if stats['elapsed'] else 0.0
+            if progress:
+                progress(stats['processed'], total, stats)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    return stats
+
+
+def _bounded_map(executor, chunks, max_pending):
+    """제출 순서대로 결과를 돌려주되, 대기 중인 작업 수를 max_pending 으로 제한"""
+    pending = []
+    for chunk in chunks:
+        pending.append(executor.submit(evaluate_rows, chunk))
+        if len(pending) >= max_pending:
+            yield pending.pop(0).result()
+    for future in pending:
+        yield future.result()
@@ -0,0 +1,133 @@
+# surveys/roster_import.py
+"""
+명부 CSV 대량 임포트
+
+- 업로드 파일을 한 번에 읽지 않고 스트림으로 디코딩하며 한 줄씩 처리
+- 권역코드는 미리 로드한 {area_code: area_id} 사전으로 매칭 (행별 조회 없음)
+- chunk 단위 bulk_create, PostgreSQL(psycopg2)에서는 COPY 사용
+- 명부레코드ID 는 chunk 마다 id_allocator 에서 블록으로 예약 (동시 임포트에도 중복 없음)
+- chunk 마다 진행 현황 카운터(권역별 명부 레코드 수)와 검색 토큰 색인을 함께 갱신
+"""
+import csv
+import io
+import json
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .id_allocator import allocate_ids
+from .models import SurveyArea, SurveyData
+from .progress import record_masters_added
+from .roster_search import index_new_records
+from .snapshots import record_data_change
+from .sql_cache import mark_data_changed
+
+DEFAULT_CHUNK_SIZE = getattr(settings, 'ROSTER_IMPORT_CHUNK_SIZE', 5000)
+
+COPY_COLUMNS = ('roster_id', 'area_id', 'respondent_id', 'list_values', 'survey_values', 'status', 'updated_at')
+
+
+def open_csv_stream(uploaded_file):
+    """업로드 파일을 UTF-8(BOM 허용) 텍스트 스트림으로 감쌉니다. (전체를 메모리에 올리지 않음)"""
+    raw = getattr(uploaded_file, 'file', uploaded_file)
+    raw.seek(0)
+    return io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
+
+
+def can_use_copy():
+    """COPY 적재 가능 여부 (PostgreSQL + psycopg2 드라이버)"""
+    if connection.vendor != 'postgresql':
+        return False
+    return getattr(connection.Database, '__name__', '') == 'psycopg2'
+
+
+def _copy_chunk(rows):
+    """PostgreSQL COPY ... FROM STDIN (CSV) 로 한 chunk 를 적재"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(row)
+    buffer.seek(0)
+    table = SurveyData._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {table} ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+
+
+def import_roster_stream(survey, roster, design, text_stream, chunk_size=None, use_copy=None, progress=None):
+    """
+    CSV 텍스트 스트림을 명부(roster)에 적재합니다. (전체 1 트랜잭션: 실패 시 모두 롤백)
+
+    chunk_size: 한 번에 적재할 행 수
+    use_copy: None 이면 PostgreSQL 에서 자동으로 COPY 사용
+    progress: progress(rows, stats) 콜백 (chunk 마다 호출)
+    반환: {'rows', 'elapsed', 'rows_per_sec', 'method'}
+    """
+    chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+    started = time.monotonic()
+
+    area_map = dict(SurveyArea.objects.filter(survey=survey).values_list('area_code', 'id'))
+    list_fields = [(item['id'], item['label']) for item in design.list_schema]
+    reader = csv.DictReader(text_stream)
+
+    with transaction.atomic():
+        if use_copy is None:
+            use_copy = can_use_copy()
+        method = 'copy' if use_copy else 'bulk_create'
+        now = timezone.now()
+        stats = {'rows': 0, 'elapsed': 0.0, 'rows_per_sec': 0.0, 'method': method}
+
+        def flush(chunk):
+            # chunk: [(area_id, list_values)] - 명부레코드ID 블록 예약 후 적재
+            respondent_ids = allocate_ids('respondent', len(chunk))
+            if use_copy:
+                _copy_chunk([
+                    (
+                        roster.id, area_id if area_id is not None else '', respondent_id,
+                        json.dumps(list_values, ensure_ascii=False), '{}', 'READY', now.isoformat(),
+                    )
+                    for (area_id, list_values), respondent_id in zip(chunk, respondent_ids)
+                ])
+            else:
+                SurveyData.objects.bulk_create([
+                    SurveyData(
+                        roster=roster, area_id=area_id, respondent_id=respondent_id,
+                        list_values=list_values, status='READY',
+                    )
+                    for (area_id, list_values), respondent_id in zip(chunk, respondent_ids)
+                ], batch_size=chunk_size)
+            # 진행 현황 카운터: 권역별 명부 레코드 수 증가 (신규 레코드는 미배정)
+            record_masters_added(survey.id, [(area_id, None) for area_id, _ in chunk])
+            # 검색 토큰 색인: 색인된 항목이면 새 레코드도 바로 검색되도록 (COPY 는 id 를 돌려주지 않아 명부레코드ID 로 조회)
+            index_new_records(roster, SurveyData.objects.filter(
+                roster=roster, degree__isnull=True, respondent_id__in=respondent_ids
+            ).values_list('id', 'list_values'))
+            stats['rows'] += len(chunk)
+            stats['elapsed'] = time.monotonic() - started
+            stats['rows_per_sec'] = stats['rows'] / stats['elapsed'] if stats['elapsed'] else 0.0
+            if progress:
+                progress(stats['rows'], stats)
+
+        chunk = []
+        for row in reader:
+            # CSV의 '권역코드' 컬럼과 조사 내 권역 매칭
+            area_id = area_map.get(row.get('권역코드'))
+            # 명부 항목 설계에 따른 데이터 매핑
+            list_values = {field_id: row.get(label, '') for field_id, label in list_fields}
+            chunk.append((area_id, list_values))
+
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                chunk = []
+        if chunk:
+            flush(chunk)
+        mark_data_changed()
+        record_data_change(survey.id, stats['rows'])
+
+    stats['elapsed'] = time.monotonic() - started
+    stats['rows_per_sec'] = stats['rows'] / stats['elapsed'] if stats['elapsed'] else 0.0
+    return stats
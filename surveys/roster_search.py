@@ -0,0 +1,230 @@
+# surveys/roster_search.py
+"""
+명부 검색 (검색 항목 색인 + 접두어/부분일치 검색)
+
+명부 설계(mapping_config)에서 is_search 로 지정한 항목을 대상으로 합니다.
+원본 명부(degree 없음)의 list_values 에서 항목 값을 꺼내 대소문자 구분 없이 비교합니다.
+
+색인 방식 (DB 에 따라 자동 선택)
+- trigram : PostgreSQL + pg_trgm. 명부/항목별 부분 GIN 인덱스
+            (upper(list_values ->> '항목') gin_trgm_ops) WHERE roster_id = N AND degree_id IS NULL
+            → LIKE '%값%' / '값%' 검색이 인덱스로 처리됩니다.
+- tokens  : 그 외 DB. RosterSearchToken 에 항목 값의 2글자 조각(bigram)을 적재해 두고,
+            검색어의 조각을 모두 가진 레코드로 후보를 좁힌 뒤 실제 값으로 확인합니다.
+색인은 명부 설정 저장 후 백그라운드 작업(rebuild_roster_search)으로 다시 만듭니다.
+명부 임포트로 추가된 레코드의 토큰은 임포트가 chunk 마다 함께 적재합니다. (index_new_records)
+색인이 아직 없는 항목도 검색 결과는 같고, 속도만 느립니다.
+"""
+import hashlib
+import time
+
+from django.db import connection, transaction
+from django.db.models import Count
+from django.db.models.fields.json import KeyTextTransform
+from django.utils import timezone
+
+from .jobs import enqueue_job
+from .models import BackgroundJob, RosterSearchToken, SurveyData, SurveyRoster
+
+SEARCH_MODES = ('contains', 'prefix', 'exact')
+TOKEN_SIZE = 2
+TOKEN_BATCH_SIZE = 10000
+INDEX_PREFIX = 'surveys_rs_'
+
+_backend = None
+
+
+def search_backend():
+    """사용할 색인 방식 ('trigram' / 'tokens') - 프로세스당 1회 확인"""
+    global _backend
+    if _backend is None:
+        _backend = 'tokens'
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                if cursor.fetchone():
+                    _backend = 'trigram'
+    return _backend
+
+
+def roster_search_fields(roster):
+    """명부 설계에서 검색 대상으로 지정된 항목 ID 목록 (권역코드는 권역 검색으로 처리)"""
+    config = roster.mapping_config if isinstance(roster.mapping_config, list) else []
+    return [c['id'] for c in config if c.get('is_search') and c.get('id') and c.get('id') != 'area_code']
+
+
+def normalize(value):
+    return str(value).strip().upper()
+
+
+def tokenize(value):
+    """값의 2글자 조각 집합 (공백 기준 단어별, 1글자 단어는 그대로)"""
+    tokens = set()
+    for word in normalize(value).split():
+        if len(word) <= TOKEN_SIZE:
+            tokens.add(word)
+        else:
+            tokens.update(word[i:i + TOKEN_SIZE] for i in range(len(word) - TOKEN_SIZE + 1))
+    return tokens
+
+
+def index_name(roster_id, field_id):
+    digest = hashlib.md5(field_id.encode('utf-8')).hexdigest()[:10]
+    return f"{INDEX_PREFIX}{roster_id}_{digest}"
+
+
+# ==========================================
+# 검색
+# ==========================================
+
+def apply_search(queryset, roster, field_id, value, mode='contains'):
+    """
+    원본 명부 queryset 에 검색 조건을 적용합니다.
+    mode: contains(부분일치, 기본) / prefix(접두어) / exact(완전일치) - 모두 대소문자 무시
+    """
+    value = str(value).strip()
+    if not value:
+        return queryset
+    if mode not in SEARCH_MODES:
+        mode = 'contains'
+
+    alias = f"_search_{len(queryset.query.annotations)}"
+    lookup = {'contains': 'icontains', 'prefix': 'istartswith', 'exact': 'iexact'}[mode]
+    queryset = queryset.annotate(**{alias: KeyTextTransform(field_id, 'list_values')}).filter(
+        **{f"{alias}__{lookup}": value}
+    )
+
+    # 토큰 색인이 준비된 항목이면 후보 레코드를 토큰으로 먼저 좁힘
+    state = roster.search_index or {}
+    if state.get('backend') == 'tokens' and field_id in state.get('fields', []):
+        tokens = tokenize(value)
+        if tokens and all(len(t) == TOKEN_SIZE for t in tokens):
+            candidates = RosterSearchToken.objects.filter(
+                roster=roster, field_id=field_id, token__in=tokens
+            ).values('data_id').annotate(hits=Count('token', distinct=True)).filter(
+                hits=len(tokens)
+            ).values('data_id')
+            queryset = queryset.filter(id__in=candidates)
+    return queryset
+
+
+# ==========================================
+# 색인 생성
+# ==========================================
+
+def _existing_trigram_indexes(roster_id):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexname FROM pg_indexes WHERE tablename = %s AND indexname LIKE %s",
+            [SurveyData._meta.db_table, f"{INDEX_PREFIX}{roster_id}\\_%"],
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+
+def _sync_trigram_indexes(roster, fields):
+    """검색 항목별 부분 GIN 인덱스 생성, 더 이상 검색하지 않는 항목의 인덱스 삭제"""
+    table = connection.ops.quote_name(SurveyData._meta.db_table)
+    wanted = {index_name(roster.id, field_id): field_id for field_id in fields}
+    existing = _existing_trigram_indexes(roster.id)
+    with connection.cursor() as cursor:
+        # CONCURRENTLY: 입력 화면의 저장(쓰기)을 막지 않음 (트랜잭션 밖에서 실행되어야 함)
+        for name in existing - set(wanted):
+            cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {connection.ops.quote_name(name)}")
+        for name, field_id in wanted.items():
+            if name in existing:
+                continue
+            cursor.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {connection.ops.quote_name(name)} ON {table} "
+                f"USING gin (upper(list_values ->> %s) gin_trgm_ops) "
+                f"WHERE roster_id = {int(roster.id)} AND degree_id IS NULL",
+                [field_id],
+            )
+    return len(wanted) - len(existing & set(wanted))
+
+
+def _record_tokens(roster_id, data_id, list_values, fields):
+    list_values = list_values if isinstance(list_values, dict) else {}
+    for field_id in fields:
+        value = list_values.get(field_id)
+        if value in (None, ''):
+            continue
+        for token in tokenize(value):
+            yield RosterSearchToken(roster_id=roster_id, data_id=data_id, field_id=field_id, token=token)
+
+
+def _rebuild_tokens(roster, fields, progress=None):
+    """명부의 검색 토큰을 다시 적재합니다. 반환: 적재한 토큰 수"""
+    RosterSearchToken.objects.filter(roster=roster).delete()
+    if not fields:
+        return 0
+
+    masters = SurveyData.objects.filter(roster=roster, degree__isnull=True).order_by('id')
+    total = masters.count()
+    rows = tokens = 0
+    batch = []
+    for data_id, list_values in masters.values_list('id', 'list_values').iterator(chunk_size=TOKEN_BATCH_SIZE):
+        batch.extend(_record_tokens(roster.id, data_id, list_values, fields))
+        rows += 1
+        if len(batch) >= TOKEN_BATCH_SIZE:
+            RosterSearchToken.objects.bulk_create(batch, batch_size=TOKEN_BATCH_SIZE)
+            tokens += len(batch)
+            batch = []
+            if progress:
+                progress(rows, total)
+    if batch:
+        RosterSearchToken.objects.bulk_create(batch, batch_size=TOKEN_BATCH_SIZE)
+        tokens += len(batch)
+    if progress:
+        progress(rows, total)
+    return tokens
+
+
+def rebuild_roster_search(roster, progress=None):
+    """
+    명부의 검색 색인을 현재 검색 항목 기준으로 다시 만듭니다.
+    반환: {'backend', 'fields', 'created', 'elapsed'}
+    """
+    started = time.monotonic()
+    fields = roster_search_fields(roster)
+    backend = search_backend()
+    if backend == 'trigram':
+        created = _sync_trigram_indexes(roster, fields)
+    else:
+        with transaction.atomic():
+            created = _rebuild_tokens(roster, fields, progress)
+
+    state = {'backend': backend, 'fields': fields, 'built_at': timezone.now().isoformat()}
+    SurveyRoster.objects.filter(pk=roster.pk).update(search_index=state)
+    roster.search_index = state
+    return {'backend': backend, 'fields': fields, 'created': created, 'elapsed': time.monotonic() - started}
+
+
+def index_new_records(roster, records):
+    """
+    새로 추가된 명부 레코드의 검색 토큰을 적재합니다. (명부 임포트 chunk 마다, 호출측 트랜잭션 안에서)
+    색인된 항목(search_index.fields)은 이 레코드들도 토큰으로 후보를 좁히므로 빠뜨리면 검색에서 누락됩니다.
+    records: [(data_id, list_values)] / 반환: 적재한 토큰 수
+    """
+    state = roster.search_index or {}
+    if state.get('backend') != 'tokens' or not state.get('fields'):
+        return 0  # trigram 부분 인덱스는 새 행을 자동으로 포함
+    batch = [
+        token for data_id, list_values in records
+        for token in _record_tokens(roster.id, data_id, list_values, state['fields'])
+    ]
+    RosterSearchToken.objects.bulk_create(batch, batch_size=TOKEN_BATCH_SIZE)
+    return len(batch)
+
+
+def search_index_outdated(roster):
+    """검색 항목 구성이 마지막 색인 생성 때와 다른지"""
+    return (roster.search_index or {}).get('fields') != roster_search_fields(roster)
+
+
+def schedule_search_rebuild(roster, user=None):
+    """검색 색인 재생성 작업 등록 (같은 명부의 대기 작업이 있으면 생략)"""
+    pending = BackgroundJob.objects.filter(
+        job_type='rebuild_roster_search', status='QUEUED', params__roster_id=roster.id
+    ).exists()
+    if not pending:
+        enqueue_job('rebuild_roster_search', {'roster_id': roster.id}, user=user)
@@ -0,0 +1,500 @@
+# surveys/rule_engine.py
+"""
+내검 규칙 컴파일러/평가기
+
+조건식 문자열을 저장 요청마다 정규식 치환 + eval 하던 방식을 대신하여,
+규칙을 한 번만 파싱해 표현식 트리로 만들고(캐시), 답변 dict에 대해 직접 평가합니다.
+
+지원 문법 (edit_rule_design.html 가이드와 동일)
+- 일반 문항 참조:   {q1}
+- 테이블 셀 참조:   {table_id}[행인덱스][열ID]
+- 열 전체 참조:     {table_id}[*][열ID]
+- 연산자: and, or, not, ==, !=, >, <, >=, <=, in, 사칙연산
+- 함수: all_equal, any_equal, all_not_empty, has_empty,
+        all_greater, all_greater_equal, all_less, all_less_equal
+"""
+import ast
+import hashlib
+import json
+import operator
+import re
+import threading
+from collections import OrderedDict
+
+# 참조 패턴 (열 전체 -> 셀 -> 일반 필드 순으로 매칭)
+REF_PATTERN = re.compile(
+    r'\{(\w+)\}\[\*\]\[(\w+)\]'        # 1,2: 열 전체
+    r'|\{(\w+)\}\[(\d+)\]\[(\w+)\]'    # 3,4,5: 셀
+    r'|\{(\w+)\}'                      # 6: 일반 필드
+)
+REF_PREFIX = '__ref_'
+
+
+# ==========================================
+# [헬퍼 함수] 조건식에서 호출 가능한 함수
+# ==========================================
+
+def _is_empty(v):
+    return v == '' or v is None or str(v).strip() == ''
+
+def _to_number(value):
+    """문자열을 숫자로 변환 (실패 시 None)"""
+    try:
+        val_str = str(value).strip("'\"")
+        if val_str == '':
+            return None
+        if '.' in val_str:
+            return float(val_str)
+        return int(val_str)
+    except (TypeError, ValueError):
+        return None
+
+def all_equal(values, target_value):
+    """리스트의 모든 값이 target_value와 같은지 확인"""
+    if not isinstance(values, list) or len(values) == 0:
+        return False
+    target_str = str(target_value)
+    return all(str(v) == target_str for v in values)
+
+def any_equal(values, target_value):
+    """리스트의 값 중 하나라도 target_value와 같은지 확인"""
+    if not isinstance(values, list) or len(values) == 0:
+        return False
+    target_str = str(target_value)
+    return any(str(v) == target_str for v in values)
+
+def all_not_empty(values):
+    """리스트의 모든 값이 비어있지 않은지 확인"""
+    if not isinstance(values, list) or len(values) == 0:
+        return False
+    return not any(_is_empty(v) for v in values)
+
+def has_empty(values):
+    """리스트에 빈 값이 하나라도 있는지 확인 (all_not_empty의 반대)"""
+    if not isinstance(values, list) or len(values) == 0:
+        return True
+    return any(_is_empty(v) for v in values)
+
+def _all_compare(values, target_value, op, reject_empty=False):
+    if not isinstance(values, list) or len(values) == 0:
+        return False
+    if reject_empty and any(_is_empty(v) for v in values):
+        return False
+    target_num = _to_number(target_value)
+    if target_num is None:
+        return False
+    for v in values:
+        val_num = _to_number(v)
+        if val_num is None or not op(val_num, target_num):
+            return False
+    return True
+
+def all_greater(values, target_value):
+    """리스트의 모든 값이 target_value보다 커야 함 (빈 값이 있으면 False)"""
+    return _all_compare(values, target_value, operator.gt, reject_empty=True)
+
+def all_greater_equal(values, target_value):
+    """리스트의 모든 값이 target_value보다 크거나 같아야 함"""
+    return _all_compare(values, target_value, operator.ge)
+
+def all_less(values, target_value):
+    """리스트의 모든 값이 target_value보다 작아야 함"""
+    return _all_compare(values, target_value, operator.lt)
+
+def all_less_equal(values, target_value):
+    """리스트의 모든 값이 target_value보다 작거나 같아야 함"""
+    return _all_compare(values, target_value, operator.le)
+
+RULE_FUNCTIONS = {
+    'all_equal': all_equal,
+    'any_equal': any_equal,
+    'all_not_empty': all_not_empty,
+    'has_empty': has_empty,
+    'all_greater': all_greater,
+    'all_greater_equal': all_greater_equal,
+    'all_less': all_less,
+    'all_less_equal': all_less_equal,
+}
+
+
+# ==========================================
+# [표현식 트리] 노드 정의
+# ==========================================
+# 모든 노드는 eval(answers) 를 가지며, answers 는 {ver_form_id: {item_id: value}} 입니다.
+
+def _to_text(value):
+    """기존 규칙 평가와 동일하게 답변 값을 문자열로 맞춤"""
+    return '' if value == '' or value is None else str(value)
+
+class Const:
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def eval(self, answers):
+        return self.value
+
+class FieldRef:
+    """{field_id}: 처음 발견된 조사표의 값 (테이블/딕셔너리 값은 빈 문자열)"""
+    __slots__ = ('field_id',)
+
+    def __init__(self, field_id):
+        self.field_id = field_id
+
+    def eval(self, answers):
+        for form_data in answers.values():
+            if isinstance(form_data, dict) and self.field_id in form_data:
+                value = form_data[self.field_id]
+                if isinstance(value, (list, dict)):
+                    return ''
+                return _to_text(value)
+        return ''
+
+class CellRef:
+    """{table_id}[row][col]: 특정 셀 값"""
+    __slots__ = ('table_id', 'row_idx', 'col_id')
+
+    def __init__(self, table_id, row_idx, col_id):
+        self.table_id = table_id
+        self.row_idx = row_idx
+        self.col_id = col_id
+
+    def eval(self, answers):
+        for form_data in answers.values():
+            if not isinstance(form_data, dict):
+                continue
+            table_data = form_data.get(self.table_id)
+            if isinstance(table_data, list) and self.row_idx < len(table_data):
+                row = table_data[self.row_idx]
+                if isinstance(row, dict):
+                    return _to_text(row.get(self.col_id, ''))
+        return ''
+
+class ColumnRef:
+    """{table_id}[*][col]: 모든 행의 해당 열 값 리스트"""
+    __slots__ = ('table_id', 'col_id')
+
+    def __init__(self, table_id, col_id):
+        self.table_id = table_id
+        self.col_id = col_id
+
+    def eval(self, answers):
+        col_id = self.col_id
+        for form_data in answers.values():
+            if not isinstance(form_data, dict):
+                continue
+            table_data = form_data.get(self.table_id)
+            if isinstance(table_data, list):
+                values = [_to_text(row.get(col_id, '')) for row in table_data if isinstance(row, dict)]
+                if values:
+                    return values
+        return []
+
+class ListExpr:
+    __slots__ = ('items',)
+
+    def __init__(self, items):
+        self.items = items
+
+    def eval(self, answers):
+        return [item.eval(answers) for item in self.items]
+
+class Call:
+    __slots__ = ('func', 'args')
+
+    def __init__(self, func, args):
+        self.func = func
+        self.args = args
+
+    def eval(self, answers):
+        return self.func(*[arg.eval(answers) for arg in self.args])
+
+class And:
+    __slots__ = ('operands',)
+
+    def __init__(self, operands):
+        self.operands = operands
+
+    def eval(self, answers):
+        result = True
+        for node in self.operands:
+            result = node.eval(answers)
+            if not result:
+                return result
+        return result
+
+class Or:
+    __slots__ = ('operands',)
+
+    def __init__(self, operands):
+        self.operands = operands
+
+    def eval(self, answers):
+        result = False
+        for node in self.operands:
+            result = node.eval(answers)
+            if result:
+                return result
+        return result
+
+class Unary:
+    __slots__ = ('op', 'operand')
+
+    def __init__(self, op, operand):
+        self.op = op
+        self.operand = operand
+
+    def eval(self, answers):
+        return self.op(self.operand.eval(answers))
+
+class Binary:
+    __slots__ = ('op', 'left', 'right')
+
+    def __init__(self, op, left, right):
+        self.op = op
+        self.left = left
+        self.right = right
+
+    def eval(self, answers):
+        return self.op(self.left.eval(answers), self.right.eval(answers))
+
+class Compare:
+    """a < b <= c 형태의 연쇄 비교"""
+    __slots__ = ('left', 'ops', 'comparators')
+
+    def __init__(self, left, ops, comparators):
+        self.left = left
+        self.ops = ops
+        self.comparators = comparators
+
+    def eval(self, answers):
+        left = self.left.eval(answers)
+        for op, node in zip(self.ops, self.comparators):
+            right = node.eval(answers)
+            if not op(left, right):
+                return False
+            left = right
+        return True
+
+
+# ==========================================
+# [컴파일러] 조건식 -> 표현식 트리
+# ==========================================
+
+class RuleCompileError(ValueError):
+    pass
+
+_BOOL_OPS = {ast.And: And, ast.Or: Or}
+_UNARY_OPS = {ast.Not: operator.not_, ast.USub: operator.neg, ast.UAdd: operator.pos}
+_BIN_OPS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+    ast.Div: operator.truediv, ast.Mod: operator.mod,
+}
+_CMP_OPS = {
+    ast.Eq: operator.eq, ast.NotEq: operator.ne,
+    ast.Lt: operator.lt, ast.LtE: operator.le, ast.Gt: operator.gt, ast.GtE: operator.ge,
+    ast.In: lambda a, b: a in b, ast.NotIn: lambda a, b: a not in b,
+}
+
+def _build(node, refs):
+    if isinstance(node, ast.Expression):
+        return _build(node.body, refs)
+    if isinstance(node, ast.Constant):
+        return Const(node.value)
+    if isinstance(node, ast.Name):
+        if node.id in refs:
+            return refs[node.id]
+        raise RuleCompileError(f"알 수 없는 이름: {node.id}")
+    if isinstance(node, ast.BoolOp):
+        return _BOOL_OPS[type(node.op)]([_build(v, refs) for v in node.values])
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+        return Unary(_UNARY_OPS[type(node.op)], _build(node.operand, refs))
+    if isinstance(node, ast.BinOp) and type(node.op) in _BIN_OPS:
+        return Binary(_BIN_OPS[type(node.op)], _build(node.left, refs), _build(node.right, refs))
+    if isinstance(node, ast.Compare) and all(type(op) in _CMP_OPS for op in node.ops):
+        return Compare(
+            _build(node.left, refs),
+            [_CMP_OPS[type(op)] for op in node.ops],
+            [_build(c, refs) for c in node.comparators],
+        )
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+        func = RULE_FUNCTIONS.get(node.func.id)
+        if func is None:
+            raise RuleCompileError(f"지원하지 않는 함수: {node.func.id}")
+        return Call(func, [_build(a, refs) for a in node.args])
+    if isinstance(node, (ast.List, ast.Tuple)):
+        return ListExpr([_build(e, refs) for e in node.elts])
+    raise RuleCompileError(f"지원하지 않는 구문: {type(node).__name__}")
+
+def compile_condition(condition, origin_map=None):
+    """
+    조건식 문자열을 표현식 트리로 컴파일합니다.
+    originId 참조는 컴파일 시점에 실제 ID로 변환됩니다.
+    문법 오류 시 RuleCompileError 를 발생시킵니다.
+    """
+    origin_map = origin_map or {}
+    refs = {}
+
+    def replace_ref(match):
+        col_table, col_id, cell_table, cell_row, cell_col, field_id = match.groups()
+        name = f"{REF_PREFIX}{len(refs)}"
+        if col_table is not None:
+            refs[name] = ColumnRef(origin_map.get(col_table, col_table), col_id)
+        elif cell_table is not None:
+            refs[name] = CellRef(origin_map.get(cell_table, cell_table), int(cell_row), cell_col)
+        else:
+            refs[name] = FieldRef(origin_map.get(field_id, field_id))
+        return f" {name} "
+
+    expression = REF_PATTERN.sub(replace_ref, condition).strip()
+    try:
+        tree = ast.parse(expression, mode='eval')
+    except SyntaxError as e:
+        raise RuleCompileError(f"조건식 문법 오류: {e.msg}") from e
+    return _build(tree, refs)
+
+
+# ==========================================
+# [규칙 세트] 컴파일 결과 및 평가
+# ==========================================
+
+class CompiledRule:
+    __slots__ = ('rule', 'condition', 'target_form_id', 'expr', 'compile_error')
+
+    def __init__(self, rule, origin_map):
+        self.rule = rule
+        self.condition = rule.get('condition', '')
+        self.target_form_id = rule.get('target_form_id', '')
+        self.compile_error = None
+        self.expr = None
+        if self.condition:
+            try:
+                self.expr = compile_condition(self.condition, origin_map)
+            except RuleCompileError as e:
+                self.compile_error = str(e)
+
+    def select_answers(self, answers):
+        """대상 조사표(target_form_id)에 해당하는 답변만 추출"""
+        target_form_id = self.target_form_id
+        if not target_form_id:
+            return answers
+        selected = {}
+        for ver_form_id, form_data in answers.items():
+            form_id = ver_form_id.split('-')[0] if '-' in ver_form_id else ver_form_id
+            if form_id == target_form_id or target_form_id in ver_form_id:
+                selected[ver_form_id] = form_data
+        return selected
+
+    def is_violated(self, answers):
+        """조건식이 True 이면 위반. 평가 중 오류는 위반 아님(False)으로 처리"""
+        if self.expr is None:
+            return False
+        try:
+            return bool(self.expr.eval(answers))
+        except Exception:
+            return False
+
+    def violation_info(self):
+        rule = self.rule
+        return {
+            'rule_id': rule.get('rule_id'),
+            'message': rule.get('message', f"규칙 {rule.get('rule_id')} 위반"),
+            'condition': self.condition,
+            'target_field': rule.get('target_field'),
+            'severity': rule.get('severity', 'ERROR'),
+        }
+
+class CompiledRuleSet:
+    def __init__(self, edit_rules, origin_map):
+        self.rules = [CompiledRule(rule, origin_map) for rule in edit_rules or []]
+
+    def evaluate_detail(self, answers):
+        """
+        답변 전체에 대해 규칙을 평가합니다.
+        반환: (errors, warnings) - 둘 다 위반 상세 정보 dict 리스트
+        """
+        errors = []
+        warnings = []
+        for compiled in self.rules:
+            if compiled.expr is None:
+                continue
+            form_answers = compiled.select_answers(answers)
+            if not form_answers:
+                continue
+            if compiled.is_violated(form_answers):
+                info = compiled.violation_info()
+                if info['severity'] == 'ERROR':
+                    errors.append(info)
+                else:
+                    warnings.append(info)
+        return errors, warnings
+
+    def evaluate(self, answers):
+        """저장 API용: (에러 메시지 리스트, 경고 상세 정보 리스트)"""
+        errors, warnings = self.evaluate_detail(answers)
+        return [e['message'] for e in errors], warnings
+
+
+# ==========================================
+# [캐시] 프로세스 로컬 LRU
+# ==========================================
+_RULE_SET_CACHE = OrderedDict()
+_RULE_SET_CACHE_SIZE = 256
+_cache_lock = threading.Lock()
+
+def rules_digest(edit_rules):
+    """규칙 내용 기반 버전 키"""
+    raw = json.dumps(edit_rules or [], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+def get_rule_set(edit_rules, origin_map, version_key=None):
+    """
+    컴파일된 규칙 세트를 캐시에서 가져오거나 새로 컴파일합니다.
+    origin_map: originId -> 실제 문항 ID (조사표 매니페스트의 origin_map 을 합친 것)
+    version_key: 확정 조사표 버전을 식별하는 값 (예: 확정 버전 ID 튜플).
+                 originId 맵이 버전에 따라 달라지므로 캐시 키에 포함됩니다.
+    """
+    if version_key is None:
+        version_key = rules_digest([origin_map])
+    key = (rules_digest(edit_rules), version_key)
+    with _cache_lock:
+        rule_set = _RULE_SET_CACHE.get(key)
+        if rule_set is not None:
+            _RULE_SET_CACHE.move_to_end(key)
+            return rule_set
+
+    rule_set = CompiledRuleSet(edit_rules, origin_map)
+    with _cache_lock:
+        _RULE_SET_CACHE[key] = rule_set
+        while len(_RULE_SET_CACHE) > _RULE_SET_CACHE_SIZE:
+            _RULE_SET_CACHE.popitem(last=False)
+    return rule_set
+
+
+# ==========================================
+# [일괄 재검증] 프로세스 풀 워커 함수
+# ==========================================
+# 워커 프로세스는 Django 설정 없이 이 모듈만으로 동작합니다.
+_worker_rule_set = None
+
+def init_worker(edit_rules, origin_map, version_key=None):
+    """프로세스 풀 initializer: 워커별로 규칙 세트를 한 번만 컴파일"""
+    global _worker_rule_set
+    _worker_rule_set = get_rule_set(edit_rules, origin_map, version_key)
+
+def evaluate_rows(rows, rule_set=None):
+    """
+    rows: [(pk, survey_values), ...]
+    반환: [(pk, error_infos, warning_infos), ...]
+    """
+    rule_set = rule_set or _worker_rule_set
+    results = []
+    for pk, survey_values in rows:
+        answers = {
+            k: v for k, v in (survey_values or {}).items()
+            if not k.startswith('_')
+        } if isinstance(survey_values, dict) else {}
+        error_infos, warnings = rule_set.evaluate_detail(answers)
+        results.append((pk, error_infos, warnings))
+    return results
@@ -0,0 +1,176 @@
+# surveys/snapshots.py
+"""
+저장된 분석(SurveyAnalysis)의 집계 결과 스냅샷
+
+리포트를 열 때마다 원자료를 다시 받아 피벗하지 않도록, 서버 집계 결과(aggregate_report + viewer_report)를
+AnalysisSnapshot 에 JSON 문자열로 저장해 두고 get_analysis_detail 이 그대로 내려보냅니다.
+
+- 데이터 버전: 조사별 변경 건수 카운터 (공유 캐시, 커밋 후 증가)
+  응답 저장 경로에 DB 쓰기(조사 단위 단일 행 잠금)를 추가하지 않기 위해 캐시 카운터를 사용합니다.
+  카운터는 생성 시각(마이크로초)에서 시작하므로 캐시가 초기화돼도 이전 값과 겹치지 않습니다.
+  (피벗 데이터의 ETag 에도 사용)
+- 갱신 조건 (needs_refresh)
+  - 리포트 설정이 바뀜 (config_hash)
+  - 스냅샷 이후 변경 건수가 SNAPSHOT_CHANGE_THRESHOLD 이상
+  - 변경이 있고 스냅샷이 SNAPSHOT_MAX_AGE 초보다 오래됨 (주기 갱신)
+  - 카운터가 스냅샷보다 작음 (캐시 초기화 - 변경 여부를 알 수 없으므로 갱신)
+- 갱신 시점
+  - 변경 건수가 임계값의 배수를 넘을 때 해당 조사의 갱신 작업(refresh_analysis_snapshots) 등록
+  - 주기 갱신은 refresh_analysis_snapshots 명령을 cron 으로 실행
+  - 스냅샷이 없거나 설정이 바뀐 리포트는 처음 열 때 바로 생성
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .aggregation import AggregationError, aggregate_report, viewer_report
+from .jobs import enqueue_job
+from .models import AnalysisSnapshot, BackgroundJob, SurveyAnalysis
+
+CHANGE_THRESHOLD = getattr(settings, 'ANALYSIS_SNAPSHOT_CHANGE_THRESHOLD', 200)
+MAX_AGE = getattr(settings, 'ANALYSIS_SNAPSHOT_MAX_AGE', 60 * 60)
+
+JOB_TYPE = 'refresh_analysis_snapshots'
+
+
+# ==========================================
+# 데이터 버전 (조사별 변경 건수)
+# ==========================================
+
+def _version_key(survey_id):
+    return f"analysis_data_version:{survey_id}"
+
+
+def data_version(survey_id):
+    key = _version_key(survey_id)
+    version = cache.get(key)
+    if version is None:  # 최초/캐시 초기화
+        cache.add(key, time.time_ns() // 1000, None)
+        version = cache.get(key)
+    return version
+
+
+def _bump(survey_id, rows):
+    key = _version_key(survey_id)
+    try:
+        version = cache.incr(key, rows)
+    except ValueError:  # 카운터 없음 (최초/캐시 초기화)
+        version = data_version(survey_id) + rows
+        cache.incr(key, rows)
+    # 임계값의 배수를 넘는 순간 갱신 작업 등록 (실제 갱신 여부는 분석별로 다시 판단)
+    if version // CHANGE_THRESHOLD != (version - rows) // CHANGE_THRESHOLD:
+        enqueue_refresh(survey_id)
+
+
+def record_data_change(survey_id, rows=1):
+    """조사 수집 데이터 변경 알림 - 커밋되면 변경 건수를 더합니다. (롤백되면 무시)"""
+    if survey_id and rows > 0:
+        transaction.on_commit(lambda: _bump(survey_id, rows))
+
+
+def enqueue_refresh(survey_id):
+    """조사의 스냅샷 갱신 작업 등록 (같은 조사의 대기 작업이 있으면 생략)"""
+    pending = BackgroundJob.objects.filter(
+        job_type=JOB_TYPE, status='QUEUED', params__survey_id=survey_id
+    ).exists()
+    if not pending:
+        enqueue_job(JOB_TYPE, {'survey_id': survey_id})
+
+
+# ==========================================
+# 스냅샷 생성 / 갱신 판단
+# ==========================================
+
+def config_hash(report_config):
+    text = json.dumps(report_config, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def build_snapshot(analysis):
+    """분석의 스냅샷을 (다시) 만듭니다. 서버 집계를 지원하지 않는 리포트는 사유만 기록합니다."""
+    # 집계 중에 들어온 변경은 다음 갱신 대상이 되도록 버전을 먼저 읽음
+    version = data_version(analysis.survey_id)
+    started = time.monotonic()
+    try:
+        cube = aggregate_report(analysis.survey_id, analysis.report_config)
+        payload = json.dumps(
+            {'report': viewer_report(analysis.report_config, cube), 'cells': cube['cells']},
+            ensure_ascii=False, default=str,
+        )
+        cell_count, error = cube['cell_count'], ''
+    except AggregationError as e:
+        payload, cell_count, error = 'null', 0, str(e)
+
+    snapshot, _ = AnalysisSnapshot.objects.update_or_create(analysis=analysis, defaults={
+        'payload': payload,
+        'cell_count': cell_count,
+        'config_hash': config_hash(analysis.report_config),
+        'data_version': version,
+        'error': error,
+        'built_at': timezone.now(),
+        'elapsed': round(time.monotonic() - started, 3),
+    })
+    return snapshot
+
+
+def needs_refresh(snapshot, analysis, version=None, now=None):
+    if snapshot is None or snapshot.config_hash != config_hash(analysis.report_config):
+        return True
+    if snapshot.error:  # 집계 불가 리포트는 설정이 바뀔 때만 다시 시도
+        return False
+    version = data_version(analysis.survey_id) if version is None else version
+    changes = version - snapshot.data_version
+    if changes < 0 or changes >= CHANGE_THRESHOLD:
+        return True
+    age = ((now or timezone.now()) - snapshot.built_at).total_seconds()
+    return changes > 0 and age >= MAX_AGE
+
+
+def refresh_snapshots(survey_ids=None, force=False, progress=None):
+    """
+    갱신이 필요한 스냅샷을 다시 만듭니다.
+    survey_ids: 대상 조사 (None 이면 전체) / force: 조건과 관계없이 모두 갱신
+    반환: {'refreshed', 'skipped', 'failed'}
+    """
+    analyses = SurveyAnalysis.objects.select_related('snapshot').defer('snapshot__payload').order_by('survey_id', 'id')
+    if survey_ids is not None:
+        analyses = analyses.filter(survey_id__in=survey_ids)
+
+    stats = {'refreshed': 0, 'skipped': 0, 'failed': 0}
+    versions = {}
+    now = timezone.now()
+    analyses = list(analyses)
+    for i, analysis in enumerate(analyses):
+        snapshot = getattr(analysis, 'snapshot', None)
+        if analysis.survey_id not in versions:
+            versions[analysis.survey_id] = data_version(analysis.survey_id)
+        if force or needs_refresh(snapshot, analysis, versions[analysis.survey_id], now):
+            try:
+                build_snapshot(analysis)
+                stats['refreshed'] += 1
+            except Exception as e:
+                print(f"분석 스냅샷 생성 실패 (ID: {analysis.id}): {e}")
+                stats['failed'] += 1
+        else:
+            stats['skipped'] += 1
+        if progress:
+            progress(i + 1, len(analyses))
+    return stats
+
+
+def snapshot_for_view(analysis):
+    """
+    열람용 스냅샷: 없거나 설정이 바뀌었으면 바로 만들고, 데이터 변경으로 오래된 경우는
+    기존 스냅샷을 그대로 쓰면서 갱신 작업만 등록합니다.
+    """
+    snapshot = getattr(analysis, 'snapshot', None)
+    if snapshot is None or snapshot.config_hash != config_hash(analysis.report_config):
+        return build_snapshot(analysis)
+    if needs_refresh(snapshot, analysis):
+        enqueue_refresh(analysis.survey_id)
+    return snapshot
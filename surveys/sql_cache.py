@@ -0,0 +1,182 @@
+# surveys/sql_cache.py
+"""
+SQL 실행 결과 캐시 (api/execute-sql)
+
+대시보드가 같은 SQL 을 반복해서 보내도 Superset 에는 한 번만 실행되도록 결과를 캐시합니다.
+- 키: sqlparse 로 정규화한 SQL(주석 제거, 키워드 대문자, 공백 정리, 끝 ';' 제거) + database_id
+- 1차: 프로세스 로컬 LRU (항목 수 / 전체 크기 상한, 초과 시 오래 안 쓴 것부터 제거)
+- 2차: 공유 캐시(settings.CACHES) - 다른 워커 프로세스와 결과 공유 (크기 상한 이하 결과만)
+- TTL: SQL_RESULT_CACHE_TTL 초
+- 동시 요청 중복 제거(single-flight): 같은 키를 실행 중이면 프로세스 내에서는 완료를 기다리고,
+  다른 프로세스는 공유 캐시 잠금(cache.add)을 보고 결과가 올라올 때까지 잠시 기다립니다.
+- 무효화: 수집 데이터가 바뀌면(mark_data_changed, 커밋 후) 세대(generation) 토큰을 교체해 이전 결과를 모두 무시
+  (SQL 이 어떤 조사를 읽는지 알 수 없으므로 전체 세대를 교체)
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import sqlparse
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+CACHE_TTL = getattr(settings, 'SQL_RESULT_CACHE_TTL', 300)
+MAX_ENTRIES = getattr(settings, 'SQL_RESULT_CACHE_MAX_ENTRIES', 256)
+MAX_BYTES = getattr(settings, 'SQL_RESULT_CACHE_MAX_BYTES', 64 * 1024 * 1024)
+SHARED_MAX_BYTES = getattr(settings, 'SQL_RESULT_CACHE_SHARED_MAX_BYTES', 2 * 1024 * 1024)
+LOCK_TIMEOUT = 120      # 다른 프로세스가 실행 중인 쿼리를 기다리는 최대 시간(초)
+LOCK_POLL = 0.2
+
+GEN_KEY = 'sql_cache:gen'
+
+
+def normalize_sql(sql):
+    """캐시 키용 SQL 정규화 (문자열 리터럴/식별자 대소문자는 유지)"""
+    formatted = sqlparse.format(sql, strip_comments=True, keyword_case='upper', strip_whitespace=True)
+    return formatted.strip().rstrip(';').strip()
+
+
+def _generation():
+    generation = cache.get(GEN_KEY)
+    if generation is None:
+        cache.add(GEN_KEY, time.time_ns(), None)
+        generation = cache.get(GEN_KEY)
+    return generation
+
+
+def cache_key(sql, database_id):
+    digest = hashlib.sha256(f"{database_id}\n{normalize_sql(sql)}".encode('utf-8')).hexdigest()
+    return f"sql_cache:{_generation()}:{digest}"
+
+
+def mark_data_changed():
+    """수집 데이터 변경 알림 - 커밋되면 캐시 세대를 교체합니다. (롤백되면 무시)"""
+    transaction.on_commit(lambda: cache.set(GEN_KEY, time.time_ns(), None))
+
+
+# ==========================================
+# 프로세스 로컬 LRU
+# ==========================================
+
+class _LRU:
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.items = OrderedDict()  # key -> (만료시각, 크기, 결과)
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.items.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                self._remove(key)
+                return None
+            self.items.move_to_end(key)
+            return entry[2]
+
+    def put(self, key, result, size, ttl):
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.items:
+                self._remove(key)
+            self.items[key] = (time.monotonic() + ttl, size, result)
+            self.size += size
+            while len(self.items) > self.max_entries or self.size > self.max_bytes:
+                self._remove(next(iter(self.items)))
+
+    def _remove(self, key):
+        _, size, _ = self.items.pop(key)
+        self.size -= size
+
+
+_local = _LRU(MAX_ENTRIES, MAX_BYTES)
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def store_result(key, result):
+    """결과 저장 (오류 결과는 저장하지 않음)"""
+    if not isinstance(result, dict) or 'error' in result:
+        return
+    size = len(json.dumps(result, ensure_ascii=False, default=str))
+    _local.put(key, result, size, CACHE_TTL)
+    if size <= SHARED_MAX_BYTES:
+        cache.set(key, result, CACHE_TTL)
+
+
+def lookup(key):
+    """캐시된 결과 (없으면 None)"""
+    result = _local.get(key)
+    if result is None:
+        result = cache.get(key)
+        if result is not None:
+            _local.put(key, result, len(json.dumps(result, ensure_ascii=False, default=str)), CACHE_TTL)
+    return result
+
+
+def _wait_other_process(key):
+    """
+    다른 프로세스가 같은 쿼리를 실행 중이면 결과가 올라올 때까지 대기합니다.
+    반환: (결과, None) - 다른 프로세스의 결과 / (None, 잠금키) - 직접 실행 (잠금 보유)
+          (None, None) - 대기 시간 초과, 잠금 없이 직접 실행
+    """
+    lock_key = f"{key}:lock"
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while True:
+        if cache.add(lock_key, 1, LOCK_TIMEOUT):
+            return None, lock_key
+        result = cache.get(key)
+        if result is not None:
+            return result, None
+        if time.monotonic() > deadline:
+            return None, None
+        time.sleep(LOCK_POLL)
+
+
+def cached_query(sql, database_id, runner):
+    """
+    캐시를 거쳐 SQL 을 실행합니다.
+    runner(sql, database_id) -> 결과 dict (오류면 {'error': ...})
+    반환: (결과, 'hit' / 'miss')
+    """
+    key = cache_key(sql, database_id)
+    result = lookup(key)
+    if result is not None:
+        return result, 'hit'
+
+    # 프로세스 내 single-flight: 먼저 온 요청만 실행, 나머지는 완료를 기다림
+    with _inflight_lock:
+        event = _inflight.get(key)
+        leader = event is None
+        if leader:
+            event = _inflight[key] = threading.Event()
+    if not leader:
+        event.wait(LOCK_TIMEOUT)
+        result = lookup(key)
+        if result is not None:
+            return result, 'hit'
+        return runner(sql, database_id), 'miss'  # 먼저 실행한 요청이 실패한 경우
+
+    try:
+        result, lock_key = _wait_other_process(key)
+        if result is not None:
+            _local.put(key, result, len(json.dumps(result, ensure_ascii=False, default=str)), CACHE_TTL)
+            return result, 'hit'
+        try:
+            result = runner(sql, database_id)
+            store_result(key, result)
+        finally:
+            if lock_key:
+                cache.delete(lock_key)
+        return result, 'miss'
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        event.set()
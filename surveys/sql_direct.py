@@ -0,0 +1,342 @@
+# surveys/sql_direct.py
+"""
+읽기 전용 SQL 직접 실행 (api/execute-sql, backend=direct)
+
+Superset 을 거치지 않고 평면 테이블(surveys_flat_*)을 DB 에서 바로 조회해 NDJSON 으로 흘려보냅니다.
+- 연결: 평면 테이블 SELECT 권한만 준 계정의 readonly 연결(SQL_DIRECT_DATABASE)에서만 실행
+  연결이 설정되지 않았으면 실행하지 않습니다. (default 연결로 대신 실행하지 않음)
+- 검사: SELECT(WITH 포함) 1문장만 허용, 쓰기/DDL 키워드 거부
+  함수는 허용 목록(ALLOWED_FUNCTIONS)만 호출 가능. 공백/주석을 뺀 토큰열에서 '(' 앞의 이름을
+  모두 호출로 보므로 따옴표 이름("pg_sleep"(1))이나 이름과 괄호 사이의 주석도 걸러집니다.
+  (함수 안에서 읽는 테이블은 실행 계획에 나타나지 않으므로 허용 목록 밖의 함수는 모두 거부)
+- 테이블 허용 목록: SQL_DIRECT_ALLOWED_TABLES 정규식 + 호출자 권한(table_allowed)
+  문장에서 테이블을 직접 찾지 않고 DB 가 실제로 읽는 테이블로 확인합니다.
+  - PostgreSQL: EXPLAIN (FORMAT JSON) 실행 계획의 Relation Name
+  - SQLite    : sqlite3 authorizer (읽는 테이블/컬럼마다 호출, 허용 외 테이블은 prepare 단계에서 거부)
+- 실행: 읽기 전용 트랜잭션 + 문장 타임아웃 + 서버 측 커서(fetchmany 단위) + 최대 행 수
+  - PostgreSQL: SET TRANSACTION READ ONLY, SET LOCAL statement_timeout, 이름 있는 커서
+  - SQLite    : PRAGMA query_only, progress handler 로 시간 초과 시 중단
+- 출력(NDJSON): {"columns": [...]} / 행마다 {컬럼: 값} / 마지막 {"_meta": {rows, truncated, elapsed}}
+  스트리밍 도중 오류가 나면 {"_error": 메시지} 줄로 끝납니다.
+"""
+import json
+import re
+import time
+
+import sqlparse
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from sqlparse import tokens as T
+
+ALLOWED_TABLES = re.compile(getattr(settings, 'SQL_DIRECT_ALLOWED_TABLES', r'^surveys_flat_(\d+)(_rows)?$'))
+DATABASE = getattr(settings, 'SQL_DIRECT_DATABASE', 'readonly')
+TIMEOUT = getattr(settings, 'SQL_DIRECT_TIMEOUT', 30)
+MAX_ROWS = getattr(settings, 'SQL_DIRECT_MAX_ROWS', 100000)
+FETCH_SIZE = getattr(settings, 'SQL_DIRECT_FETCH_SIZE', 2000)
+
+# FROM 절에서 허용하는 집합 반환 함수 (PostgreSQL 실행 계획의 Function Scan)
+ALLOWED_SET_FUNCTIONS = {
+    'generate_series', 'unnest', 'json_each', 'jsonb_each', 'json_each_text', 'jsonb_each_text',
+    'json_array_elements', 'jsonb_array_elements', 'json_array_elements_text', 'jsonb_array_elements_text',
+}
+# 호출할 수 있는 함수 (집계/윈도우/조건/수치/문자열/날짜/JSON, PostgreSQL + SQLite)
+ALLOWED_FUNCTIONS = ALLOWED_SET_FUNCTIONS | {
+    'count', 'sum', 'avg', 'min', 'max', 'total', 'group_concat', 'string_agg', 'array_agg',
+    'json_agg', 'jsonb_agg', 'json_object_agg', 'jsonb_object_agg', 'bool_and', 'bool_or', 'every',
+    'stddev', 'stddev_pop', 'stddev_samp', 'variance', 'var_pop', 'var_samp', 'corr', 'covar_pop', 'covar_samp',
+    'percentile_cont', 'percentile_disc', 'mode',
+    'row_number', 'rank', 'dense_rank', 'percent_rank', 'cume_dist', 'ntile',
+    'lag', 'lead', 'first_value', 'last_value', 'nth_value',
+    'cast', 'coalesce', 'nullif', 'greatest', 'least', 'ifnull', 'iif',
+    'abs', 'round', 'ceil', 'ceiling', 'floor', 'trunc', 'mod', 'power', 'sqrt', 'exp', 'ln', 'log', 'sign',
+    'div', 'width_bucket',
+    'length', 'char_length', 'lower', 'upper', 'trim', 'ltrim', 'rtrim', 'btrim', 'substr', 'substring',
+    'left', 'right', 'replace', 'concat', 'concat_ws', 'position', 'strpos', 'instr', 'split_part',
+    'lpad', 'rpad', 'initcap', 'to_char', 'to_number', 'to_date', 'to_timestamp',
+    'extract', 'date_trunc', 'date_part', 'now', 'age', 'make_date', 'date', 'datetime', 'strftime', 'julianday',
+    'json_extract', 'json_extract_path_text', 'jsonb_extract_path_text', 'json_array_length',
+    'jsonb_array_length', 'json_typeof', 'jsonb_typeof', 'json_build_object', 'jsonb_build_object',
+    'json_build_array', 'jsonb_build_array',
+}
+# '(' 앞에 와도 함수 호출이 아닌 예약어 (따옴표 없는 경우만)
+PAREN_KEYWORDS = {
+    'SELECT', 'FROM', 'WHERE', 'AND', 'OR', 'NOT', 'IN', 'EXISTS', 'ANY', 'ALL', 'SOME', 'AS', 'ON', 'USING',
+    'JOIN', 'LATERAL', 'VALUES', 'OVER', 'FILTER', 'GROUP', 'BY', 'HAVING', 'WHEN', 'THEN', 'ELSE', 'CASE',
+    'BETWEEN', 'IS', 'LIKE', 'ILIKE', 'DISTINCT', 'UNION', 'INTERSECT', 'EXCEPT', 'LIMIT', 'OFFSET',
+    'MATERIALIZED', 'RECURSIVE', 'WITH', 'ROW', 'ARRAY',
+}
+
+
+class SqlNotAllowed(Exception):
+    """허용되지 않는 SQL (검사 실패)"""
+
+
+def table_survey_id(table_name):
+    """허용 테이블 이름이면 조사 ID (조사와 무관한 허용 테이블은 0), 아니면 None"""
+    match = ALLOWED_TABLES.match(table_name.split('.')[-1])
+    if match is None:
+        return None
+    return int(match.group(1)) if match.groups() and match.group(1) else 0
+
+
+# ==========================================
+# 문장 검사
+# ==========================================
+
+def _identifier(token):
+    """이름 토큰 값 (따옴표 이름은 그대로, 아니면 소문자)"""
+    if token.ttype in T.Literal.String.Symbol:
+        return token.value[1:-1].replace('""', '"')
+    return token.value.lower()
+
+
+def _is_word(token, *words):
+    """따옴표 없는 예약어/이름이 words 중 하나인지"""
+    return token.ttype not in T.Literal.String.Symbol and token.value.upper() in words
+
+
+def _is_punct(token, value):
+    return token.ttype is T.Punctuation and token.value == value
+
+
+def _closing_paren(tokens, start):
+    """tokens[start] 의 '(' 와 짝이 되는 ')' 위치 (없으면 마지막 위치)"""
+    depth = 0
+    for j in range(start, len(tokens)):
+        if _is_punct(tokens[j], '('):
+            depth += 1
+        elif _is_punct(tokens[j], ')'):
+            depth -= 1
+            if depth == 0:
+                return j
+    return len(tokens) - 1
+
+
+def _cte_column_lists(tokens):
+    """
+    WITH 절 이름 뒤 컬럼 목록의 '(' 위치 집합
+    WITH [RECURSIVE] 이름 (컬럼...) AS [[NOT] MATERIALIZED] (...) [, 이름 ...] 형태만 인정합니다.
+    """
+    found = set()
+    for i, token in enumerate(tokens):
+        if not _is_word(token, 'WITH'):
+            continue
+        j = i + 1
+        if j < len(tokens) and _is_word(tokens[j], 'RECURSIVE'):
+            j += 1
+        while j + 1 < len(tokens) and tokens[j].ttype is not T.Punctuation:
+            k, column_list = j + 1, None
+            if _is_punct(tokens[k], '('):
+                column_list, k = k, _closing_paren(tokens, k) + 1
+            if k >= len(tokens) or not _is_word(tokens[k], 'AS'):
+                break
+            k += 1
+            if k < len(tokens) and _is_word(tokens[k], 'NOT'):
+                k += 1
+            if k < len(tokens) and _is_word(tokens[k], 'MATERIALIZED'):
+                k += 1
+            if k >= len(tokens) or not _is_punct(tokens[k], '('):
+                break
+            if column_list is not None:
+                found.add(column_list)
+            k = _closing_paren(tokens, k) + 1
+            if k >= len(tokens) or not _is_punct(tokens[k], ','):
+                break
+            j = k + 1
+    return found
+
+
+def _called_functions(statement):
+    """
+    문장에서 호출하는 함수 이름 목록 (스키마가 붙으면 'schema.name')
+    공백/주석을 뺀 토큰열에서 '(' 바로 앞의 이름/예약어를 호출로 봅니다. 다음은 호출이 아님:
+    괄호를 여는 예약어(IN, EXISTS, OVER ...), 자료형/별칭 컬럼 목록(AS numeric(10, 2), ::varchar(10), AS g(n)),
+    WITH 절 이름의 컬럼 목록(WITH b(x) AS (...)) / 별칭 컬럼 목록은 AS 를 붙여야 합니다.
+    """
+    tokens = [t for t in statement.flatten() if not t.is_whitespace and t.ttype not in T.Comment]
+    cte_columns = _cte_column_lists(tokens)
+    for i, token in enumerate(tokens):
+        if i == 0 or not _is_punct(token, '(') or i in cte_columns:
+            continue
+        name = tokens[i - 1]
+        if not (name.ttype in T.Name or name.ttype in T.Keyword or name.ttype in T.Literal.String.Symbol):
+            continue
+        if _is_word(name, *PAREN_KEYWORDS):
+            continue
+        before = tokens[i - 2] if i >= 2 else None
+        if before is not None and (before.value == '::' or (before.ttype in T.Keyword and before.normalized == 'AS')):
+            continue
+        if before is not None and _is_punct(before, '.') and i >= 3:
+            yield f"{_identifier(tokens[i - 3])}.{_identifier(name)}"
+        else:
+            yield _identifier(name)
+
+
+def validate_sql(sql):
+    """
+    SELECT 1문장인지 검사하고 실행할 SQL(끝 ';' 제거)을 반환합니다.
+    테이블 허용 여부는 실행 시 DB 기준으로 확인합니다. (stream_query)
+    """
+    statements = [s for s in sqlparse.parse(sql or '') if s.token_first(skip_cm=True, skip_ws=True) is not None]
+    if len(statements) != 1:
+        raise SqlNotAllowed("SQL 은 한 문장만 실행할 수 있습니다.")
+    statement = statements[0]
+    if statement.get_type() != 'SELECT':
+        raise SqlNotAllowed("SELECT 문만 실행할 수 있습니다.")
+
+    for token in statement.flatten():
+        if token.ttype in (T.Keyword.DDL, T.Keyword.DCL) or (
+            token.ttype is T.Keyword.DML and token.normalized != 'SELECT'
+        ):
+            raise SqlNotAllowed(f"허용되지 않는 키워드입니다: {token.value}")
+        if token.ttype in T.Keyword and token.normalized in ('INTO', 'COPY', 'LOCK', 'SET', 'CALL'):
+            raise SqlNotAllowed(f"허용되지 않는 키워드입니다: {token.value}")
+
+    for name in _called_functions(statement):
+        if name not in ALLOWED_FUNCTIONS:
+            raise SqlNotAllowed(f"허용되지 않는 함수입니다: {name}")
+
+    return str(statement).strip().rstrip(';').strip()
+
+
+def _check_plan(cursor, sql, table_allowed):
+    """PostgreSQL: 실행 계획에서 읽는 테이블/함수를 확인합니다."""
+    cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    nodes = [entry['Plan'] for entry in plan]
+    while nodes:
+        node = nodes.pop()
+        relation = node.get('Relation Name')
+        if relation is not None and not table_allowed(relation):
+            raise SqlNotAllowed(f"조회할 수 없는 테이블입니다: {relation}")
+        function = node.get('Function Name')
+        if function is not None and function.lower() not in ALLOWED_SET_FUNCTIONS:
+            raise SqlNotAllowed(f"허용되지 않는 함수입니다: {function}")
+        nodes.extend(node.get('Plans', ()))
+
+
+# ==========================================
+# 실행 환경 (읽기 전용 + 타임아웃)
+# ==========================================
+
+def _sqlite_authorizer(schema_tables, table_allowed):
+    """
+    SQLite 권한 콜백. 읽기(READ)는 스키마에 있는 테이블만 허용 목록으로 확인합니다.
+    (WITH 절/서브쿼리 이름도 READ 로 들어오고, count(*) 처럼 컬럼 없는 읽기는 DB 이름이 비어 있으므로 이름으로 구분)
+    """
+    import sqlite3
+
+    allowed_actions = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE}
+
+    def authorize(action, arg1, arg2, db_name, trigger):
+        if action == sqlite3.SQLITE_READ:
+            if arg1.lower() in schema_tables and not table_allowed(arg1):
+                return sqlite3.SQLITE_DENY
+            return sqlite3.SQLITE_OK
+        if action == sqlite3.SQLITE_FUNCTION:
+            return sqlite3.SQLITE_OK if arg2.lower() in ALLOWED_FUNCTIONS else sqlite3.SQLITE_DENY
+        return sqlite3.SQLITE_OK if action in allowed_actions else sqlite3.SQLITE_DENY
+
+    return authorize
+
+
+def _enter_readonly(connection, cursor, sql, timeout, deadline, table_allowed):
+    if connection.vendor == 'postgresql':
+        cursor.execute("SET TRANSACTION READ ONLY")
+        cursor.execute("SET LOCAL statement_timeout = %s", [int(timeout * 1000)])
+        _check_plan(cursor, sql, table_allowed)
+    elif connection.vendor == 'sqlite':
+        cursor.execute("SELECT lower(name) FROM sqlite_master WHERE type IN ('table', 'view')")
+        schema_tables = {name for name, in cursor.fetchall()} | {'sqlite_master', 'sqlite_schema'}
+        cursor.execute("PRAGMA query_only = 1")
+        raw = connection.connection
+        raw.set_authorizer(_sqlite_authorizer(schema_tables, table_allowed))
+        raw.set_progress_handler(lambda: int(time.monotonic() > deadline), 10000)
+    else:
+        raise SqlNotAllowed(f"직접 실행을 지원하지 않는 DB 입니다: {connection.vendor}")
+
+
+def _exit_readonly(connection):
+    if connection.vendor == 'sqlite' and connection.connection is not None:
+        raw = connection.connection
+        raw.set_authorizer(None)
+        raw.set_progress_handler(None, 0)
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA query_only = 0")
+
+
+# ==========================================
+# 스트리밍 실행
+# ==========================================
+
+def is_available(using=None):
+    """직접 실행용 읽기 전용 연결이 설정되어 있는지"""
+    return (using or DATABASE) in connections.databases
+
+
+def _line(obj):
+    return json.dumps(obj, ensure_ascii=False, default=str) + '\n'
+
+
+def stream_query(sql, table_allowed, using=None, timeout=None, max_rows=None, fetch_size=None):
+    """
+    검사된 SQL 을 실행해 NDJSON 줄 묶음(str)을 생성합니다.
+    table_allowed(table_name) -> bool : 호출자가 조회 가능한 테이블인지
+    첫 묶음(columns)을 만들기 전의 오류(검사 실패/문법 오류)는 예외로 올리므로,
+    호출 측은 next() 로 첫 묶음을 먼저 받아 오류 응답을 돌려줄 수 있습니다.
+    """
+    using = using or DATABASE
+    if not is_available(using):
+        raise SqlNotAllowed(f"읽기 전용 DB 연결({using})이 설정되지 않아 직접 실행할 수 없습니다.")
+    timeout = timeout or TIMEOUT
+    max_rows = max_rows or MAX_ROWS
+    fetch_size = fetch_size or FETCH_SIZE
+    connection = connections[using]
+    started = time.monotonic()
+    deadline = started + timeout
+    sent_header = False
+
+    try:
+        with transaction.atomic(using=using):
+            try:
+                with connection.cursor() as cursor:
+                    _enter_readonly(connection, cursor, sql, timeout, deadline, table_allowed)
+                cursor = connection.chunked_cursor()
+                try:
+                    cursor.execute(sql)
+                    # 이름 있는 커서(PostgreSQL)는 첫 fetch 후에 컬럼 정보가 채워짐
+                    batch = cursor.fetchmany(fetch_size)
+                    columns = [column[0] for column in cursor.description]
+                    sent_header = True
+                    yield _line({'columns': columns})
+
+                    rows = 0
+                    truncated = False
+                    while batch:
+                        if rows + len(batch) > max_rows:
+                            batch = batch[:max_rows - rows]
+                            truncated = True
+                        rows += len(batch)
+                        yield ''.join(_line(dict(zip(columns, row))) for row in batch)
+                        if truncated:
+                            break
+                        if time.monotonic() > deadline:
+                            raise DatabaseError(f"실행 시간({timeout}초)을 초과했습니다.")
+                        batch = cursor.fetchmany(fetch_size)
+                        truncated = rows >= max_rows and bool(batch)
+                        if truncated:
+                            break
+                finally:
+                    cursor.close()
+            finally:
+                _exit_readonly(connection)
+    except (DatabaseError, SqlNotAllowed) as e:
+        if not sent_header:
+            raise
+        yield _line({'_error': str(e)})
+        return
+
+    yield _line({'_meta': {'rows': rows, 'truncated': truncated, 'elapsed': round(time.monotonic() - started, 3)}})
@@ -1,60 +1,213 @@
 # surveys/superset_utils.py
+"""
+Superset SQL Lab API 클라이언트
+
+- 연결 풀: 프로세스당 requests.Session 1개를 공유 (HTTP keep-alive, 풀 크기 SUPERSET_POOL_SIZE)
+- 토큰 캐시: 로그인은 토큰 만료(JWT exp) 직전까지 1회만, 401 응답이면 재로그인 후 1회 재시도
+- 비동기 실행: runAsync=True 로 제출 후 쿼리 상태를 폴링, 완료되면 결과 키로 결과를 조회
+  (Superset DB 설정에서 비동기 실행을 허용하지 않으면 Superset 이 동기 결과를 바로 돌려줌)
+- 모든 요청에 (연결, 응답) 타임아웃, 폴링에는 전체 대기 한도 적용 (초과 시 쿼리 중지 요청)
+base_url 등을 생성자로 받으므로 로컬 스텁 HTTP 서버로 바꿔 끼워 확인할 수 있습니다.
+"""
+import base64
+import json
+import secrets
+import string
+import threading
+import time
+
 import requests
 from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+TOKEN_REFRESH_MARGIN = 60       # 만료 이 시간(초) 전에 미리 재로그인
+TOKEN_DEFAULT_TTL = 10 * 60     # 만료 시각을 알 수 없는 토큰의 사용 시간
+FINISHED_STATES = ('success', 'failed', 'stopped', 'timed_out')
+
+
+class SupersetError(Exception):
+    """Superset 호출 실패 (로그인/실행/타임아웃)"""
+
+
+def _token_expiry(token):
+    """JWT 의 exp(만료 시각)를 읽습니다. 읽을 수 없으면 기본 사용 시간 적용"""
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))['exp'])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return time.time() + TOKEN_DEFAULT_TTL
+
+
+def _client_id():
+    """SQL Lab 쿼리 식별자 (Superset 규칙: 11자)"""
+    return ''.join(secrets.choice(string.ascii_letters + string.digits) for _ in range(11))
+
+
+class SupersetClient:
+    def __init__(self, base_url, username, password, provider='db', connect_timeout=5, read_timeout=60,
+                 poll_interval=0.5, poll_timeout=300, pool_size=10):
+        self.base_url = base_url.rstrip('/')
+        self.username = username
+        self.password = password
+        self.provider = provider
+        self.timeout = (connect_timeout, read_timeout)
+        self.poll_interval = poll_interval
+        self.poll_timeout = poll_timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._token = None
+        self._token_expires = 0.0
+        self._token_lock = threading.Lock()
+
+    # ------------------------------------------
+    # 인증
+    # ------------------------------------------
+    def access_token(self, refresh=False):
+        """캐시된 토큰 반환 (없거나 만료 임박/refresh 이면 로그인, 동시 호출 시 로그인 1회)"""
+        stale = self._token
+        with self._token_lock:
+            if refresh and self._token == stale:
+                self._token = None
+            if self._token and time.time() < self._token_expires - TOKEN_REFRESH_MARGIN:
+                return self._token
+            try:
+                response = self.session.post(
+                    f"{self.base_url}/api/v1/security/login",
+                    json={'username': self.username, 'password': self.password, 'provider': self.provider},
+                    timeout=self.timeout,
+                )
+                response.raise_for_status()
+                token = response.json().get('access_token')
+            except (requests.RequestException, ValueError) as e:
+                raise SupersetError(f"Superset 로그인 실패: {e}") from e
+            if not token:
+                raise SupersetError("Superset 로그인 응답에 토큰이 없습니다.")
+            self._token, self._token_expires = token, _token_expiry(token)
+            return token
+
+    def _request(self, method, path, **kwargs):
+        """인증 헤더를 붙여 호출 (401 이면 재로그인 후 1회 재시도)"""
+        for attempt in (1, 2):
+            token = self.access_token(refresh=attempt == 2)
+            try:
+                response = self.session.request(
+                    method, f"{self.base_url}{path}",
+                    headers={'Authorization': f"Bearer {token}"}, timeout=self.timeout, **kwargs,
+                )
+            except requests.RequestException as e:
+                raise SupersetError(f"Superset 호출 실패: {e}") from e
+            if response.status_code != 401:
+                break
+        if response.status_code >= 400:
+            raise SupersetError(f"Superset 오류 ({response.status_code}): {response.text[:500]}")
+        try:
+            return response.status_code, response.json()
+        except ValueError as e:
+            raise SupersetError("Superset 응답을 해석할 수 없습니다.") from e
+
+    # ------------------------------------------
+    # SQL 실행
+    # ------------------------------------------
+    def submit(self, sql, database_id, run_async=True, schema=None):
+        """
+        SQL 을 제출합니다.
+        반환: ('done', 결과) - 동기 실행된 경우 / ('pending', 쿼리 정보) - 비동기 실행 중
+        쿼리 정보: {'query_id', 'client_id'}
+        """
+        client_id = _client_id()
+        payload = {'database_id': database_id, 'sql': sql, 'runAsync': run_async, 'json': True, 'client_id': client_id}
+        if schema:
+            payload['schema'] = schema
+        status_code, body = self._request('POST', '/api/v1/sqllab/execute/', json=payload)
+        if status_code == 202:  # 비동기 실행 접수
+            query = body.get('query') or {}
+            return 'pending', {'query_id': query.get('queryId'), 'client_id': client_id}
+        return 'done', body
+
+    def poll(self, query_id):
+        """
+        비동기 쿼리 상태를 1회 확인합니다.
+        반환: ('pending', None) / ('done', 결과)
+        """
+        _, body = self._request('GET', f"/api/v1/query/{query_id}")
+        query = body.get('result') or {}
+        state = query.get('status')
+        if state not in FINISHED_STATES:
+            return 'pending', None
+        if state != 'success':
+            raise SupersetError(query.get('error_message') or f"쿼리가 {state} 상태로 종료되었습니다.")
+        # 결과 키로 결과 조회 (rison: (key:'...'))
+        _, result = self._request('GET', '/api/v1/sqllab/results/', params={'q': f"(key:'{query.get('results_key')}')"})
+        return 'done', result
+
+    def stop(self, client_id):
+        try:
+            self._request('POST', '/api/v1/query/stop', json={'client_id': client_id})
+        except SupersetError as e:
+            print(f"Superset 쿼리 중지 실패: {e}")
+
+    def execute(self, sql, database_id, run_async=True, schema=None):
+        """SQL 을 실행하고 결과를 반환합니다. (비동기면 poll_timeout 까지 폴링)"""
+        state, result = self.submit(sql, database_id, run_async=run_async, schema=schema)
+        if state == 'done':
+            return result
+        deadline = time.monotonic() + self.poll_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            state, body = self.poll(result['query_id'])
+            if state == 'done':
+                return body
+        self.stop(result['client_id'])
+        raise SupersetError(f"쿼리 대기 시간({self.poll_timeout}초)을 초과했습니다.")
+
+
+# ==========================================
+# 프로세스 공용 클라이언트
+# ==========================================
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_superset_client():
+    """설정 기반 공용 클라이언트 (프로세스당 1개, 연결 풀/토큰 공유)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = SupersetClient(
+                    settings.SUPERSET_URL, settings.SUPERSET_USERNAME, settings.SUPERSET_PASSWORD,
+                    connect_timeout=settings.SUPERSET_CONNECT_TIMEOUT,
+                    read_timeout=settings.SUPERSET_READ_TIMEOUT,
+                    poll_timeout=settings.SUPERSET_POLL_TIMEOUT,
+                    pool_size=settings.SUPERSET_POOL_SIZE,
+                )
+    return _client
+
 
 def get_superset_access_token():
     """
-    Superset에 로그인하여 API 호출용 Access Token을 받아옵니다.
+    Superset API 호출용 Access Token (캐시된 토큰, 만료 임박 시에만 로그인)
     """
-    login_url = f"{settings.SUPERSET_URL}/api/v1/security/login"
-    
-    payload = {
-        "username": settings.SUPERSET_USERNAME,
-        "password": settings.SUPERSET_PASSWORD,
-        "provider": "db"
-    }
-    
     try:
-        response = requests.post(login_url, json=payload)
-        response.raise_for_status() # 200 OK가 아니면 에러 발생
-        
-        # 토큰 추출
-        token = response.json().get("access_token")
-        return token
-    except Exception as e:
+        return get_superset_client().access_token()
+    except SupersetError as e:
         print(f"Superset Login Failed: {e}")
         return None
 
+
 def execute_superset_sql(sql, database_id=1):
     """
     Superset의 SQLLab API를 호출하여 SQL을 실행하고 결과를 받아옵니다.
     database_id: Superset에 등록된 데이터베이스 ID (기본값 1)
+    실패 시 {"error": 메시지} 반환
     """
-    token = get_superset_access_token()
-    if not token:
-        return {"error": "Failed to get access token"}
-
-    execute_url = f"{settings.SUPERSET_URL}/api/v1/sqllab/execute/"
-    
-    headers = {
-        "Authorization": f"Bearer {token}", # 받아온 토큰을 헤더에 부착
-        "Content-Type": "application/json"
-    }
-    
-    payload = {
-        "database_id": database_id,
-        "sql": sql,
-        "runAsync": False, # 바로 결과를 받기 위해 동기 실행 (데이터가 크면 True로 하고 비동기 처리 필요)
-        "json": True,
-    }
-    
     try:
-        response = requests.post(execute_url, json=payload, headers=headers)
-        response.raise_for_status()
-        return response.json() # Superset이 준 결과(JSON) 그대로 반환
-    except Exception as e:
+        return get_superset_client().execute(sql, database_id, run_async=settings.SUPERSET_RUN_ASYNC)
+    except SupersetError as e:
         print(f"SQL Execution Failed: {e}")
-        # 에러 내용을 자세히 보기 위해 response text도 출력
-        if 'response' in locals():
-            print(response.text)
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
@@ -1,19 +1,44 @@
 import json
 import csv
 import io
+import uuid
 from django.contrib.auth.models import User
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, FileResponse, Http404, StreamingHttpResponse
 from django.views.decorators.http import require_POST
 from .models import (
     SurveyMaster, SurveyDesign, SurveyData, SurveyRoster, 
     SurveyQuestionnaire, QuestionnaireVersion, SurveyArea, SurveyAreaUser, SurveyAnalysis,
-    SurveyDegree
+    SurveyDegree, BackgroundJob, SurveyFlatTable
     )
-from django.db import transaction
+from django.db import DatabaseError, transaction
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.views.decorators.csrf import csrf_exempt
 from .superset_utils import execute_superset_sql
+from .jobs import enqueue_job, job_file_path, job_status
+from .access import get_user_access
+from .area_tree import get_area_tree, rebuild_area_paths, subtree_q
+from .auto_assign import auto_assign
+from .aggregation import AggregationError, aggregate_report, viewer_report
+from .pivot import iter_pivot_rows, iter_pivot_json, report_fields
+from .fastjson import FastJsonResponse
+from .design_store import assign_design, release_blob
+from .design_manifest import compile_manifest
+from .export import EXPORT_FORMATS, export_stream
+from .id_allocator import next_id
+from .flat_table import iter_flat_rows, mark_flat_table_stale, sync_flat_rows
+from .responses import upsert_response
+from .progress import lock_response_status, progress_rollup, record_status_change, recount_records
+from .sql_cache import mark_data_changed
+from .snapshots import record_data_change, snapshot_for_view
+from .conditional import (
+    analysis_list_etag, conditional_get, pivot_data_etag, questionnaire_versions_etag, roster_config_etag,
+    survey_data_etag, survey_data_last_modified, version_design_etag,
+)
+from .roster_search import apply_search, schedule_search_rebuild, search_index_outdated
+from .form_bundle import get_form_bundle, invalidate_roster_bundle, invalidate_survey_bundles
 
 
 # ==========================================
@@ -21,26 +46,23 @@ from .superset_utils import execute_superset_sql
 # ==========================================
 
 def is_admin(user):
-    """사용자가 관리자(슈퍼유저 또는 Manager 그룹)인지 확인"""
-    return user.is_superuser or user.groups.filter(name='Manager').exists()
+    """사용자가 관리자(슈퍼유저 또는 Manager 그룹)인지 확인 (권한 캐시 사용)"""
+    return get_user_access(user).is_admin
 
 def get_all_child_area_ids(area):
     """
-    특정 권역과 그 하부의 모든 권역 ID를 리스트로 반환 (재귀 호출)
+    특정 권역과 그 하부의 모든 권역 ID를 리스트로 반환
     A00을 넣으면 A01, A02, A11, A21... 등 모든 하위 ID를 반환합니다.
+    (조사별 권역 트리 캐시 사용 - 노드별 재귀 쿼리 없음)
     """
-    ids = [area.id]
-    # 모델 정의 시 related_name='children'을 사용했으므로 바로 접근 가능
-    for child in area.children.all():
-        ids.extend(get_all_child_area_ids(child))
-    return ids
+    return list(get_area_tree(area.survey_id).descendant_ids(area.id))
 
 # surveys/views.py 에 잠시 추가
+@user_passes_test(is_admin)
 def clear_roster_data(request, roster_id):
-    from .models import SurveyData
-    count = SurveyData.objects.filter(roster_id=roster_id).count()
-    SurveyData.objects.filter(roster_id=roster_id).delete()
-    return HttpResponse(f"{count}건의 데이터가 삭제되었습니다. 이제 다시 업로드하세요.")
+    """명부 수집 데이터 삭제 (백그라운드 작업으로 처리)"""
+    job = enqueue_job('clear_roster', {'roster_id': roster_id}, user=request.user)
+    return HttpResponse(f"삭제 작업이 등록되었습니다. (작업 ID: {job.id}, 진행 확인: /jobs/{job.id}/status/)")
 
 @user_passes_test(is_admin)
 def reset_all_survey_data(request, survey_id):  # survey_id 인자를 추가했습니다.
@@ -50,20 +72,11 @@ def reset_all_survey_data(request, survey_id):  # survey_id 인자를 추가했
     SurveyMaster 삭제 시 CASCADE 설정에 의해 관련 데이터(Degree, Roster, Data 등)가 함께 삭제됩니다.
     """
     if request.method == 'POST':
-        with transaction.atomic():
-            if str(survey_id) == '0':
-                # 모든 조사 삭제
-                count = SurveyMaster.objects.all().count()
-                SurveyMaster.objects.all().delete()
-                message = f"전체 초기화 성공: {count}건의 모든 조사 프로젝트가 삭제되었습니다."
-            else:
-                # 특정 조사 하나만 삭제
-                survey = get_object_or_404(SurveyMaster, pk=survey_id)
-                survey_name = survey.survey_name
-                survey.delete()
-                message = f"삭제 성공: 조사 '{survey_name}'(ID: {survey_id})와 관련 데이터가 삭제되었습니다."
-            
-        return HttpResponse(message)
+        if str(survey_id) != '0':
+            get_object_or_404(SurveyMaster, pk=survey_id)
+        # 대량 삭제는 요청 스레드에서 하지 않고 백그라운드 작업으로 처리
+        job = enqueue_job('reset_survey', {'survey_id': survey_id}, user=request.user)
+        return HttpResponse(f"삭제 작업이 등록되었습니다. (작업 ID: {job.id}, 진행 확인: /jobs/{job.id}/status/)")
     
     # GET 요청 시 확인 페이지 렌더링
     return render(request, 'surveys/confirm_reset.html', {'survey_id': survey_id})
@@ -76,9 +89,7 @@ def check_survey_manager_permission(user, survey):
     슈퍼유저는 무조건 통과.
     일반 유저는 해당 SurveyMaster의 managers에 포함되어 있어야 통과.
     """
-    if user.is_superuser:
-        return True
-    return survey.managers.filter(id=user.id).exists()
+    return get_user_access(user).can_manage_survey(survey.id)
 
 # ==========================================
 # [메인/목록] 대시보드 및 프로젝트 관리
@@ -127,6 +138,7 @@ def survey_field_design(request, survey_id):
         design.list_schema = data.get('list_schema', [])
         design.survey_schema = data.get('survey_schema', [])
         design.save()
+        mark_flat_table_stale(survey.id)  # 명부 항목 컬럼 변경
         return JsonResponse({'status': 'success'})
     return render(request, 'surveys/field_design.html', {
         'survey': survey, 
@@ -144,10 +156,8 @@ def survey_roster_design(request, survey_id):
     design = get_object_or_404(SurveyDesign, survey=survey)
     if request.method == 'POST':
         data = json.loads(request.body)
-        last_roster = SurveyRoster.objects.all().order_by('id').last()
-        next_num = int(last_roster.roster_code[1:]) + 1 if last_roster and last_roster.roster_code else 1
         SurveyRoster.objects.create(
-            survey=survey, roster_code=f"N{next_num:05d}", roster_name=data.get('roster_name'),
+            survey=survey, roster_code=next_id('roster'), roster_name=data.get('roster_name'),
             parent_roster_id=data.get('parent_id') or None
         )
         return JsonResponse({'status': 'success'})
@@ -156,6 +166,7 @@ def survey_roster_design(request, survey_id):
     })
 
 @user_passes_test(is_admin)
+@conditional_get(etag_func=roster_config_etag)
 def get_roster_config(request, roster_id):
     """명부의 맵핑 설정(목록 노출 여부 등) 조회"""
     roster = get_object_or_404(SurveyRoster, pk=roster_id)
@@ -168,6 +179,9 @@ def save_roster_config(request, roster_id):
     if request.method == 'POST':
         roster.mapping_config = json.loads(request.body).get('mapping_config', [])
         roster.save()
+        # 검색 항목 구성이 바뀌었으면 검색 색인 재생성 작업 등록
+        if search_index_outdated(roster):
+            schedule_search_rebuild(roster, user=request.user)
         return JsonResponse({'status': 'success'})
 
 @user_passes_test(is_admin)
@@ -196,35 +210,23 @@ def import_roster_csv(request, survey_id):
             return JsonResponse({'status': 'error', 'message': '명부를 먼저 등록하세요.'}, status=400)
         
         try:
-            with transaction.atomic(): # 대량 입력을 위한 트랜잭션 처리
-                # 최신 레코드 ID 조회 및 숫자 추출
-                last_record = SurveyData.objects.all().order_by('id').last()
-                if last_record and last_record.respondent_id.isdigit():
-                    next_rec_num = int(last_record.respondent_id) + 1
-                else:
-                    next_rec_num = 1
-                
-                decoded_file = request.FILES['csv_file'].read().decode('utf-8-sig').splitlines()
-                reader = csv.DictReader(decoded_file)
-                
-                for row in reader:
-                    # CSV의 '권역코드' 컬럼과 조사 내 권역 매칭
-                    area_val = row.get('권역코드')
-                    area_obj = SurveyArea.objects.filter(survey=survey, area_code=area_val).first()
-                    
-                    # 명부 항목 설계에 따른 데이터 매핑
-                    list_values = {item['id']: row.get(item['label'], '') for item in design.list_schema}
-                    
-                    SurveyData.objects.create(
-                        roster=roster,
-                        area=area_obj, 
-                        respondent_id=f"{next_rec_num:08d}",
-                        list_values=list_values,
-                        status='READY'          
-                    )
-                    next_rec_num += 1
-                    
-            return JsonResponse({'status': 'success', 'message': '임포트가 완료되었습니다.'})
+            # 업로드 파일을 작업 디렉터리에 저장한 뒤 백그라운드 작업으로 적재
+            chunk_size = int(request.POST.get('chunk_size') or 0) or None
+            file_path = job_file_path(f"roster_{survey.id}_{uuid.uuid4().hex}.csv")
+            with open(file_path, 'wb') as f:
+                for chunk in request.FILES['csv_file'].chunks():
+                    f.write(chunk)
+
+            job = enqueue_job('import_roster', {
+                'survey_id': survey.id, 'roster_id': roster.id,
+                'file_path': str(file_path), 'chunk_size': chunk_size,
+            }, user=request.user)
+            return JsonResponse({
+                'status': 'success',
+                'message': '임포트 작업이 등록되었습니다.',
+                'job_id': job.id,
+                'status_url': f"/jobs/{job.id}/status/",
+            }, status=202)
             
         except Exception as e:
             return JsonResponse({'status': 'error', 'message': f'오류 발생: {str(e)}'}, status=500)
@@ -242,10 +244,8 @@ def survey_questionnaire_design(request, survey_id):
     design = get_object_or_404(SurveyDesign, survey=survey)
     if request.method == 'POST':
         data = json.loads(request.body)
-        last_form = SurveyQuestionnaire.objects.all().order_by('id').last()
-        next_num = int(last_form.form_id[1:]) + 1 if last_form and last_form.form_id.startswith('S') else 1
         SurveyQuestionnaire.objects.create(
-            roster_id=data.get('roster_id'), form_id=f"S{next_num:05d}", form_name=data.get('form_name')
+            roster_id=data.get('roster_id'), form_id=next_id('form'), form_name=data.get('form_name')
         )
         return JsonResponse({'status': 'success'})
     return render(request, 'surveys/questionnaire_design.html', {
@@ -253,16 +253,27 @@ def survey_questionnaire_design(request, survey_id):
     })
 
 @user_passes_test(is_admin)
+@conditional_get(etag_func=questionnaire_versions_etag)
 def get_questionnaire_versions(request, q_id):
-    """특정 조사표의 전체 버전 목록 조회"""
-    versions = QuestionnaireVersion.objects.filter(questionnaire_id=q_id).order_by('-version_number')
+    """특정 조사표의 전체 버전 목록 조회 (설계 데이터는 get_questionnaire_version_design 으로 따로 조회)"""
+    versions = QuestionnaireVersion.objects.filter(questionnaire_id=q_id).defer('manifest').order_by('-version_number')
     data = [{
         'id': v.id, 'version_number': v.version_number,
         'created_at': v.created_at.strftime('%Y-%m-%d %H:%M'),
-        'item_count': len(v.design_data), 'is_confirmed': v.is_confirmed,
-        'design_data': v.design_data
+        'item_count': v.item_count, 'is_confirmed': v.is_confirmed,
     } for v in versions]
-    return JsonResponse(data, safe=False)
+    return FastJsonResponse(data, safe=False)
+
+
+@user_passes_test(is_admin)
+@conditional_get(etag_func=version_design_etag)
+def get_questionnaire_version_design(request, v_id):
+    """[추가] 조사표 버전 1건의 설계 데이터 조회 (작업대에서 버전을 열 때)"""
+    version = get_object_or_404(QuestionnaireVersion.objects.defer('manifest'), pk=v_id)
+    return FastJsonResponse({
+        'id': version.id, 'version_number': version.version_number,
+        'is_confirmed': version.is_confirmed, 'design_data': version.design_data,
+    })
 
 
 @user_passes_test(is_admin) # [수정] 관리자 권한 체크 추가
@@ -289,13 +300,14 @@ def save_questionnaire_design(request, q_id):
                     
                     new_version_num = (last_version.version_number + 1) if last_version else 1
                     
-                    version_obj = QuestionnaireVersion.objects.create(
+                    version_obj = QuestionnaireVersion(
                         questionnaire=questionnaire,
                         version_number=new_version_num,
-                        design_data=design_items,
-                        item_count=len(design_items),
                         is_confirmed=False
                     )
+                    # [수정] 설계는 블롭으로 저장 (직전 버전 대비 델타, 같은 설계면 블롭 공유)
+                    assign_design(version_obj, design_items, last_version.design_blob_id if last_version else None)
+                    version_obj.save()
                     msg = f"새로운 버전 V{new_version_num}이(가) 저장되었습니다."
                 else:
                     # [기존 버전 덮어쓰기 로직]
@@ -304,11 +316,25 @@ def save_questionnaire_design(request, q_id):
                     if version_obj.is_confirmed:
                         return JsonResponse({'status': 'error', 'message': '확정된 버전은 수정할 수 없습니다. 신규 버전으로 저장하세요.'}, status=400)
                     
-                    version_obj.design_data = design_items
-                    version_obj.item_count = len(design_items)
+                    # [수정] 자동 저장: 내용이 같으면 쓰지 않고, 바뀌면 직전 버전 대비 델타로 저장
+                    previous_blob_id = QuestionnaireVersion.objects.filter(
+                        questionnaire=questionnaire, version_number__lt=version_obj.version_number
+                    ).order_by('-version_number').values_list('design_blob_id', flat=True).first()
+                    old_blob_id = version_obj.design_blob_id
+                    if not assign_design(version_obj, design_items, previous_blob_id):
+                        return JsonResponse({
+                            'status': 'success',
+                            'version_id': version_obj.id,
+                            'version_number': version_obj.version_number,
+                            'message': f"버전 V{version_obj.version_number}의 변경사항이 없습니다."
+                        })
+                    version_obj.revision += 1
                     version_obj.save()
+                    release_blob(old_blob_id)
                     msg = f"버전 V{version_obj.version_number}의 수정사항이 저장되었습니다."
 
+                invalidate_roster_bundle(questionnaire.roster_id)
+
             return JsonResponse({
                 'status': 'success',
                 'version_id': version_obj.id,
@@ -327,14 +353,25 @@ def confirm_questionnaire_version(request, v_id):
     target = get_object_or_404(QuestionnaireVersion, pk=v_id)
     QuestionnaireVersion.objects.filter(questionnaire=target.questionnaire).update(is_confirmed=False)
     target.is_confirmed = True
+    # [추가] 설계 매니페스트 컴파일 (입력 저장/내검/평면 테이블은 매니페스트만 조회)
+    target.manifest = compile_manifest(target.design_data)
+    target.item_count = target.manifest['item_count']
     target.save()
+    invalidate_roster_bundle(target.questionnaire.roster_id)
+    mark_flat_table_stale(target.questionnaire.roster.survey_id)
     return JsonResponse({'status': 'success'})
 
 @user_passes_test(is_admin)
 def delete_questionnaire(request, q_id):
     """조사표 삭제"""
     questionnaire = get_object_or_404(SurveyQuestionnaire, pk=q_id)
-    questionnaire.delete() # Cascade 설정으로 인해 버전들도 함께 삭제됨
+    blob_ids = set(questionnaire.versions.values_list('design_blob_id', flat=True))
+    with transaction.atomic():
+        questionnaire.delete() # Cascade 설정으로 인해 버전들도 함께 삭제됨
+        for blob_id in blob_ids:  # [추가] 다른 버전이 쓰지 않는 설계 블롭 정리
+            release_blob(blob_id)
+    invalidate_roster_bundle(questionnaire.roster_id)
+    mark_flat_table_stale(questionnaire.roster.survey_id)
     return JsonResponse({'status': 'success', 'message': '조사표와 모든 버전이 삭제되었습니다.'})
 
 # ==========================================
@@ -354,23 +391,40 @@ def survey_area_design(request, survey_id):
                 # 기존 권역 정보 초기화 (재설계 시)
                 SurveyArea.objects.filter(survey=survey).delete()
                 
-                # 트리 구조 저장을 위한 매핑 (임시 ID -> 실제 DB ID)
+                # 트리 구조 저장을 위한 매핑 (임시 ID -> 실제 DB 객체)
                 id_map = {}
-                
-                # 레벨 순서대로 저장하기 위해 정렬 필요 (또는 프론트에서 트리 순서대로 전송)
+                items = {item.get('temp_id'): item for item in areas_data}
+
+                # [수정] 트리 깊이별로 묶어 일괄 저장 (부모가 먼저 저장되어야 ID 를 참조할 수 있음)
+                def depth(item):
+                    seen = set()
+                    while item.get('parent_temp_id') in items and item.get('temp_id') not in seen:
+                        seen.add(item.get('temp_id'))
+                        item = items[item['parent_temp_id']]
+                    return len(seen)
+
+                by_depth = {}
                 for item in areas_data:
-                    parent_obj = id_map.get(item.get('parent_temp_id'))
-                    
-                    area = SurveyArea.objects.create(
-                        survey=survey,
-                        parent=parent_obj,
-                        area_code=item.get('code'),
-                        area_name=item.get('name'),
-                        level=item.get('level')
-                    )
+                    by_depth.setdefault(depth(item), []).append(item)
+
+                for d in sorted(by_depth):
+                    batch = by_depth[d]
+                    created = SurveyArea.objects.bulk_create([
+                        SurveyArea(
+                            survey=survey,
+                            parent=id_map.get(item.get('parent_temp_id')),
+                            area_code=item.get('code'),
+                            area_name=item.get('name'),
+                            level=item.get('level')
+                        )
+                        for item in batch
+                    ])
                     # 프론트엔드에서 준 임시 ID를 키로 실제 생성된 객체 저장
-                    id_map[item.get('temp_id')] = area
-                
+                    for item, area in zip(batch, created):
+                        id_map[item.get('temp_id')] = area
+
+                # 구체화 경로 일괄 계산 + 권역 트리 캐시 무효화
+                rebuild_area_paths(survey.id)
                 return JsonResponse({'status': 'success'})
         except Exception as e:
             return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
@@ -391,17 +445,67 @@ def assign_records(request):
             user_id = data.get('user_id')
             record_ids = data.get('record_ids', [])
 
-            if not user_id: # 배정 취소
-                SurveyData.objects.filter(id__in=record_ids).update(assigned_user=None)
-            else:
-                target_user = get_object_or_404(User, pk=user_id)
-                SurveyData.objects.filter(id__in=record_ids).update(assigned_user=target_user)
-            
+            with transaction.atomic():
+                if not user_id: # 배정 취소
+                    SurveyData.objects.filter(id__in=record_ids).update(assigned_user=None)
+                else:
+                    target_user = get_object_or_404(User, pk=user_id)
+                    SurveyData.objects.filter(id__in=record_ids).update(assigned_user=target_user)
+                # 배정이 바뀐 권역의 진행 현황 카운터 재계산
+                for survey_id in recount_records(record_ids):
+                    record_data_change(survey_id, len(record_ids))
+                # 평면 테이블의 조사원 컬럼 반영 (응답 행)
+                for survey_id in set(SurveyData.objects.filter(id__in=record_ids).values_list('roster__survey_id', flat=True)):
+                    sync_flat_rows(survey_id, record_ids)
+                mark_data_changed()
+
             return JsonResponse({'status': 'success'})
         except Exception as e:
             return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
     return JsonResponse({'status': 'error', 'message': 'Invalid Method'}, status=405)
 
+# [추가] 업무량 자동 배정 (권역별 균등 배분, 미리보기/실행)
+@login_required
+@require_POST
+def auto_assign_records(request, survey_id):
+    """
+    관할 권역의 미배정 명부를 권역별 조사원에게 균등 배분합니다.
+    요청: {dry_run: true/false, weight_field: '항목ID'(선택), roster_id: N(선택)}
+    """
+    survey = get_object_or_404(SurveyMaster, pk=survey_id)
+    scope = request.access.area_scope(survey.id)
+    if not request.user.is_superuser and not (scope and scope.is_manager):
+        return JsonResponse({'status': 'error', 'message': '권역 관리 권한이 없습니다.'}, status=403)
+
+    try:
+        data = json.loads(request.body or '{}')
+        roster_id = data.get('roster_id') or None
+        if roster_id and not SurveyRoster.objects.filter(pk=roster_id, survey=survey).exists():
+            return JsonResponse({'status': 'error', 'message': '명부를 찾을 수 없습니다.'}, status=404)
+
+        result = auto_assign(
+            survey,
+            root_area=None if request.user.is_superuser else scope.area,
+            roster_id=roster_id,
+            weight_field=(data.get('weight_field') or '').strip() or None,
+            dry_run=data.get('dry_run', True) is not False,
+        )
+
+        # 화면 표시용 권역명/조사원명
+        tree = get_area_tree(survey)
+        user_ids = {s['user_id'] for area in result['areas'] for s in area['surveyors']}
+        usernames = dict(User.objects.filter(id__in=user_ids).values_list('id', 'username'))
+        for area in result['areas'] + result['unassignable']:
+            node = tree.get(area['area_id'])
+            area['area_code'] = node.area_code if node else ''
+            area['area_name'] = node.area_name if node else ''
+            for s in area.get('surveyors', []):
+                s['username'] = usernames.get(s['user_id'], '')
+        return JsonResponse({'status': 'success', **result})
+    except Exception as e:
+        print(f"자동 배정 오류: {e}")
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+
 def survey_assignment(request, survey_id):
     """
     [4단계: 업무량 배정] 통합 뷰
@@ -409,8 +513,8 @@ def survey_assignment(request, survey_id):
     survey = get_object_or_404(SurveyMaster, pk=survey_id)
     user = request.user
 
-    # 1. 접속한 관리자의 권할 권역 파악
-    admin_mapping = SurveyAreaUser.objects.filter(survey=survey, user=user).select_related('area').first()
+    # 1. 접속한 관리자의 권할 권역 파악 (권한 캐시)
+    admin_mapping = request.access.area_scope(survey.id)
     
     if not user.is_superuser and not admin_mapping:
         return HttpResponse("권역 관리 권한이 없습니다.", status=403)
@@ -419,10 +523,7 @@ def survey_assignment(request, survey_id):
     if user.is_superuser:
         managed_areas = SurveyArea.objects.filter(survey=survey)
     else:
-        managed_areas = SurveyArea.objects.filter(
-            survey=survey, 
-            area_code__startswith=admin_mapping.area.area_code
-        )
+        managed_areas = SurveyArea.objects.filter(subtree_q(admin_mapping.area, None), survey=survey)
     
     managed_area_ids = managed_areas.values_list('id', flat=True)
 
@@ -494,6 +595,9 @@ def survey_assignment(request, survey_id):
         'data_records': data_records,
         'surveyors': sub_surveyors,
         'user_area': admin_mapping.area if admin_mapping else None,
+        # [추가] 자동 배정: 대상 명부 / 업무량 기준 항목 선택용
+        'rosters': survey.rosters.all(),
+        'list_fields': [f for f in getattr(getattr(survey, 'design', None), 'list_schema', None) or [] if f.get('id') != 'area_code'],
         # 검색 상태 유지를 위해 다시 전달
         'search_surveyor': search_surveyor,
         'assignment_filter': assignment_filter
@@ -520,6 +624,36 @@ def remove_survey_assignment(request, survey_id):
             return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
     return JsonResponse({'status': 'error', 'message': 'Invalid Method'}, status=405)
 
+# [추가] 진행 현황 (권역 트리 롤업 + 조사원별)
+@login_required
+def survey_progress(request, survey_id):
+    """
+    [API] 차수별 진행 현황 (READY/ING/DONE...)을 권역 트리(하위 합계 포함)와 조사원별로 반환
+    - 진행 현황 카운터 조회 1회 + 캐시된 권역 트리로 롤업 (수집 데이터 전체 집계 없음)
+    - ?degree_id= 생략 시 활성 차수
+    """
+    survey = get_object_or_404(SurveyMaster, pk=survey_id)
+    scope = request.access.area_scope(survey.id)
+    if not request.user.is_superuser and not (scope and scope.is_manager):
+        return JsonResponse({'status': 'error', 'message': '권역 관리 권한이 없습니다.'}, status=403)
+
+    degree_id = request.GET.get('degree_id')
+    if degree_id:
+        degree = get_object_or_404(SurveyDegree, pk=degree_id, survey=survey) if degree_id.isdigit() else None
+    else:
+        degree = get_current_degree(survey)
+    if degree is None:
+        return JsonResponse({'status': 'error', 'message': '차수 정보가 없습니다.'}, status=400)
+
+    root = None if request.user.is_superuser else scope.area
+    result = progress_rollup(survey.id, degree.id, get_area_tree(survey), root=root)
+    usernames = dict(User.objects.filter(
+        id__in=[s['user_id'] for s in result['surveyors']]
+    ).values_list('id', 'username'))
+    for s in result['surveyors']:
+        s['username'] = usernames.get(s['user_id'], '')
+    return JsonResponse({'status': 'success', 'degree_id': degree.id, **result})
+
 # ==========================================
 # [5단계: 내검규칙] 내검규칙설계
 # ==========================================        
@@ -530,12 +664,13 @@ def survey_edit_rule_design(request, survey_id):
     design = get_object_or_404(SurveyDesign, survey=survey)
     
     # [수정] 해당 조사(Master) -> 명부(Roster) -> 조사표(Questionnaire)를 모두 가져옵니다.
-    questionnaires = SurveyQuestionnaire.objects.filter(roster__survey=survey)
+    questionnaires = SurveyQuestionnaire.objects.filter(roster__survey=survey).only('id', 'form_id', 'form_name')
     
     if request.method == 'POST':
         data = json.loads(request.body)
         design.edit_rules = data.get('edit_rules', [])
         design.save()
+        invalidate_survey_bundles(survey.id)
         return JsonResponse({'status': 'success', 'message': '내검 규칙이 저장되었습니다.'})
 
     return render(request, 'surveys/edit_rule_design.html', {
@@ -582,85 +717,103 @@ def collection_degree_list(request, survey_id):
         'rosters': rosters
     })
 
-# surveys/views.py
+ROSTER_PAGE_SIZE = 100
+ROSTER_MAX_PAGE_SIZE = 500
+
+def _roster_list_queryset(request, roster, degree, mapping):
+    """
+    명부 리스트 조회 조건을 SQL 로 구성합니다. (화면/JSON API 공용)
+    - 원본 명부(degree 없음) 기준, 현재 차수 응답 상태는 서브쿼리로 주입(status_display)
+    - 권역 범위/계층 권역 검색/검색 필드/상태 필터 모두 DB 에서 처리
+    """
+    user = request.user
+    config = roster.mapping_config if isinstance(roster.mapping_config, list) else []
+
+    # [Transaction] 현재 차수의 응답 상태 (없으면 'READY')
+    response_status = SurveyData.objects.filter(
+        roster=roster, degree=degree, respondent_id=OuterRef('respondent_id')
+    ).values('status')[:1]
+
+    # [Master] 원본 명부 데이터 (degree 가 없는 것)
+    master_list = SurveyData.objects.filter(
+        roster=roster,
+        degree__isnull=True
+    ).annotate(
+        status_display=Coalesce(Subquery(response_status), Value('READY'))
+    )
+
+    # 권역 필터링 (원본 명부 기준)
+    if not user.is_superuser:
+        master_list = master_list.filter(subtree_q(mapping.area))
+        if not mapping.is_manager:
+            master_list = master_list.filter(assigned_user=user)
+
+    # 검색 파라미터 처리 (계층형 권역 검색)
+    sel_lv1 = request.GET.get('sel_lv1', '')
+    sel_lv2 = request.GET.get('sel_lv2', '')
+    sel_lv3 = request.GET.get('sel_lv3', '')
+
+    if sel_lv3:
+        master_list = master_list.filter(area_id=sel_lv3)
+    elif sel_lv2 or sel_lv1:
+        # 선택 권역의 하위 범위 (권역 트리 캐시 조회 후 path 접두어로 필터)
+        target_id = sel_lv2 or sel_lv1
+        target_area = get_area_tree(roster.survey_id).get(int(target_id)) if target_id.isdigit() else None
+        if target_area is None:
+            raise Http404("권역을 찾을 수 없습니다.")
+        master_list = master_list.filter(subtree_q(target_area))
+
+    # 일반 검색 필드 처리 (이름, 주소 등) - search_mode: contains(부분일치, 기본) / prefix / exact
+    search_fields = [c for c in config if c.get('is_search') and c.get('id') != 'area_code']
+    search_mode = request.GET.get('search_mode', 'contains')
+    for field in search_fields:
+        val = request.GET.get(field['id'])
+        if val:
+            master_list = apply_search(master_list, roster, field['id'], val, search_mode)
+
+    # 진행상태 필터 (READY / ING / DONE)
+    status = request.GET.get('status', '')
+    if status:
+        master_list = master_list.filter(status_display=status)
+
+    return master_list, config, search_fields
 
 @login_required
 def roster_data_view(request, roster_id, degree_id):
     """
     [화면] 명부 리스트 조회 (Master-Detail 구조 적용)
     1. DB에서는 '차수가 없는(Null)' 원본 명부를 가져옵니다.
-    2. '현재 차수(degree_id)'에 해당하는 응답 데이터가 있는지 확인하여 상태(status)를 매핑합니다.
+    2. '현재 차수(degree_id)'에 해당하는 응답 데이터 상태(status)를 서브쿼리로 함께 조회합니다.
+    3. 첫 페이지만 렌더링하고, 이후 페이지는 roster_data_api(키셋 페이지네이션)로 불러옵니다.
     """
     roster = get_object_or_404(SurveyRoster, pk=roster_id)
     degree = get_object_or_404(SurveyDegree, pk=degree_id)
     survey = roster.survey
     user = request.user
     
-    # 1. 권한 체크 (사용자의 권역 배정 확인)
-    mapping = SurveyAreaUser.objects.filter(survey=survey, user=user).select_related('area').first()
+    # 1. 권한 체크 (사용자의 권역 배정 확인 - 권한 캐시)
+    mapping = request.access.area_scope(survey.id)
     if not user.is_superuser and not mapping:
         return HttpResponse("이 조사에 대한 권역 배정 정보가 없습니다.", status=403)
 
-    # 2. 명부 설계 설정 로드
-    config = roster.mapping_config if isinstance(roster.mapping_config, list) else []
+    # 2. 명부 설계 설정 및 조회 조건 (SQL)
+    master_list, config, search_fields = _roster_list_queryset(request, roster, degree, mapping)
     is_area_design_exists = any(c.get('id') == 'area_code' for c in config)
 
-    # 3. [Master] 원본 명부 데이터 가져오기 (degree가 없는 것)
-    master_list = SurveyData.objects.filter(
-        roster=roster, 
-        degree__isnull=True 
-    ).select_related('area', 'assigned_user').order_by('id')
-
-    # 4. [Transaction] 현재 차수의 응답 데이터 상태 조회 (최적화)
-    #    (현재 차수에 이미 저장된 데이터들의 상태를 딕셔너리로 가져옴)
-    response_status_map = {}
-    responses = SurveyData.objects.filter(roster=roster, degree=degree).values('respondent_id', 'status')
-    for res in responses:
-        response_status_map[res['respondent_id']] = res['status']
-
-    # 5. 권역 필터링 (원본 명부 기준)
     if user.is_superuser:
-        base_area_code = ""
         user_level = 0
     else:
-        base_area_code = mapping.area.area_code
         user_level = mapping.area.level
-        master_list = master_list.filter(area__area_code__startswith=base_area_code)
-        if not mapping.is_manager:
-             master_list = master_list.filter(assigned_user=user)
 
-    # 6. 검색 파라미터 처리 (계층형 권역 검색)
-    sel_lv1 = request.GET.get('sel_lv1', '')
-    sel_lv2 = request.GET.get('sel_lv2', '')
-    sel_lv3 = request.GET.get('sel_lv3', '')
+    # 3. 첫 페이지 (+1건으로 다음 페이지 존재 여부 확인)
+    page = list(master_list.select_related('area', 'assigned_user').order_by('id')[:ROSTER_PAGE_SIZE + 1])
+    has_more = len(page) > ROSTER_PAGE_SIZE
+    display_list = page[:ROSTER_PAGE_SIZE]
 
-    if sel_lv3: 
-        master_list = master_list.filter(area_id=sel_lv3)
-    elif sel_lv2: 
-        target_area = get_object_or_404(SurveyArea, pk=sel_lv2)
-        master_list = master_list.filter(area__area_code__startswith=target_area.area_code)
-    elif sel_lv1: 
-        target_area = get_object_or_404(SurveyArea, pk=sel_lv1)
-        master_list = master_list.filter(area__area_code__startswith=target_area.area_code)
-
-    # 7. 일반 검색 필드 처리 (이름, 주소 등)
-    search_fields = [c for c in config if c.get('is_search') and c.get('id') != 'area_code']
-    for field in search_fields:
-        val = request.GET.get(field['id'])
-        if val:
-             master_list = master_list.filter(list_values__contains={field['id']: val})
-
-    # 8. [Display Logic] 리스트 데이터 가공 (상태값 주입)
-    #    QuerySet은 순회가 시작될 때 평가되므로, Python 리스트로 변환하며 속성 추가
-    display_list = []
-    for item in master_list:
-        # 이 사람의 현재 차수 상태가 있으면 그걸 쓰고, 없으면 'READY'
-        # (주의: 템플릿에서는 item.status_display 를 사용해야 함)
-        item.status_display = response_status_map.get(item.respondent_id, 'READY')
-        display_list.append(item)
-
-    # 9. 콤보박스용 데이터 준비
-    all_managed_areas = SurveyArea.objects.filter(survey=survey, area_code__startswith=base_area_code)
+    # 4. 콤보박스용 데이터 준비
+    all_managed_areas = SurveyArea.objects.filter(survey=survey)
+    if not user.is_superuser:
+        all_managed_areas = all_managed_areas.filter(subtree_q(mapping.area, None))
     
     context = {
         'roster': roster,
@@ -668,18 +821,95 @@ def roster_data_view(request, roster_id, degree_id):
         'degree': degree,  # [중요] 현재 차수 정보 전달
         'headers': [c for c in config if c.get('show_in_list')],
         'search_fields': search_fields,
-        'data_list': display_list, # 가공된 리스트 전달
+        'data_list': display_list, # 첫 페이지
+        'total_count': master_list.count(),
+        'next_cursor': display_list[-1].id if has_more else None,
         'user_area': mapping.area if mapping else None,
         'user_level': user_level,
         'is_area_design_exists': is_area_design_exists,
         'lv1_list': all_managed_areas.filter(level=1),
         'lv2_list': all_managed_areas.filter(level=2),
         'lv3_list': all_managed_areas.filter(level=3),
-        'sel_lv1': sel_lv1, 'sel_lv2': sel_lv2, 'sel_lv3': sel_lv3,
+        'sel_lv1': request.GET.get('sel_lv1', ''),
+        'sel_lv2': request.GET.get('sel_lv2', ''),
+        'sel_lv3': request.GET.get('sel_lv3', ''),
+        'sel_status': request.GET.get('status', ''),
+        'search_mode': request.GET.get('search_mode', 'contains'),
     }
     return render(request, 'surveys/data_entry_list.html', context)
 
 @login_required
+def roster_data_api(request, roster_id, degree_id):
+    """
+    [API] 명부 리스트 JSON (id 기준 키셋 페이지네이션)
+    - cursor: 이전 페이지의 next_cursor (마지막 id), page_size: 기본 100 / 1~500
+    - 필터 파라미터는 화면과 동일 (sel_lv1~3, 검색 필드, status)
+    - total 은 첫 페이지(cursor 없음)에서만 계산합니다.
+    """
+    roster = get_object_or_404(SurveyRoster, pk=roster_id)
+    degree = get_object_or_404(SurveyDegree, pk=degree_id)
+    user = request.user
+
+    mapping = request.access.area_scope(roster.survey_id)
+    if not user.is_superuser and not mapping:
+        return JsonResponse({'status': 'error', 'message': '이 조사에 대한 권역 배정 정보가 없습니다.'}, status=403)
+
+    try:
+        cursor = int(request.GET.get('cursor') or 0)
+        page_size = max(1, min(int(request.GET.get('page_size') or ROSTER_PAGE_SIZE), ROSTER_MAX_PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': '잘못된 페이지 파라미터입니다.'}, status=400)
+
+    master_list, config, _ = _roster_list_queryset(request, roster, degree, mapping)
+    header_ids = [c['id'] for c in config if c.get('show_in_list')]
+
+    total = master_list.count() if not cursor else None
+    if cursor:
+        master_list = master_list.filter(id__gt=cursor)
+
+    rows = list(master_list.order_by('id').values(
+        'id', 'respondent_id', 'list_values', 'status_display',
+        'area__area_name', 'area__area_code', 'assigned_user__username',
+    )[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    return JsonResponse({
+        'status': 'success',
+        'total': total,
+        'has_more': has_more,
+        'next_cursor': rows[-1]['id'] if has_more else None,
+        'rows': [{
+            'id': r['id'],
+            'respondent_id': r['respondent_id'],
+            'area_name': r['area__area_name'],
+            'area_code': r['area__area_code'],
+            'assigned_user': r['assigned_user__username'],
+            'list_values': {h: (r['list_values'] or {}).get(h, '') for h in header_ids},
+            'status': r['status_display'],
+        } for r in rows],
+    })
+
+@user_passes_test(is_admin)
+def export_roster_data(request, roster_id, degree_id):
+    """
+    [다운로드] 명부/차수 수집 자료 내보내기 (스트리밍)
+    format: csv(기본) / csv.gz / jsonl / columnar(Parquet, pyarrow 미설치 시 컬럼 chunk JSONL.gz)
+    """
+    roster = get_object_or_404(SurveyRoster, pk=roster_id)
+    degree = get_object_or_404(SurveyDegree, pk=degree_id)
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return JsonResponse({'status': 'error', 'message': f"지원하지 않는 형식입니다: {fmt}"}, status=400)
+
+    chunks, content_type, extension = export_stream(roster, degree, fmt)
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{roster.roster_code}_D{degree.degree_number}.{extension}"'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@login_required
+@conditional_get(etag_func=survey_data_etag, last_modified_func=survey_data_last_modified)
 def get_survey_data(request, data_id):
     """
     [API] 입력 팝업용 데이터 조회
@@ -692,7 +922,7 @@ def get_survey_data(request, data_id):
     if not degree_id:
         return JsonResponse({'status': 'error', 'message': '차수 정보가 누락되었습니다.'}, status=400)
 
-    master_record = get_object_or_404(SurveyData, pk=data_id)
+    master_record = get_object_or_404(SurveyData.objects.select_related('roster__survey'), pk=data_id)
     roster = master_record.roster
     survey_master = roster.survey
     degree = get_object_or_404(SurveyDegree, pk=degree_id)
@@ -709,35 +939,29 @@ def get_survey_data(request, data_id):
     current_values = response_record.survey_values if response_record else {}
     saved_warnings = current_values.get('_warnings', []) if isinstance(current_values, dict) else []
 
-    # 3. 조사표 설계 및 내검 규칙 로드
-    design = getattr(survey_master, 'design', None)
-    edit_rules = design.edit_rules if design else []
-    
-    questionnaires = roster.questionnaires.all()
-    if not questionnaires.exists():
-        return JsonResponse({'status': 'error', 'message': '연결된 조사표가 없습니다.'}, status=404)
+    # 3. 조사표 설계 및 내검 규칙 로드 (명부별 활성 번들 캐시)
+    bundle = get_form_bundle(roster)
+    edit_rules = bundle.edit_rules
 
     # 4. 조사표별 최신 확정 버전 구성
     survey_forms = []
-    for q in questionnaires:
-        v = q.versions.filter(is_confirmed=True).order_by('-version_number').first()
-        if v:
+    for form in bundle.forms:
+        survey_forms.append({
+            'q_id': form['q_id'],
+            'form_id': form['form_id'],
+            'ver_form_id': form['ver_form_id'],
+            'form_name': form['form_name'],
+            'design_data': form['design_data'],
             # 해당 버전의 저장된 값 추출 (없으면 빈 딕셔너리)
-            form_values = current_values.get(v.ver_form_id, {})
-            
-            survey_forms.append({
-                'q_id': q.id,
-                'form_id': q.form_id,
-                'ver_form_id': v.ver_form_id,
-                'form_name': q.form_name,
-                'design_data': v.design_data,
-                'saved_values': form_values
-            })
+            'saved_values': current_values.get(form['ver_form_id'], {})
+        })
 
     if not survey_forms:
+        if not roster.questionnaires.exists():
+            return JsonResponse({'status': 'error', 'message': '연결된 조사표가 없습니다.'}, status=404)
         return JsonResponse({'status': 'error', 'message': '확정된 조사표 버전이 없습니다.'}, status=404)
 
-    return JsonResponse({
+    return FastJsonResponse({
         'status': 'success',
         'roster_id': roster.roster_code,
         'respondent_id': master_record.respondent_id,
@@ -749,251 +973,6 @@ def get_survey_data(request, data_id):
         'saved_warnings': saved_warnings
     })
 
-def evaluate_edit_rule(condition, answers, design_data_map, target_form_id):
-    """
-    내검 규칙 조건식을 평가하는 함수
-    condition: 조건식 문자열 (예: "{q6}[0][q6_1] == '1'") - originId 사용 가능
-    answers: 저장할 답변 데이터 (예: {"S00001-V1": {"q6_1767248816834": [{"q6_1": "2"}]}})
-    design_data_map: {form_id: design_data} 맵핑
-    target_form_id: 대상 조사표 ID
-    """
-    import re
-    
-    # originId -> 실제 ID 매핑 생성
-    origin_id_to_real_id = {}
-    for form_id, design_data in design_data_map.items():
-        for item in design_data:
-            if item.get('originId'):
-                origin_id_to_real_id[item['originId']] = item.get('id')
-    
-    # 테이블 열 전체 참조 패턴: {table_id}[*][col] - 모든 행에 대한 검증
-    table_column_all_pattern = r'\{(\w+)\}\[\*\]\[(\w+)\]'
-    
-    def replace_table_column_all(match):
-        """열 전체 검증: 모든 행의 해당 열 값들을 리스트로 반환"""
-        table_id_or_origin, col_id = match.groups()
-        
-        
-        # originId인 경우 실제 ID로 변환
-        actual_table_id = origin_id_to_real_id.get(table_id_or_origin, table_id_or_origin)
-        
-        # 해당 조사표의 답변 데이터 찾기
-        for ver_form_id, form_data in answers.items():
-            if form_data.get(actual_table_id) is not None and isinstance(form_data[actual_table_id], list):
-                table_data = form_data[actual_table_id]
-                # 모든 행의 해당 열 값 추출
-                column_values = []
-                for row_idx, row in enumerate(table_data):
-                    if isinstance(row, dict):
-                        val = row.get(col_id, '')
-                        column_values.append(f"'{str(val)}'" if val != '' else "''")
-                
-                if column_values:
-                    # 리스트 형태로 반환 (함수에서 사용)
-                    result = f"[{', '.join(column_values)}]"
-                    return result
-        return "[]"
-    
-    # 테이블 열 전체 참조 치환 (먼저 처리)
-    condition = re.sub(table_column_all_pattern, replace_table_column_all, condition)
-    
-    # 테이블 셀 참조 패턴: {table_id}[row][col] - 특정 셀 검증
-    table_cell_pattern = r'\{(\w+)\}\[(\d+)\]\[(\w+)\]'
-    
-    # 먼저 테이블 셀 참조를 처리
-    def replace_table_cell(match):
-        table_id_or_origin, row_idx, col_id = match.groups()
-        row_idx = int(row_idx)
-        
-        # originId인 경우 실제 ID로 변환
-        actual_table_id = origin_id_to_real_id.get(table_id_or_origin, table_id_or_origin)
-        
-        # 해당 조사표의 답변 데이터 찾기
-        for ver_form_id, form_data in answers.items():
-            if form_data.get(actual_table_id) is not None and isinstance(form_data[actual_table_id], list):
-                table_data = form_data[actual_table_id]
-                if row_idx < len(table_data) and isinstance(table_data[row_idx], dict):
-                    cell_value = table_data[row_idx].get(col_id, '')
-                    # 문자열로 변환 (비교를 위해)
-                    return f"'{str(cell_value)}'" if cell_value != '' else "''"
-        return "''"
-    
-    # 테이블 셀 참조 치환
-    condition = re.sub(table_cell_pattern, replace_table_cell, condition)
-    
-    # 일반 필드 참조 패턴: {field_id} - originId 사용 가능
-    def replace_field_ref(match):
-        field_id_or_origin = match.group(1)
-        # originId인 경우 실제 ID로 변환
-        actual_field_id = origin_id_to_real_id.get(field_id_or_origin, field_id_or_origin)
-        
-        # 해당 조사표의 답변 데이터 찾기
-        for ver_form_id, form_data in answers.items():
-            if actual_field_id in form_data:
-                value = form_data[actual_field_id]
-                # 리스트나 딕셔너리는 문자열로 변환하지 않음 (테이블은 이미 처리됨)
-                if isinstance(value, (list, dict)):
-                    return "''"
-                return f"'{str(value)}'" if value != '' else "''"
-        return "''"
-    
-    # 일반 필드 참조 치환
-    pattern = r'\{(\w+)\}'
-    try:
-        evaluated_condition = re.sub(pattern, replace_field_ref, condition)
-        
-        # 열 전체 검증을 위한 헬퍼 함수 추가
-        def all_equal(values, target_value):
-            """리스트의 모든 값이 target_value와 같은지 확인"""
-            if not isinstance(values, list) or len(values) == 0:
-                return False
-            target_str = str(target_value).strip("'\"")
-            return all(str(v).strip("'\"") if v != "''" else '' == target_str for v in values)
-        
-        def all_not_empty(values):
-            """리스트의 모든 값이 비어있지 않은지 확인"""
-            # 디버깅: 값 타입 확인
-            
-            # 리스트가 아니면 False
-            if not isinstance(values, list):
-                return False
-            
-            # 빈 리스트면 False
-            if len(values) == 0:
-                return False
-            
-            # 각 값 확인
-            for v in values:
-                # v는 eval 후 실제 값 (문자열 '' 또는 다른 값)
-                # 빈 문자열이거나 None이면 비어있음
-                is_empty = (v == '' or v is None or str(v).strip() == '' or v == "''")
-                if is_empty:
-                    return False
-            
-            return True
-        
-        def has_empty(values):
-            """리스트에 빈 값이 하나라도 있는지 확인 (all_not_empty의 반대)"""
-            
-            # 리스트가 아니면 True (비어있다고 간주)
-            if not isinstance(values, list):
-                return True
-            
-            # 빈 리스트면 True (비어있다고 간주)
-            if len(values) == 0:
-                return True
-            
-            # 각 값 확인 - 하나라도 비어있으면 True
-            for v in values:
-                is_empty = (v == '' or v is None or str(v).strip() == '' or v == "''")
-                if is_empty:
-                    return True
-            
-            return False
-        
-        def any_equal(values, target_value):
-            """리스트의 값 중 하나라도 target_value와 같은지 확인"""
-            if not isinstance(values, list) or len(values) == 0:
-                return False
-            target_str = str(target_value).strip("'\"")
-            return any(str(v).strip("'\"") if v != "''" else '' == target_str for v in values)
-        
-        def _to_number(value):
-            """문자열을 숫자로 변환 (실패 시 None)"""
-            try:
-                val_str = str(value).strip("'\"")
-                if val_str == '' or val_str == "''":
-                    return None
-                # 정수 또는 실수로 변환 시도
-                if '.' in val_str:
-                    return float(val_str)
-                return int(val_str)
-            except:
-                return None
-        
-        def all_greater(values, target_value):
-            """리스트의 모든 값이 target_value보다 커야 함 (숫자 비교)"""
-            if not isinstance(values, list) or len(values) == 0:
-                return False
-            
-            # 빈 값이 하나라도 있으면 False (숫자 비교 불가)
-            for idx, v in enumerate(values):
-                if v == '' or v is None or str(v).strip() == '' or v == "''":
-                    return False
-            
-            target_num = _to_number(target_value)
-            if target_num is None:
-                return False
-            for idx, v in enumerate(values):
-                val_num = _to_number(v)
-                if val_num is None or val_num <= target_num:
-                    return False
-            return True
-        
-        def all_greater_equal(values, target_value):
-            """리스트의 모든 값이 target_value보다 크거나 같아야 함 (숫자 비교)"""
-            if not isinstance(values, list) or len(values) == 0:
-                return False
-            target_num = _to_number(target_value)
-            if target_num is None:
-                return False
-            for v in values:
-                val_num = _to_number(v)
-                if val_num is None or val_num < target_num:
-                    return False
-            return True
-        
-        def all_less(values, target_value):
-            """리스트의 모든 값이 target_value보다 작아야 함 (숫자 비교)"""
-            if not isinstance(values, list) or len(values) == 0:
-                return False
-            target_num = _to_number(target_value)
-            if target_num is None:
-                return False
-            for v in values:
-                val_num = _to_number(v)
-                if val_num is None or val_num >= target_num:
-                    return False
-            return True
-        
-        def all_less_equal(values, target_value):
-            """리스트의 모든 값이 target_value보다 작거나 같아야 함 (숫자 비교)"""
-            if not isinstance(values, list) or len(values) == 0:
-                return False
-            target_num = _to_number(target_value)
-            if target_num is None:
-                return False
-            for v in values:
-                val_num = _to_number(v)
-                if val_num is None or val_num > target_num:
-                    return False
-            return True
-        
-        
-        # 안전한 평가를 위해 제한된 환경에서만 실행
-        # 주의: eval 사용은 보안상 위험할 수 있으나, 내부 시스템이므로 허용
-        try:
-            result = eval(evaluated_condition, {
-                "__builtins__": {},
-                "all_equal": all_equal,
-                "all_not_empty": all_not_empty,
-                "has_empty": has_empty,
-                "any_equal": any_equal,
-                "all_greater": all_greater,
-                "all_greater_equal": all_greater_equal,
-                "all_less": all_less,
-                "all_less_equal": all_less_equal
-            }, {})
-            
-            return bool(result)
-        except Exception as eval_error:
-            import traceback
-            traceback.print_exc()
-            return False
-    except Exception as e:
-        # 조건식 평가 실패 시 False 반환 (검증 실패로 처리)
-        return False
-
 @login_required
 def save_survey_response(request, data_id):
     """
@@ -1010,9 +989,6 @@ def save_survey_response(request, data_id):
         degree = get_object_or_404(SurveyDegree, pk=degree_id)
         
         roster = master_record.roster
-        survey_master = roster.survey
-        design = getattr(survey_master, 'design', None)
-        edit_rules = design.edit_rules if design else []
         
         # 2. 클라이언트가 보낸 답변 데이터 파싱
         try:
@@ -1022,55 +998,8 @@ def save_survey_response(request, data_id):
         except json.JSONDecodeError:
             return JsonResponse({'status': 'error', 'message': '잘못된 JSON 형식입니다.'}, status=400)
 
-        # 3. 조사표 설계 데이터 맵핑
-        questionnaires = roster.questionnaires.all()
-        design_data_map = {}
-        for q in questionnaires:
-            v = q.versions.filter(is_confirmed=True).order_by('-version_number').first()
-            if v:
-                design_data_map[q.form_id] = v.design_data
-        
-        # 4. 내검 규칙 검증
-        errors = []
-        warnings = [] # 여기에 상세 객체를 담습니다.
-        
-        for rule in edit_rules:
-            target_form_id = rule.get('target_form_id', '')
-            form_answers = {}
-            
-            # 대상 조사표 데이터 추출
-            if target_form_id:
-                for ver_form_id, form_data in answers.items():
-                    form_id = ver_form_id.split('-')[0] if '-' in ver_form_id else ver_form_id
-                    if form_id == target_form_id or target_form_id in ver_form_id:
-                        form_answers[ver_form_id] = form_data
-            else:
-                form_answers = answers
-            
-            if not form_answers: continue
-            
-            condition = rule.get('condition', '')
-            if not condition: continue
-            
-            # 조건식 평가
-            condition_result = evaluate_edit_rule(condition, form_answers, design_data_map, target_form_id)
-            
-            if condition_result:
-                # [핵심 수정] 단순 문자열이 아니라, 상세 정보를 담은 딕셔너리 생성
-                violation_info = {
-                    'rule_id': rule.get('rule_id'),
-                    'message': rule.get('message', f"규칙 {rule.get('rule_id')} 위반"),
-                    'condition': condition,          # [필수] 이동을 위해 꼭 필요
-                    'target_field': rule.get('target_field'), # [필수] 이동을 위해 꼭 필요
-                    'severity': rule.get('severity', 'ERROR')
-                }
-
-                if violation_info['severity'] == 'ERROR':
-                    # 에러는 메시지만 있어도 됨 (저장 불가라 이동 불필요)
-                    errors.append(violation_info['message'])
-                else:
-                    # 경고는 이동 기능이 필요하므로 객체 전체 저장
-                    warnings.append(violation_info)
+        # 3. 내검 규칙 검증 (명부별 활성 번들에 컴파일된 규칙 세트가 캐시됨)
+        errors, warnings = get_form_bundle(roster).rule_set.evaluate(answers)
         
         # ERROR 발생 시 저장 중단
         if errors:
@@ -1094,21 +1023,9 @@ def save_survey_response(request, data_id):
                 'message': '경고가 있습니다. 저장하시겠습니까?'
             }, status=200)
         
-        # 5. [핵심] 차수별 데이터 저장 (Get or Create)
+        # 5. [핵심] 차수별 데이터 저장 (단일 upsert: INSERT ... ON CONFLICT DO UPDATE)
         try:
             with transaction.atomic():
-                response_record, created = SurveyData.objects.get_or_create(
-                    roster=roster,
-                    degree=degree,
-                    respondent_id=master_record.respondent_id,
-                    defaults={
-                        'area': master_record.area,
-                        'assigned_user': master_record.assigned_user,
-                        'list_values': master_record.list_values,
-                        'status': 'ING'
-                    }
-                )
-                
                 # [수정] WARNING 메타데이터 저장 시에도 condition 정보 포함!
                 # 이전에 이 부분이 {'message': ...} 만 저장해서 문제였음
                 answers_to_save = dict(answers)
@@ -1118,11 +1035,22 @@ def save_survey_response(request, data_id):
                     # 경고가 없으면 기존 경고 삭제
                     if '_warnings' in answers_to_save:
                         del answers_to_save['_warnings']
-
-                # 데이터 업데이트
-                response_record.survey_values = answers_to_save
-                response_record.status = 'ING'
-                response_record.save()
+                # 저장이 허용되었다는 것은 에러 위반이 없다는 의미 (일괄 재검증 결과 초기화)
+                answers_to_save.pop('_errors', None)
+
+                # 신규면 원본 명부 정보를 복사해 생성, 있으면 답변/상태만 갱신 (동시 저장에도 1건 유지)
+                previous_status = lock_response_status(master_record, degree)
+                response_id = upsert_response(master_record, degree, answers_to_save, status='ING')
+                # 진행 현황 카운터 증분 반영 (이전 상태 -1, 새 상태 +1)
+                record_status_change(roster.survey_id, master_record, degree, previous_status, 'ING')
+                record_data_change(roster.survey_id)  # 분석 스냅샷 갱신 판단용 변경 건수
+
+                # 분석용 평면 테이블 증분 반영 (실패해도 응답 저장은 유지, 재생성 시 복구됨)
+                try:
+                    with transaction.atomic():
+                        sync_flat_rows(roster.survey_id, [response_id])
+                except DatabaseError as e:
+                    print(f"분석 테이블 반영 실패: {str(e)}")
                 
             return JsonResponse({
                 'status': 'success',
@@ -1136,6 +1064,7 @@ def save_survey_response(request, data_id):
     return JsonResponse({'status': 'error', 'message': 'Invalid Method'}, status=405)
 
 # [화면] 7. 자료분석 페이지 (WebDataRocks를 띄울 껍데기)
+@login_required
 def collection_analysis_view(request, survey_id):
     survey = get_object_or_404(SurveyMaster, pk=survey_id)
     return render(request, 'surveys/collection_analysis.html', {
@@ -1143,38 +1072,82 @@ def collection_analysis_view(request, survey_id):
     })
 
 # [API] 피벗용 JSON 데이터 제공 (WebDataRocks가 이 데이터를 가져감)
+# 데이터 버전이 그대로면 304 (다시 받지 않음)
+@login_required
+@conditional_get(etag_func=pivot_data_etag)
 def survey_pivot_data_api(request, survey_id):
-    # 해당 조사의 모든 데이터 조회 (최적화를 위해 select_related 사용)
-    queryset = SurveyData.objects.filter(
-        roster__survey_id=survey_id
-    ).select_related('area', 'assigned_user', 'roster', 'degree')
-    data_list = []
-    
-    for record in queryset:
-        # 기본 정보
-        flat_data = {
-            "ID": record.respondent_id,
-            "차수": f"{record.degree.degree_number}차" if record.degree else "미지정",
-            "차수명": record.degree.degree_title if record.degree else "",
-            "권역": record.area.area_name if record.area else "미지정",
-            "조사원": record.assigned_user.username if record.assigned_user else "미배정",
-            "상태": record.status, 
-            "명부명": record.roster.roster_name if record.roster else "",
-            "수정일": record.updated_at.strftime("%Y-%m-%d %H:%M")
-        }
+    """
+    스트리밍 응답 (전체 결과를 메모리에 올리지 않음)
+    - format=ndjson : 한 줄에 1건 (기본은 JSON 배열)
+    - fields=ID,권역,... : 지정한 필드만 전송
+    - analysis=<id> : 저장된 분석(report_config)에서 사용하는 필드만 전송
+    - async=1 : 파일 추출 작업으로 등록하고 작업 ID만 반환 (완료 후 /jobs/<id>/download/)
+    """
+    # [보안 체크] 조사 담당 관리자(슈퍼유저 포함) 또는 권역 배정 사용자만
+    access = request.access
+    if not access.can_manage_survey(survey_id) and not access.is_assigned(survey_id):
+        return JsonResponse({'status': 'error', 'message': '권한이 없습니다.'}, status=403)
 
-        # JSON 데이터 병합 (명부 데이터 + 응답 데이터)
-        if record.list_values:
-            flat_data.update(record.list_values)
-        
-        # 응답 데이터는 키 충돌 방지를 위해 'Q_' 접두어 붙이기 (선택사항)
-        if record.survey_values:
-            for k, v in record.survey_values.items():
-                flat_data[f"Q_{k}"] = v
+    # source=flat : 분석용 평면 테이블(문항별 컬럼)에서 조회
+    if request.GET.get('source') == 'flat':
+        flat = SurveyFlatTable.objects.filter(survey_id=survey_id).first()
+        if flat is None:
+            return JsonResponse({'status': 'error', 'message': '분석 테이블이 아직 생성되지 않았습니다.'}, status=404)
+        fields = [f.strip() for f in request.GET.get('fields', '').split(',') if f.strip()] or None
+        ndjson = request.GET.get('format') == 'ndjson'
+        response = StreamingHttpResponse(
+            iter_pivot_json(iter_flat_rows(flat, fields), ndjson=ndjson),
+            content_type='application/x-ndjson' if ndjson else 'application/json',
+        )
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    fields = None
+    if request.GET.get('analysis'):
+        analysis = get_object_or_404(SurveyAnalysis, pk=request.GET['analysis'], survey_id=survey_id)
+        fields = report_fields(analysis.report_config) or None
+    elif request.GET.get('fields'):
+        fields = [f.strip() for f in request.GET['fields'].split(',') if f.strip()]
+
+    if request.GET.get('async') == '1':
+        # 같은 사용자의 같은 추출 작업이 대기/실행 중이면 새로 등록하지 않고 그 작업을 돌려줌
+        params = {'survey_id': survey_id, 'fields': fields}
+        job = BackgroundJob.objects.filter(
+            job_type='pivot_export', created_by=request.user, status__in=['QUEUED', 'RUNNING'], params=params
+        ).first() or enqueue_job('pivot_export', params, user=request.user)
+        return JsonResponse({'status': 'success', 'job_id': job.id, 'status_url': f"/jobs/{job.id}/status/"}, status=202)
+
+    ndjson = request.GET.get('format') == 'ndjson'
+    response = StreamingHttpResponse(
+        iter_pivot_json(iter_pivot_rows(survey_id, fields), ndjson=ndjson),
+        content_type='application/x-ndjson' if ndjson else 'application/json',
+    )
+    response['X-Accel-Buffering'] = 'no'  # 프록시(nginx) 버퍼링 없이 바로 전달
+    return response
 
-        data_list.append(flat_data)
+# [API] 분석용 평면 테이블 정보 조회(GET) / 재생성 요청(POST)
+@user_passes_test(is_admin)
+def survey_flat_table_api(request, survey_id):
+    survey = get_object_or_404(SurveyMaster, pk=survey_id)
+    if request.method == 'POST':
+        job = enqueue_job('rebuild_flat_table', {'survey_id': survey.id}, user=request.user)
+        return JsonResponse({'status': 'success', 'job_id': job.id, 'status_url': f"/jobs/{job.id}/status/"}, status=202)
 
-    return JsonResponse(data_list, safe=False)
+    flat = SurveyFlatTable.objects.filter(survey=survey).first()
+    if flat is None:
+        return JsonResponse({'status': 'error', 'message': '분석 테이블이 아직 생성되지 않았습니다.'}, status=404)
+    return JsonResponse({
+        'status': 'success',
+        'table_name': flat.table_name,
+        'rows_table_name': flat.rows_table_name,
+        'row_count': flat.row_count,
+        'is_stale': flat.is_stale,
+        'built_at': flat.built_at.strftime('%Y-%m-%d %H:%M:%S') if flat.built_at else None,
+        'columns': [
+            {'name': c.get('name'), 'kind': c['kind'], 'label': c['label'], 'type': c.get('type', 'table')}
+            for c in flat.columns
+        ],
+    })
 
 # [API] 분석 설정 저장하기
 @require_POST
@@ -1197,16 +1170,25 @@ def save_analysis_config(request, survey_id):
         return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
     
 # [API] 저장된 분석 목록 가져오기
+# 목록은 제목/설명 등 메타정보만 전송 (full=1 이면 report_config 포함 - 설정은 json/ API 로 개별 조회)
+@conditional_get(etag_func=analysis_list_etag)
 def get_analysis_list(request, survey_id):
-    analyses = SurveyAnalysis.objects.filter(survey_id=survey_id).order_by('-created_at')
-    data = [{
-        'id': a.id,
-        'title': a.title,
-        'description': a.description,
-        'created_at': a.created_at.strftime('%Y-%m-%d %H:%M'),
-        'report_config': a.report_config 
-    } for a in analyses]
-    return JsonResponse(data, safe=False)
+    full = request.GET.get('full') == '1'
+    fields = ['id', 'title', 'description', 'created_at', 'updated_at'] + (['report_config'] if full else [])
+    analyses = SurveyAnalysis.objects.filter(survey_id=survey_id).order_by('-created_at').values(*fields)
+    data = []
+    for a in analyses:
+        item = {
+            'id': a['id'],
+            'title': a['title'],
+            'description': a['description'],
+            'created_at': a['created_at'].strftime('%Y-%m-%d %H:%M'),
+            'updated_at': a['updated_at'].strftime('%Y-%m-%d %H:%M'),
+        }
+        if full:
+            item['report_config'] = a['report_config']
+        data.append(item)
+    return FastJsonResponse(data, safe=False)
 
 # [화면] 분석 목록 조회 페이지 (조사원/관리자용)
 def analysis_list_view(request, survey_id):
@@ -1222,21 +1204,53 @@ def analysis_list_view(request, survey_id):
         'is_viewer_mode': is_viewer_mode  # [추가] 템플릿으로 전달
     })
 
-# [API] 특정 분석 리포트의 설정(JSON)을 반환
+# [API] 특정 분석 리포트의 설정(JSON)과 집계 스냅샷을 반환
 @login_required
 def get_analysis_detail(request, analysis_id):
-    analysis = get_object_or_404(SurveyAnalysis, pk=analysis_id)
+    """
+    snapshot: {"report", "cells"} - 미리 집계해 둔 결과 (없으면 바로 생성, 오래되면 갱신 작업만 등록)
+    서버 집계를 지원하지 않는 리포트는 snapshot 이 null 이고 snapshot_error 에 사유가 옵니다. (원자료 피벗 사용)
+    """
+    analysis = get_object_or_404(SurveyAnalysis.objects.select_related('snapshot'), pk=analysis_id)
     
     # [보안 체크]
-    is_assigned = SurveyAreaUser.objects.filter(survey=analysis.survey, user=request.user).exists()
+    is_assigned = request.access.is_assigned(analysis.survey_id)
+
+    if not request.user.is_superuser and not is_assigned:
+        return JsonResponse({'status': 'error', 'message': '권한이 없습니다.'}, status=403)
+
+    snapshot = snapshot_for_view(analysis)
+    head = json.dumps({
+        'status': 'success',
+        'title': analysis.title,
+        'report_config': analysis.report_config,
+        'snapshot_built_at': snapshot.built_at.strftime('%Y-%m-%d %H:%M:%S'),
+        'snapshot_error': snapshot.error or None,
+    }, ensure_ascii=False)
+    # 저장된 JSON 문자열을 다시 해석하지 않고 응답에 그대로 붙임
+    return HttpResponse(f'{head[:-1]}, "snapshot": {snapshot.payload}}}', content_type='application/json')
+
+# [API] 저장된 분석의 서버 집계 결과 (원자료 없이 집계 셀만 전달)
+@login_required
+def get_analysis_aggregate(request, analysis_id):
+    analysis = get_object_or_404(SurveyAnalysis, pk=analysis_id)
 
+    is_assigned = request.access.is_assigned(analysis.survey_id)
     if not request.user.is_superuser and not is_assigned:
         return JsonResponse({'status': 'error', 'message': '권한이 없습니다.'}, status=403)
 
+    try:
+        cube = aggregate_report(analysis.survey_id, analysis.report_config)
+    except AggregationError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
     return JsonResponse({
         'status': 'success',
         'title': analysis.title,
-        'report_config': analysis.report_config
+        'report': viewer_report(analysis.report_config, cube),
+        'cells': cube['cells'],
+        'cell_count': cube['cell_count'],
+        'elapsed': cube['elapsed'],
     })
 
 # [화면] 분석 리포트 뷰어 페이지
@@ -1246,7 +1260,7 @@ def analysis_viewer_view(request, analysis_id):
     
     # [보안 체크] 상위 조사에 대해 배정 여부 확인
     # (이 줄의 들여쓰기가 위 'analysis =' 줄과 정확히 일치해야 합니다)
-    is_assigned = SurveyAreaUser.objects.filter(survey=analysis.survey, user=request.user).exists()
+    is_assigned = request.access.is_assigned(analysis.survey_id)
 
     if not request.user.is_superuser and not is_assigned:
          return HttpResponse("조회 권한이 없습니다.", status=403)
@@ -1256,13 +1270,63 @@ def analysis_viewer_view(request, analysis_id):
 # surveys/views.py
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
-from .superset_utils import execute_superset_sql
+from .superset_utils import execute_superset_sql, get_superset_client, SupersetError
+from .sql_cache import cache_key, cached_query, lookup, store_result
+from .sql_direct import SqlNotAllowed, is_available, stream_query, table_survey_id, validate_sql
+from django.conf import settings
 import json
 
+SUPERSET_SESSION_KEY = 'superset_queries'  # 이 세션이 제출한 비동기 쿼리 {ID: 결과 캐시 키} (폴링 허용 대상)
+
+def _superset_result_response(result, cache_state='miss'):
+    # Superset 결과 구조에서 실제 데이터 추출 (보통 result['data'] 에 데이터가 들어있음)
+    response = JsonResponse({
+        'status': 'success',
+        'data': result.get('data', []),
+        'columns': result.get('columns', [])
+    })
+    response['X-Query-Cache'] = cache_state
+    return response
+
+def _direct_query_response(request, sql_query):
+    """
+    [backend=direct] 평면 테이블을 DB 에서 바로 조회해 NDJSON 으로 스트리밍 (읽기 전용, 타임아웃/최대 행 수 적용)
+    관리자는 모든 평면 테이블, 조사 담당 관리자는 담당 조사의 평면 테이블만 조회할 수 있습니다.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'status': 'error', 'message': '로그인이 필요합니다.'}, status=401)
+    access = get_user_access(request.user)
+    if not access.is_admin and not access.managed_survey_ids:
+        return JsonResponse({'status': 'error', 'message': '권한이 없습니다.'}, status=403)
+    if not is_available():  # 평면 테이블 SELECT 전용 계정(readonly 연결) 없이는 실행하지 않음
+        return JsonResponse({'status': 'error', 'message': '직접 실행용 읽기 전용 DB 연결이 설정되지 않았습니다.'}, status=503)
+
+    def table_allowed(table_name):
+        survey_id = table_survey_id(table_name)
+        return survey_id is not None and (access.is_admin or access.can_manage_survey(survey_id))
+
+    try:
+        stream = stream_query(validate_sql(sql_query), table_allowed)
+        first = next(stream)  # 검사/문법 오류는 스트리밍 전에 400 으로 응답
+    except SqlNotAllowed as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    except DatabaseError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+    def chunks():
+        yield first
+        yield from stream
+
+    response = StreamingHttpResponse(chunks(), content_type='application/x-ndjson; charset=utf-8')
+    response['X-Query-Backend'] = 'direct'
+    return response
+
 @csrf_exempt  # API 테스트 편의를 위해 CSRF 예외 처리 (실제 개발시엔 토큰 처리 필요)
 def get_query_result(request):
     """
     [API] 클라이언트가 요청한 SQL을 Superset에서 실행하고 결과를 반환
+    - {"sql": ..., "async": true} 이면 제출만 하고 202 + 폴링 주소를 반환 (워커가 쿼리 완료를 기다리지 않음)
+    - {"sql": ..., "backend": "direct"} 이면 Superset 대신 읽기 전용 DB 연결로 바로 실행해 NDJSON 스트리밍 (sql_direct)
     """
     if request.method == 'POST':
         try:
@@ -1273,22 +1337,88 @@ def get_query_result(request):
             if not sql_query:
                 return JsonResponse({'status': 'error', 'message': 'SQL 문이 없습니다.'}, status=400)
 
-            # 유틸리티 함수 호출
-            # database_id=1 은 Superset의 'examples' DB입니다. (PostgreSQL 연결한 DB ID로 변경 필요)
-            result = execute_superset_sql(sql_query, database_id=2)
+            if body.get('backend') == 'direct':
+                return _direct_query_response(request, sql_query)
+
+            database_id = settings.SUPERSET_DATABASE_ID
+            if body.get('async'):
+                # 같은 SQL 결과가 캐시에 있으면 제출하지 않고 바로 반환
+                key = cache_key(sql_query, database_id)
+                cached = lookup(key)
+                if cached is not None:
+                    return _superset_result_response(cached, 'hit')
+                try:
+                    state, result = get_superset_client().submit(sql_query, database_id, run_async=True)
+                except SupersetError as e:
+                    return JsonResponse({'status': 'error', 'message': str(e)}, status=502)
+                if state == 'done':  # Superset DB 가 비동기 실행을 허용하지 않으면 바로 결과가 옴
+                    store_result(key, result)
+                    return _superset_result_response(result)
+                pending = request.session.get(SUPERSET_SESSION_KEY, {})
+                pending = dict(list(pending.items())[-49:])
+                pending[str(result['query_id'])] = key
+                request.session[SUPERSET_SESSION_KEY] = pending
+                return JsonResponse({
+                    'status': 'pending',
+                    'query_id': result['query_id'],
+                    'poll_url': f"/api/execute-sql/{result['query_id']}/",
+                }, status=202)
+
+            # 유틸리티 함수 호출 (Superset 에 등록된 PostgreSQL DB: settings.SUPERSET_DATABASE_ID)
+            # 정규화한 SQL 기준 결과 캐시 (동시에 같은 SQL 이 오면 1회만 실행)
+            result, cache_state = cached_query(sql_query, database_id, execute_superset_sql)
             
             if 'error' in result:
                 return JsonResponse({'status': 'error', 'message': result['error']}, status=500)
             
-            # Superset 결과 구조에서 실제 데이터 추출
-            # 보통 result['data'] 에 데이터가 들어있음
-            return JsonResponse({
-                'status': 'success',
-                'data': result.get('data', []),
-                'columns': result.get('columns', [])
-            })
+            return _superset_result_response(result, cache_state)
             
         except Exception as e:
             return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
     
-    return JsonResponse({'status': 'error', 'message': 'POST method required'}, status=405)
\ No newline at end of file
+    return JsonResponse({'status': 'error', 'message': 'POST method required'}, status=405)
+
+def poll_query_result(request, query_id):
+    """[API] 비동기로 제출한 SQL 의 상태 확인 (완료 시 결과 반환, 진행 중이면 202)"""
+    key = request.session.get(SUPERSET_SESSION_KEY, {}).get(str(query_id))
+    if key is None:
+        return JsonResponse({'status': 'error', 'message': '조회할 수 없는 쿼리입니다.'}, status=404)
+    try:
+        state, result = get_superset_client().poll(query_id)
+    except SupersetError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=502)
+    if state == 'pending':
+        return JsonResponse({'status': 'pending', 'query_id': query_id}, status=202)
+    store_result(key, result)
+    return _superset_result_response(result)
+
+# ==========================================
+# [백그라운드 작업] 진행 상황 조회 / 결과 다운로드
+# ==========================================
+def _get_visible_job(request, job_id):
+    job = get_object_or_404(BackgroundJob, pk=job_id)
+    if not is_admin(request.user) and job.created_by_id != request.user.id:
+        return None
+    return job
+
+@login_required
+def job_status_api(request, job_id):
+    """[API] 작업 상태/진행률/처리건수/예상 남은시간 (폴링용)"""
+    job = _get_visible_job(request, job_id)
+    if job is None:
+        return JsonResponse({'status': 'error', 'message': '권한이 없습니다.'}, status=403)
+    return JsonResponse({'status': 'success', 'job': job_status(job)})
+
+@login_required
+def job_download(request, job_id):
+    """[API] 추출 작업 결과 파일 다운로드"""
+    job = _get_visible_job(request, job_id)
+    if job is None:
+        return HttpResponse("권한이 없습니다.", status=403)
+    file_name = job.result.get('file_name') if job.status == 'DONE' else None
+    if not file_name:
+        return HttpResponse("다운로드할 결과가 없습니다.", status=404)
+    path = job_file_path(file_name)
+    if not path.exists():
+        return HttpResponse("결과 파일이 만료되었습니다.", status=404)
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=file_name)